@@ -2,19 +2,23 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from typing import List
-from ..database import SessionLocal
+from ..database import get_db
 from ..models import APIKey, User
 from ..schemas import APIKeyCreate, APIKeyOut
 from ..auth import get_current_user
 from ..utils.crypto import encrypt_api_key
+from ..utils.serialization import SchemaRows
+from ..services.credential_vault import credential_vault
 
 router = APIRouter()
 
+API_KEY_ROWS = SchemaRows(APIKey, APIKeyOut)
+
 @router.post("/", response_model=APIKeyOut)
 async def add_api_key(
     api_key: APIKeyCreate,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(SessionLocal)
+    db: AsyncSession = Depends(get_db)
 ):
     """Ajouter une nouvelle clé API (chiffrée)"""
     encrypted_key = encrypt_api_key(api_key.key)
@@ -29,22 +33,23 @@ async def add_api_key(
     db.add(db_api_key)
     await db.commit()
     await db.refresh(db_api_key)
+    credential_vault.invalidate(db_api_key.id)
     return db_api_key
 
 @router.get("/", response_model=List[APIKeyOut])
 async def list_api_keys(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(SessionLocal)
+    db: AsyncSession = Depends(get_db)
 ):
     """Lister toutes les clés API de l'utilisateur connecté"""
-    result = await db.execute(select(APIKey).where(APIKey.user_id == current_user.id))
-    return result.scalars().all()
+    result = await db.execute(API_KEY_ROWS.select().where(APIKey.user_id == current_user.id))
+    return API_KEY_ROWS.response(result.all())
 
 @router.delete("/{api_key_id}")
 async def delete_api_key(
     api_key_id: int,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(SessionLocal)
+    db: AsyncSession = Depends(get_db)
 ):
     """Supprimer une clé API"""
     result = await db.execute(select(APIKey).where(APIKey.id == api_key_id, APIKey.user_id == current_user.id))
@@ -55,4 +60,5 @@ async def delete_api_key(
     
     await db.delete(api_key)
     await db.commit()
+    credential_vault.invalidate(api_key_id)
     return {"message": "Clé API supprimée avec succès"} 
\ No newline at end of file
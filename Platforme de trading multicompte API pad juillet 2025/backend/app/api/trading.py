@@ -1,40 +1,224 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
-from ..database import SessionLocal
-from ..models import Trade, Deposit, Withdrawal, User
-from ..schemas import TradeOut, DepositOut, WithdrawalOut
+from typing import Any, List, Optional
+from datetime import date, datetime
+import os
+from ..database import ReadSessionLocal, get_db, get_read_db
+from ..models import Trade, Deposit, Withdrawal, User, PriceTrigger
+from ..schemas import TradeOut, DepositOut, WithdrawalOut, PerformanceOut, OrderIn, BatchExecuteOut, PositionOut, TriggerOut
 from ..auth import get_current_user
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_paginate, page_limit, split_page
+from ..utils.export import MEDIA_TYPES, stream_export
+from ..utils.serialization import SchemaRows
+from ..services.pnl_rollup import GROUP_COLUMNS, pnl_rollup_service
+from ..services.exchanges import ExchangeError
+from ..services.trading_executor import trading_executor
+from ..services.position_book import position_book
+from ..services.trigger_engine import trigger_engine
+from ..services.trade_archive import trade_archive
 
 router = APIRouter()
 
+# Nombre maximal d'ordres par lot, et de lignes par INSERT multi-valeurs
+BATCH_MAX_ORDERS = int(os.environ.get("TRADING_BATCH_MAX_ORDERS", "1000"))
+BATCH_INSERT_SIZE = 500
+
+# Modèle, colonne de date et colonnes exportées pour chaque historique
+EXPORTS = {
+    "trades": (Trade, Trade.timestamp, ["id", "symbol", "side", "quantity", "price", "pnl", "strategy", "timestamp", "exchange"]),
+    "deposits": (Deposit, Deposit.created_at, ["id", "amount", "currency", "status", "tx_id", "exchange", "created_at"]),
+    "withdrawals": (Withdrawal, Withdrawal.created_at, ["id", "amount", "currency", "status", "tx_id", "exchange", "created_at"])
+}
+
+# Listes lues en tuples et encodées directement (même JSON que via response_model)
+TRADE_ROWS = SchemaRows(Trade, TradeOut)
+DEPOSIT_ROWS = SchemaRows(Deposit, DepositOut)
+WITHDRAWAL_ROWS = SchemaRows(Withdrawal, WithdrawalOut)
+TRIGGER_ROWS = SchemaRows(PriceTrigger, TriggerOut)
+
+def _page_headers(next_cursor: Optional[str]) -> Optional[dict]:
+    return {"X-Next-Cursor": next_cursor} if next_cursor else None
+
+def _filter_transfers(query, model, exchange, currency, status, start, end):
+    """Filtres communs aux dépôts et retraits"""
+    if exchange:
+        query = query.where(model.exchange == exchange)
+    if currency:
+        query = query.where(model.currency == currency)
+    if status:
+        query = query.where(model.status == status)
+    if start:
+        query = query.where(model.created_at >= start)
+    if end:
+        query = query.where(model.created_at < end)
+    return query
+
 @router.get("/history", response_model=List[TradeOut])
 async def get_trade_history(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    symbol: Optional[str] = None,
+    exchange: Optional[str] = None,
+    strategy: Optional[str] = None,
+    side: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(SessionLocal)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Récupérer l'historique des trades de l'utilisateur"""
-    result = await db.execute(select(Trade).where(Trade.user_id == current_user.id))
-    return result.scalars().all()
+    """Récupérer l'historique des trades de l'utilisateur (paginé par curseur)
+
+    Le curseur de la page suivante est renvoyé dans l'en-tête X-Next-Cursor. Sans cursor ni limit,
+    l'historique complet est renvoyé (clients antérieurs à la pagination).
+    """
+    query = TRADE_ROWS.select().where(Trade.user_id == current_user.id)
+    if symbol:
+        query = query.where(Trade.symbol == symbol)
+    if exchange:
+        query = query.where(Trade.exchange == exchange)
+    if strategy:
+        query = query.where(Trade.strategy == strategy)
+    if side:
+        query = query.where(Trade.side == side)
+    if start:
+        query = query.where(Trade.timestamp >= start)
+    if end:
+        query = query.where(Trade.timestamp < end)
+    
+    limit = page_limit(cursor, limit)
+    result = await db.execute(keyset_paginate(query, Trade.timestamp, Trade.id, cursor, limit))
+    trades, next_cursor = split_page(result.all(), limit, "timestamp")
+    return TRADE_ROWS.response(trades, _page_headers(next_cursor))
 
 @router.get("/deposits", response_model=List[DepositOut])
 async def get_deposits(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    exchange: Optional[str] = None,
+    currency: Optional[str] = None,
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(SessionLocal)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Récupérer l'historique des dépôts de l'utilisateur"""
-    result = await db.execute(select(Deposit).where(Deposit.user_id == current_user.id))
-    return result.scalars().all()
+    """Récupérer l'historique des dépôts de l'utilisateur (paginé par curseur, complet sans cursor ni limit)"""
+    query = _filter_transfers(
+        DEPOSIT_ROWS.select().where(Deposit.user_id == current_user.id),
+        Deposit, exchange, currency, status, start, end
+    )
+    limit = page_limit(cursor, limit)
+    result = await db.execute(keyset_paginate(query, Deposit.created_at, Deposit.id, cursor, limit))
+    deposits, next_cursor = split_page(result.all(), limit, "created_at")
+    return DEPOSIT_ROWS.response(deposits, _page_headers(next_cursor))
 
 @router.get("/withdrawals", response_model=List[WithdrawalOut])
 async def get_withdrawals(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    exchange: Optional[str] = None,
+    currency: Optional[str] = None,
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(SessionLocal)
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Récupérer l'historique des retraits de l'utilisateur (paginé par curseur, complet sans cursor ni limit)"""
+    query = _filter_transfers(
+        WITHDRAWAL_ROWS.select().where(Withdrawal.user_id == current_user.id),
+        Withdrawal, exchange, currency, status, start, end
+    )
+    limit = page_limit(cursor, limit)
+    result = await db.execute(keyset_paginate(query, Withdrawal.created_at, Withdrawal.id, cursor, limit))
+    withdrawals, next_cursor = split_page(result.all(), limit, "created_at")
+    return WITHDRAWAL_ROWS.response(withdrawals, _page_headers(next_cursor))
+
+@router.get("/export/{kind}")
+async def export_history(
+    kind: str,
+    fmt: str = Query("ndjson", alias="format"),
+    exchange: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user)
 ):
-    """Récupérer l'historique des retraits de l'utilisateur"""
-    result = await db.execute(select(Withdrawal).where(Withdrawal.user_id == current_user.id))
-    return result.scalars().all()
+    """Exporter un historique complet en flux (NDJSON ou CSV), à mémoire constante"""
+    if kind not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Export inconnu")
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Format d'export non supporté (ndjson ou csv)")
+    
+    model, timestamp_column, columns = EXPORTS[kind]
+    query = select(*[getattr(model, column) for column in columns]).where(model.user_id == current_user.id)
+    if exchange:
+        query = query.where(model.exchange == exchange)
+    if start:
+        query = query.where(timestamp_column >= start)
+    if end:
+        query = query.where(timestamp_column < end)
+    query = query.order_by(timestamp_column, model.id)
+    # Trades des partitions archivées (Parquet), plus anciens que ceux encore en base
+    archived = trade_archive.read_batches(current_user.id, columns, exchange, start, end) if kind == "trades" else None
+    
+    return StreamingResponse(
+        stream_export(ReadSessionLocal, query, columns, fmt, before=archived),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{kind}.{fmt}"'}
+    )
+
+@router.get("/performance", response_model=List[PerformanceOut])
+async def get_performance(
+    group_by: str = "strategy",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Performances (PnL, volume, taux de réussite, drawdown) lues depuis les agrégats journaliers"""
+    if group_by not in GROUP_COLUMNS:
+        raise HTTPException(status_code=400, detail="Regroupement invalide (strategy, symbol ou exchange)")
+    return await pnl_rollup_service.get_performance(db, current_user.id, group_by, start, end)
+
+@router.get("/positions", response_model=List[PositionOut])
+async def get_positions(current_user: User = Depends(get_current_user)):
+    """Positions nettes ouvertes, lues depuis le carnet en mémoire"""
+    positions = []
+    for position in position_book.get_user_positions(current_user.id):
+        if not position.quantity:
+            continue
+        mark_price = position_book.mark_price(position)
+        positions.append({
+            **position.to_dict(),
+            "mark_price": mark_price,
+            "notional": abs(position.quantity) * mark_price if mark_price is not None else None
+        })
+    return positions
+
+@router.get("/triggers", response_model=List[TriggerOut])
+async def get_triggers(
+    status: Optional[str] = "pending",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stop-loss / take-profit de l'utilisateur (en attente par défaut)"""
+    query = TRIGGER_ROWS.select().where(PriceTrigger.user_id == current_user.id)
+    if status:
+        query = query.where(PriceTrigger.status == status)
+    result = await db.execute(query.order_by(PriceTrigger.created_at.desc()).limit(limit))
+    return TRIGGER_ROWS.response(result.all())
+
+@router.delete("/triggers/{trigger_id}")
+async def cancel_trigger(trigger_id: int, current_user: User = Depends(get_current_user)):
+    """Annuler un stop-loss / take-profit en attente"""
+    if not await trigger_engine.cancel(trigger_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Déclencheur introuvable ou déjà exécuté")
+    return {"message": "Déclencheur annulé", "trigger_id": trigger_id}
 
 @router.post("/execute")
 async def execute_trade(
@@ -42,21 +226,90 @@ async def execute_trade(
     side: str,
     quantity: float,
     exchange: str,
+    stop_loss: Optional[float] = None,
+    take_profit: Optional[float] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Exécuter un trade au marché avec la clé API du compte sur cet exchange (SL/TP optionnels)"""
+    try:
+        result = await trading_executor.execute_trade(
+            symbol=symbol,
+            side=side,
+            quantity=quantity,
+            exchange=exchange,
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            user_id=current_user.id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExchangeError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    return {"message": "Trade exécuté", "trade_id": result["trade_id"], "order": result}
+
+@router.post("/execute-batch", response_model=BatchExecuteOut)
+async def execute_trade_batch(
+    orders: List[Any] = Body(...),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(SessionLocal)
-):
-    """Exécuter un trade automatique (placeholder pour l'intégration exchange)"""
-    # TODO: Intégrer avec les APIs des exchanges (Binance, Bybit, etc.)
-    # Pour l'instant, on simule l'exécution
-    trade = Trade(
-        symbol=symbol,
-        side=side,
-        quantity=quantity,
-        price=0.0,  # À récupérer depuis l'exchange
-        exchange=exchange,
-        user_id=current_user.id
-    )
-    db.add(trade)
-    await db.commit()
-    await db.refresh(trade)
-    return {"message": "Trade exécuté", "trade_id": trade.id} 
\ No newline at end of file
+    db: AsyncSession = Depends(get_db)
+):
+    """Exécuter un lot d'ordres : validation préalable, ordres en parallèle, puis une seule transaction"""
+    if len(orders) > BATCH_MAX_ORDERS:
+        raise HTTPException(status_code=400, detail=f"Lot trop volumineux (maximum {BATCH_MAX_ORDERS} ordres)")
+    
+    # Valider tous les ordres avant toute écriture ; les ordres invalides sont rapportés individuellement
+    results = []
+    valid = []
+    for index, item in enumerate(orders):
+        try:
+            order = OrderIn.parse_obj(item)
+        except ValidationError as e:
+            results.append({"index": index, "status": "error", "error": "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            )})
+            continue
+        results.append(None)
+        valid.append((index, order))
+    
+    # Expositions réservées dans le carnet jusqu'à ce que les trades y soient répercutés
+    async with trading_executor.execute_orders(current_user.id, [order.dict() for _, order in valid]) as fills:
+        rows = []
+        indexes = []
+        timestamp = datetime.utcnow()
+        for (index, order), fill in zip(valid, fills):
+            if isinstance(fill, Exception):
+                results[index] = {"index": index, "status": "error", "error": str(fill)}
+            elif not fill.filled_quantity:
+                # Ordre accepté mais non exécuté : pas de trade
+                results[index] = {"index": index, "status": fill.status, "order_id": fill.order_id}
+            else:
+                indexes.append((index, fill))
+                rows.append({**trading_executor.trade_row(fill, current_user.id, order.strategy), "timestamp": timestamp})
+    
+        # INSERT multi-valeurs avec RETURNING : un aller-retour par tranche au lieu de trois par ordre.
+        # PostgreSQL ne garantit pas l'ordre des lignes renvoyées : sort_by_parameter_order fait
+        # correspondre chaque id à sa ligne de paramètres
+        trades = []
+        with position_book.recording((row["user_id"], row["exchange"], row["symbol"]) for row in rows):
+            position_book.set_realized_pnl(rows)
+            for offset in range(0, len(rows), BATCH_INSERT_SIZE):
+                chunk = rows[offset:offset + BATCH_INSERT_SIZE]
+                result = await db.execute(insert(Trade).returning(Trade.id, sort_by_parameter_order=True), chunk)
+                trades += [Trade(id=trade_id, **row) for trade_id, row in zip(result.scalars().all(), chunk)]
+            if trades:
+                await pnl_rollup_service.apply_trades(db, trades)
+                await db.commit()
+                for trade in trades:
+                    position_book.apply_trade(trade)
+    
+    for (index, fill), trade in zip(indexes, trades):
+        results[index] = {
+            "index": index, "status": fill.status, "trade_id": trade.id,
+            "order_id": fill.order_id, "price": fill.avg_price
+        }
+    
+    return {
+        "succeeded": len(trades),
+        "failed": sum(1 for result in results if result["status"] == "error"),
+        "results": results
+    }
\ No newline at end of file
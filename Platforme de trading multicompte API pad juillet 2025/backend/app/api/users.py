@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from ..database import SessionLocal
+from ..database import get_db
 from ..models import User
 from ..schemas import UserCreate, UserOut
 from ..auth import create_user, authenticate_user, create_access_token, get_current_user
@@ -8,7 +8,7 @@ from ..auth import create_user, authenticate_user, create_access_token, get_curr
 router = APIRouter()
 
 @router.post("/register", response_model=UserOut)
-async def register(user: UserCreate, db: AsyncSession = Depends(SessionLocal)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Créer un nouveau compte utilisateur"""
     if not user.password:
         raise HTTPException(status_code=400, detail="Password is required for registration")
@@ -17,7 +17,7 @@ async def register(user: UserCreate, db: AsyncSession = Depends(SessionLocal)):
     return db_user
 
 @router.post("/login")
-async def login(email: str, password: str, db: AsyncSession = Depends(SessionLocal)):
+async def login(email: str, password: str, db: AsyncSession = Depends(get_db)):
     """Connexion utilisateur avec email et mot de passe"""
     user = await authenticate_user(email, password, db)
     if not user:
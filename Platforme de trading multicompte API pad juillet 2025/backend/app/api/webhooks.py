@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from ..services.trading_executor import trading_executor
+from ..services.tradingview_webhook import TradingViewWebhookService
+
+router = APIRouter()
+
+webhook_service = TradingViewWebhookService(trading_executor)
+
+@router.post("/tradingview")
+async def tradingview_webhook(request: Request):
+    """Recevoir un signal TradingView"""
+    if webhook_service.ingestion_mode == "queue":
+        result = await webhook_service.enqueue_webhook(request)
+        return JSONResponse(status_code=202, content=result)
+    
+    return await webhook_service.process_webhook(request)
\ No newline at end of file
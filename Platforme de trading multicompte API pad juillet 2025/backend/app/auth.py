@@ -1,13 +1,15 @@
-from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from .database import SessionLocal
+from .database import get_db
 from .models import User
 from .schemas import UserCreate
+from .services.password_hasher import HasherBusy, password_hasher
+from .services.principal_cache import principal_cache
+from .utils.timing import stage
 import os
 
 # Configuration
@@ -15,8 +17,8 @@ SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-# Hash des mots de passe
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hash des mots de passe (coût BCRYPT_ROUNDS, calcul dans le pool du hasher)
+pwd_context = password_hasher.context
 
 # Sécurité HTTP
 security = HTTPBearer()
@@ -34,24 +36,36 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(SessionLocal)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)):
+    with stage("auth"):
+        return await _authenticate_token(credentials.credentials, db)
+
+async def _authenticate_token(token: str, db: AsyncSession):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
+    # Jeton déjà vérifié : pas de nouveau décodage JWT
+    user_id = principal_cache.get_token(token)
+    if user_id is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            user_id = int(payload.get("sub"))
+        except (JWTError, TypeError, ValueError):
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        if payload.get("exp"):
+            principal_cache.set_token(token, user_id, payload["exp"])
+    
+    user = principal_cache.get_user(user_id)
+    if user is not None:
+        return user
     
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
+    principal_cache.set_user(user)
     return user
 
 async def create_user(user: UserCreate, db: AsyncSession):
@@ -62,7 +76,7 @@ async def create_user(user: UserCreate, db: AsyncSession):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Créer le nouvel utilisateur
-    hashed_password = get_password_hash(user.password) if user.password else None
+    hashed_password = await _off_loop(password_hasher.hash(user.password)) if user.password else None
     db_user = User(
         email=user.email,
         hashed_password=hashed_password
@@ -77,6 +91,24 @@ async def authenticate_user(email: str, password: str, db: AsyncSession):
     user = result.scalar_one_or_none()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await _off_loop(password_hasher.verify_and_update(password, user.hashed_password))
+    if not valid:
         return False
-    return user 
\ No newline at end of file
+    if new_hash:
+        # Coût bcrypt modifié depuis le hachage : mettre le hash à niveau
+        user.hashed_password = new_hash
+        await db.commit()
+        principal_cache.users.pop(user.id)
+    return user
+
+async def _off_loop(call):
+    """Attendre un calcul du hasher ; pool saturé : 503 plutôt qu'une file sans fin"""
+    try:
+        with stage("password_hash"):
+            return await call
+    except HasherBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent authentications, retry shortly",
+            headers={"Retry-After": "1"},
+        ) 
\ No newline at end of file
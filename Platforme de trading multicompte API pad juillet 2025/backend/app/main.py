@@ -1,6 +1,21 @@
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import users, api_keys, trading
+from fastapi.responses import PlainTextResponse
+from app.api import users, api_keys, trading, webhooks
+from app.database import close_engines
+from app.middleware.security import SecurityMiddleware
+from app.middleware.timing import TimingMiddleware
+from app.services.credential_vault import credential_vault
+from app.services.monitoring import monitoring_service
+from app.services.alert_dispatcher import alert_dispatcher
+from app.services.exchanges import exchange_registry
+from app.services.market_data import market_data_service
+from app.services.position_book import position_book
+from app.services.trading_executor import trading_executor
+from app.services.trigger_engine import trigger_engine
+from app.services.password_hasher import password_hasher
+from app.services.trade_archive import trade_partitions
 
 app = FastAPI(
     title="Trading Automatique API",
@@ -8,6 +23,10 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Sécurité : rate limiting, IP bloquées, détection d'injections
+# (déclaré avant CORS pour que les réponses 429/403 portent les en-têtes CORS)
+app.middleware("http")(SecurityMiddleware())
+
 # Configuration CORS pour le frontend
 app.add_middleware(
     CORSMiddleware,
@@ -15,12 +34,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Curseur de pagination des historiques
 )
 
+# Mesure des latences par route et par étape (déclaré en dernier : middleware le plus externe)
+app.add_middleware(TimingMiddleware, sample_rate=float(os.environ.get("TIMING_SAMPLE_RATE", "1.0")))
+
 # Inclusion des routeurs
 app.include_router(users.router, prefix="/users", tags=["users"])
 app.include_router(api_keys.router, prefix="/api-keys", tags=["api-keys"])
 app.include_router(trading.router, prefix="/trading", tags=["trading"])
+app.include_router(webhooks.router, prefix="/webhook", tags=["webhooks"])
+
+@app.on_event("startup")
+async def startup():
+    await alert_dispatcher.start()
+    await exchange_registry.start()
+    await credential_vault.start()
+    if os.environ.get("TRADES_MAINTENANCE_ENABLED", "true") == "true":
+        await trade_partitions.start()
+    await position_book.load()
+    await position_book.start(interval=float(os.environ.get("POSITION_RECONCILE_INTERVAL", "300")))
+    if os.environ.get("MARKET_DATA_ENABLED", "true") == "true":
+        await market_data_service.start()
+    await trigger_engine.start(trading_executor)
+    await webhooks.webhook_service.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await webhooks.webhook_service.stop()
+    await trigger_engine.stop()
+    await market_data_service.stop()
+    await position_book.stop()
+    await trade_partitions.stop()
+    await credential_vault.stop()
+    await exchange_registry.close()
+    await alert_dispatcher.stop()
+    password_hasher.close()
+    await close_engines()
 
 @app.get("/")
 def read_root():
@@ -32,4 +83,9 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"} 
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Métriques au format Prometheus"""
+    return PlainTextResponse(monitoring_service.render_prometheus(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -0,0 +1,166 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis optionnel : repli sur le backend mémoire
+    aioredis = None
+
+from ..services.shared_state import shared_state
+
+class RateLimitRule:
+    """Limite de `limit` requêtes par fenêtre de `window` secondes (seau à jetons)"""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.rate = limit / window
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimitRule":
+        """Lire une règle au format "100/60" """
+        limit, window = value.split("/")
+        return cls(int(limit), float(window))
+
+class InMemoryRateLimitBackend:
+    """Seaux à jetons locaux au processus, O(1) par requête"""
+
+    def __init__(self, idle_ttl: float = 600.0):
+        self.idle_ttl = idle_ttl
+        # Ordonnés par dernier accès : les seaux inactifs sont en tête
+        self.buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def hit(self, key: str, rule: RateLimitRule) -> Tuple[bool, float]:
+        """Consommer un jeton ; retourne (autorisé, délai avant nouvel essai)"""
+        now = time.monotonic()
+        self._evict_idle(now)
+
+        bucket = self.buckets.pop(key, None)
+        if bucket is None:
+            tokens = float(rule.limit)
+        else:
+            tokens = min(rule.limit, bucket[0] + (now - bucket[1]) * rule.rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[key] = [tokens, now]
+        return allowed, 0.0 if allowed else (1 - tokens) / rule.rate
+
+    def _evict_idle(self, now: float):
+        # Un seau inactif plus longtemps que sa fenêtre est plein : le supprimer ne change rien
+        while self.buckets:
+            key, (_, updated_at) = next(iter(self.buckets.items()))
+            if now - updated_at < self.idle_ttl:
+                break
+            del self.buckets[key]
+
+# Seau à jetons atomique côté Redis ; l'expiration évince les clés inactives
+TOKEN_BUCKET_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local rate = limit / window
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1])
+local ts = tonumber(data[2])
+if tokens == nil then
+    tokens = limit
+    ts = now
+end
+tokens = math.min(limit, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+class RedisRateLimitBackend:
+    """Seaux à jetons partagés entre les workers via Redis"""
+
+    def __init__(self, redis_url: str, prefix: str = "ratelimit:", fallback: Optional[InMemoryRateLimitBackend] = None):
+        if aioredis is None:
+            raise RuntimeError("Le package redis est requis pour RATE_LIMIT_BACKEND=redis")
+        self.logger = logging.getLogger(__name__)
+        self.client = aioredis.from_url(redis_url)
+        self.script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+        self.prefix = prefix
+        self.fallback = fallback or InMemoryRateLimitBackend()
+
+    async def hit(self, key: str, rule: RateLimitRule) -> Tuple[bool, float]:
+        try:
+            allowed, tokens = await self.script(
+                keys=[self.prefix + key],
+                args=[rule.limit, rule.window, time.time()]
+            )
+        except Exception as e:
+            # Redis indisponible : limiter localement plutôt que bloquer le trafic
+            self.logger.warning(f"Rate limiting Redis indisponible, repli local: {e}")
+            return await self.fallback.hit(key, rule)
+        if allowed:
+            return True, 0.0
+        return False, (1 - float(tokens)) / rule.rate
+
+class RateLimiter:
+    """Limites par IP, par utilisateur et par route"""
+
+    def __init__(self, backend, ip_rule: RateLimitRule, user_rule: Optional[RateLimitRule] = None,
+                 route_rules: Optional[Dict[str, RateLimitRule]] = None):
+        self.backend = backend
+        self.ip_rule = ip_rule
+        self.user_rule = user_rule
+        self.route_rules = route_rules or {}
+
+    async def check(self, client_ip: str, path: str, user_key: Optional[str] = None) -> Optional[float]:
+        """Retourne None si la requête est autorisée, sinon le délai Retry-After (secondes)
+
+        `user_key` ne doit identifier qu'un appelant authentifié : une clé fournie par le client
+        (jeton non vérifié) donnerait un seau neuf à chaque requête.
+        """
+        identity = user_key or f"ip:{client_ip}"
+
+        if user_key and self.user_rule:
+            allowed, retry_after = await self.backend.hit(user_key, self.user_rule)
+            if not allowed:
+                return retry_after
+
+        # Une règle de route s'ajoute à la limite par IP (ex. /users/login plus strict que le défaut)
+        for prefix, rule in self.route_rules.items():
+            if path.startswith(prefix):
+                allowed, retry_after = await self.backend.hit(f"route:{prefix}:{identity}", rule)
+                if not allowed:
+                    return retry_after
+                break
+
+        allowed, retry_after = await self.backend.hit(f"ip:{client_ip}", self.ip_rule)
+        return None if allowed else retry_after
+
+def rate_limiter_from_env() -> RateLimiter:
+    """Construire le limiteur à partir des variables d'environnement"""
+    ip_rule = RateLimitRule.parse(os.environ.get("RATE_LIMIT_IP", "100/60"))
+    user_rule = RateLimitRule.parse(os.environ.get("RATE_LIMIT_USER", "300/60"))
+    # Format: "/users/login=10/60,/webhook/tradingview=600/60" ; chaque règle s'ajoute à RATE_LIMIT_IP
+    route_rules = {}
+    for item in filter(None, os.environ.get("RATE_LIMIT_ROUTES", "/users/login=10/60").split(",")):
+        prefix, rule = item.split("=")
+        route_rules[prefix.strip()] = RateLimitRule.parse(rule.strip())
+
+    windows = [ip_rule.window, user_rule.window] + [rule.window for rule in route_rules.values()]
+    if shared_state is not None:
+        # Mode multi-workers : seaux communs à tous les workers du nœud
+        local_backend = shared_state.rate_limit_backend(idle_ttl=max(windows))
+    else:
+        local_backend = InMemoryRateLimitBackend(idle_ttl=max(windows))
+    if os.environ.get("RATE_LIMIT_BACKEND", "memory") == "redis":
+        backend = RedisRateLimitBackend(os.environ.get("REDIS_URL", "redis://localhost:6379"), fallback=local_backend)
+    else:
+        backend = local_backend
+
+    return RateLimiter(backend, ip_rule, user_rule, route_rules)
\ No newline at end of file
@@ -1,16 +1,51 @@
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
 import time
-import hashlib
-from typing import Dict, Set
+from typing import Optional
 import os
+from .rate_limit import RateLimiter, rate_limiter_from_env
+from .injection import InjectionScanner
+from ..services.principal_cache import principal_cache
+from ..services.shared_state import shared_state
+from ..utils.cache import TTLCache
+
+class BlockList:
+    """IP bloquées par un seul worker, chacune jusqu'à son expiration"""
+
+    def __init__(self, max_size: int = 4096):
+        self.entries = TTLCache(max_size=max_size)
+
+    def __contains__(self, ip: str) -> bool:
+        return self.entries.get(ip) is not None
+
+    def add(self, ip: str, ttl: float):
+        self.entries.set(ip, True, ttl=ttl)
+
+    def __len__(self) -> int:
+        self.entries.purge_expired()
+        return len(self.entries._data)
 
 class SecurityMiddleware:
-    def __init__(self):
-        self.rate_limit_requests: Dict[str, list] = {}
-        self.rate_limit_window = 60  # 60 secondes
-        self.max_requests = 100  # 100 requêtes par minute
-        self.blocked_ips: Set[str] = set()
+    def __init__(self, rate_limiter: Optional[RateLimiter] = None,
+                 injection_scanner: Optional[InjectionScanner] = None):
+        # Limites par IP, utilisateur et route (100 requêtes par minute et par IP par défaut)
+        self.rate_limiter = rate_limiter or rate_limiter_from_env()
+        self.injection_scanner = injection_scanner or InjectionScanner(
+            max_body_size=int(os.environ.get("INJECTION_SCAN_MAX_BODY", "65536")),
+            exempt_routes=filter(None, os.environ.get("INJECTION_SCAN_EXEMPT_ROUTES", "").split(","))
+        )
+        # Routes dispensées du contrôle de Content-Type (TradingView envoie ses alertes en text/plain)
+        self.content_type_exempt_routes = tuple(
+            filter(None, os.environ.get("SECURITY_CONTENT_TYPE_EXEMPT_ROUTES", "/webhook/").split(","))
+        )
+        # Mode multi-workers : une IP bloquée par un worker l'est pour tout le nœud
+        self.blocked_ips = shared_state.blocked_ips if shared_state is not None else BlockList()
+        # Durée du blocage d'une IP après une tentative d'injection (secondes)
+        self.block_ttl = float(os.environ.get("SECURITY_BLOCK_TTL", "900"))
+        # Routes signées (webhook TradingView) : requête suspecte refusée sans bloquer l'IP émettrice
+        self.block_exempt_routes = tuple(
+            filter(None, os.environ.get("SECURITY_BLOCK_EXEMPT_ROUTES", "/webhook/").split(","))
+        )
         
     async def __call__(self, request: Request, call_next):
         # Vérification de l'IP
@@ -24,10 +59,12 @@ class SecurityMiddleware:
             )
         
         # Rate limiting
-        if not await self._check_rate_limit(client_ip):
+        retry_after = await self._check_rate_limit(request, client_ip)
+        if retry_after is not None:
             return JSONResponse(
                 status_code=429,
-                content={"detail": "Trop de requêtes. Veuillez réessayer plus tard."}
+                content={"detail": "Trop de requêtes. Veuillez réessayer plus tard."},
+                headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
             )
         
         # Validation des headers de sécurité
@@ -39,7 +76,8 @@ class SecurityMiddleware:
         
         # Protection contre les attaques par injection
         if await self._detect_injection_attempt(request):
-            self.blocked_ips.add(client_ip)
+            if not request.url.path.startswith(self.block_exempt_routes):
+                self.blocked_ips.add(client_ip, self.block_ttl)
             return JSONResponse(
                 status_code=403,
                 content={"detail": "Tentative d'attaque détectée"}
@@ -56,57 +94,58 @@ class SecurityMiddleware:
         
         return response
     
-    async def _check_rate_limit(self, client_ip: str) -> bool:
-        current_time = time.time()
-        
-        if client_ip not in self.rate_limit_requests:
-            self.rate_limit_requests[client_ip] = []
-        
-        # Nettoyer les anciennes requêtes
-        self.rate_limit_requests[client_ip] = [
-            req_time for req_time in self.rate_limit_requests[client_ip]
-            if current_time - req_time < self.rate_limit_window
-        ]
-        
-        # Vérifier la limite
-        if len(self.rate_limit_requests[client_ip]) >= self.max_requests:
-            return False
-        
-        # Ajouter la requête actuelle
-        self.rate_limit_requests[client_ip].append(current_time)
-        return True
+    async def _check_rate_limit(self, request: Request, client_ip: str) -> Optional[float]:
+        """Retourne None si la requête est autorisée, sinon le délai avant nouvel essai"""
+        return await self.rate_limiter.check(client_ip, request.url.path, self._user_key(request))
+    
+    def _user_key(self, request: Request) -> Optional[str]:
+        """Identifier l'appelant dont le jeton a déjà été vérifié par get_current_user
+
+        Jeton inconnu du cache (pas encore vérifié, ou inventé) : None, l'appelant est limité par IP.
+        """
+        authorization = request.headers.get("authorization", "")
+        if not authorization.lower().startswith("bearer "):
+            return None
+        user_id = principal_cache.get_token(authorization[7:])
+        return f"user:{user_id}" if user_id is not None else None
     
     async def _validate_security_headers(self, request: Request) -> bool:
-        # Vérifier User-Agent
+        # Vérifier User-Agent (absent autorisé : webhooks et clients HTTP minimalistes)
         user_agent = request.headers.get("user-agent", "")
-        if not user_agent or len(user_agent) > 500:
+        if len(user_agent) > 500:
             return False
         
-        # Vérifier Content-Type pour les requêtes POST/PUT
-        if request.method in ["POST", "PUT", "PATCH"]:
+        # Vérifier Content-Type pour les requêtes POST/PUT avec un body (/users/login n'en a pas)
+        if request.method in ["POST", "PUT", "PATCH"] and self._has_body(request):
+            if request.url.path.startswith(self.content_type_exempt_routes):
+                return True
             content_type = request.headers.get("content-type", "")
             if not content_type.startswith("application/json"):
                 return False
         
         return True
     
+    def _has_body(self, request: Request) -> bool:
+        if "transfer-encoding" in request.headers:
+            return True
+        return request.headers.get("content-length", "0") not in ("", "0")
+    
     async def _detect_injection_attempt(self, request: Request) -> bool:
-        # Mots-clés suspects pour détecter les injections SQL
-        suspicious_patterns = [
-            "'; DROP TABLE", "UNION SELECT", "OR 1=1", "'; --",
-            "<script>", "javascript:", "onload=", "onerror="
-        ]
-        
-        # Vérifier l'URL
-        url = str(request.url)
-        for pattern in suspicious_patterns:
-            if pattern.lower() in url.lower():
-                return True
+        path = request.url.path
+        if self.injection_scanner.is_exempt(path):
+            return False
         
-        # Vérifier les paramètres de requête
-        for param_name, param_value in request.query_params.items():
-            for pattern in suspicious_patterns:
-                if pattern.lower() in str(param_value).lower():
-                    return True
+        # URL, paramètres et body (webhooks, ordres) analysés en une seule passe
+        body = b""
+        if request.method in ["POST", "PUT", "PATCH"] and self._scannable_body(request):
+            # Body mis en cache par Starlette (>= 0.28) et rejoué pour l'application en aval
+            body = await request.body()
         
-        return False 
\ No newline at end of file
+        return self.injection_scanner.scan(path, request.url.query, body) is not None
+    
+    def _scannable_body(self, request: Request) -> bool:
+        """Body de taille déclarée, dans la limite d'analyse : les autres ne sont pas chargés en mémoire ici"""
+        content_length = request.headers.get("content-length", "")
+        if not content_length.isdigit():
+            return False
+        return 0 < int(content_length) <= self.injection_scanner.max_body_size
\ No newline at end of file
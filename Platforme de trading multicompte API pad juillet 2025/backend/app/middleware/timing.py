@@ -0,0 +1,52 @@
+import random
+import time
+from typing import Optional
+from ..services.monitoring import MonitoringService, monitoring_service
+from ..utils.timing import begin_request, end_request
+
+class TimingMiddleware:
+    """Middleware ASGI mesurant chaque requête, par gabarit de route et par étape
+
+    La latence et les erreurs sont enregistrées pour toutes les requêtes ; le détail
+    par étape (auth, db, exchange, notification) n'est relevé que pour une fraction
+    `sample_rate` des requêtes.
+    """
+
+    def __init__(self, app, monitoring: MonitoringService = monitoring_service, sample_rate: float = 1.0):
+        self.app = app
+        self.monitoring = monitoring
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = begin_request() if self.sample_rate >= 1 or random.random() < self.sample_rate else None
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            stages = end_request(token) if token is not None else None
+            await self.monitoring.log_performance(
+                f"{scope['method']} {self._route_template(scope)}",
+                elapsed,
+                error=status >= 500,
+                stages=stages
+            )
+
+    def _route_template(self, scope) -> str:
+        """Gabarit de la route ("/trading/history"), jamais l'URL brute : cardinalité bornée"""
+        route = scope.get("route")
+        path: Optional[str] = getattr(route, "path_format", None) or getattr(route, "path", None)
+        # Route non résolue (404, requête rejetée par la sécurité)
+        return path or "unmatched"
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, Float, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
@@ -18,6 +18,7 @@ class User(Base):
     deposits = relationship("Deposit", back_populates="user")
     withdrawals = relationship("Withdrawal", back_populates="user")
     alerts = relationship("Alert", back_populates="user")
+    subscriptions = relationship("StrategySubscription", back_populates="user")
 
 class APIKey(Base):
     __tablename__ = "api_keys"
@@ -29,6 +30,7 @@ class APIKey(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     owner = relationship("User", back_populates="api_keys")
+    subscriptions = relationship("StrategySubscription", back_populates="api_key")
 
 class Trade(Base):
     __tablename__ = "trades"
@@ -39,7 +41,7 @@ class Trade(Base):
     price = Column(Float, nullable=False)
     pnl = Column(Float)
     strategy = Column(String)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)  # Clé de partition (mensuelle)
     user_id = Column(Integer, ForeignKey("users.id"))
     exchange = Column(String, nullable=False)
 
@@ -80,4 +82,75 @@ class Alert(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User", back_populates="alerts") 
\ No newline at end of file
+    user = relationship("User", back_populates="alerts") 
+
+class StrategySubscription(Base):
+    __tablename__ = "strategy_subscriptions"
+    id = Column(Integer, primary_key=True, index=True)
+    strategy = Column(String, nullable=False, index=True)
+    quantity = Column(Float, nullable=True)  # Surcharge la quantité du signal si renseignée
+    is_active = Column(Boolean, default=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    api_key_id = Column(Integer, ForeignKey("api_keys.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    user = relationship("User", back_populates="subscriptions")
+    api_key = relationship("APIKey", back_populates="subscriptions")
+
+class PnLRollup(Base):
+    """Agrégats journaliers par utilisateur, stratégie, symbole et exchange"""
+    __tablename__ = "pnl_daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", "strategy", "symbol", "exchange", name="uq_pnl_daily_rollups_bucket"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    strategy = Column(String, nullable=False, default="")  # "" si le trade n'a pas de stratégie
+    symbol = Column(String, nullable=False)
+    exchange = Column(String, nullable=False)
+    trade_count = Column(Integer, nullable=False, default=0)
+    volume = Column(Float, nullable=False, default=0.0)
+    realized_pnl = Column(Float, nullable=False, default=0.0)
+    wins = Column(Integer, nullable=False, default=0)
+    losses = Column(Integer, nullable=False, default=0)
+    # Extrêmes du PnL cumulé dans la journée, nécessaires pour combiner les drawdowns
+    peak_pnl = Column(Float, nullable=False, default=0.0)
+    trough_pnl = Column(Float, nullable=False, default=0.0)
+    max_drawdown = Column(Float, nullable=False, default=0.0)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PriceTrigger(Base):
+    """Stop-loss / take-profit en attente, rechargés au démarrage du moteur de déclenchement"""
+    __tablename__ = "price_triggers"
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # stop_loss, take_profit
+    exchange = Column(String, nullable=False)
+    symbol = Column(String, nullable=False)
+    side = Column(String, nullable=False)  # Sens de l'ordre de clôture
+    quantity = Column(Float, nullable=False)
+    trigger_price = Column(Float, nullable=False)
+    strategy = Column(String)
+    status = Column(String, nullable=False, default="pending")  # pending, triggered, failed, canceled
+    # Trade d'entrée (SL et TP d'un même trade s'annulent mutuellement) ; pas de clé étrangère, trades est partitionnée
+    trade_id = Column(Integer)
+    closing_trade_id = Column(Integer, nullable=True)
+    triggered_price = Column(Float, nullable=True)
+    error = Column(String, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    api_key_id = Column(Integer, ForeignKey("api_keys.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    triggered_at = Column(DateTime, nullable=True)
+
+class ArchivedPosition(Base):
+    """Positions nettes cumulées des partitions de trades archivées (base du carnet de positions)"""
+    __tablename__ = "archived_positions"
+    __table_args__ = (
+        UniqueConstraint("user_id", "exchange", "symbol", name="uq_archived_positions_key"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    exchange = Column(String, nullable=False)
+    symbol = Column(String, nullable=False)
+    quantity = Column(Float, nullable=False, default=0.0)
+    net_cost = Column(Float, nullable=False, default=0.0)
+    user_id = Column(Integer, ForeignKey("users.id"))
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -68,4 +68,71 @@ class AlertOut(BaseModel):
     sent: bool
     created_at: datetime
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        orm_mode = True 
+
+class PerformanceOut(BaseModel):
+    group: str
+    trade_count: int
+    volume: float
+    realized_pnl: float
+    win_rate: Optional[float]
+    max_drawdown: float
+
+class PositionOut(BaseModel):
+    exchange: str
+    symbol: str
+    quantity: float
+    cost_price: Optional[float]
+    mark_price: Optional[float]
+    notional: Optional[float]
+
+class TriggerOut(BaseModel):
+    id: int
+    kind: str
+    exchange: str
+    symbol: str
+    side: str
+    quantity: float
+    trigger_price: float
+    strategy: Optional[str]
+    status: str
+    trade_id: Optional[int]
+    closing_trade_id: Optional[int]
+    triggered_price: Optional[float]
+    error: Optional[str]
+    created_at: datetime
+    triggered_at: Optional[datetime]
+    class Config:
+        orm_mode = True
+
+class OrderIn(BaseModel):
+    symbol: str
+    side: str
+    quantity: float
+    exchange: str
+    strategy: Optional[str] = None
+
+    @validator("side")
+    def validate_side(cls, value):
+        if value not in ["BUY", "SELL"]:
+            raise ValueError("side doit valoir BUY ou SELL")
+        return value
+
+    @validator("quantity")
+    def validate_quantity(cls, value):
+        if value <= 0:
+            raise ValueError("quantity doit être positive")
+        return value
+
+class BatchOrderResult(BaseModel):
+    index: int
+    status: str
+    trade_id: Optional[int] = None
+    order_id: Optional[str] = None
+    price: Optional[float] = None
+    error: Optional[str] = None
+
+class BatchExecuteOut(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BatchOrderResult]
\ No newline at end of file
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+import aiohttp
+
+# Taille maximale d'un message Telegram
+TELEGRAM_MAX_LENGTH = 4096
+
+class AlertDispatcher:
+    """Envoi des alertes et notifications en tâche de fond
+
+    Les appelants déposent les messages sans attendre de réseau. Le dispatcher possède
+    une session HTTP persistante, regroupe les alertes identiques sur une fenêtre de temps,
+    agrège les notifications de trades en digests et respecte le débit Telegram par chat.
+    """
+
+    def __init__(self, coalesce_window: float = 60.0, digest_interval: float = 5.0,
+                 digest_max_items: int = 20, telegram_interval: float = 1.0, max_queue: int = 1000):
+        self.logger = logging.getLogger(__name__)
+        self.webhook_url = os.environ.get("ALERT_WEBHOOK_URL")
+        self.telegram_bot_token = os.environ.get("TELEGRAM_BOT_TOKEN")
+        self.telegram_chat_id = os.environ.get("TELEGRAM_CHAT_ID")
+        self.telegram_api_url = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
+        self.coalesce_window = coalesce_window
+        self.digest_interval = digest_interval
+        self.digest_max_items = digest_max_items
+        self.telegram_interval = telegram_interval
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.tasks: List[asyncio.Task] = []
+        # Clé de regroupement -> [fin de fenêtre, alertes supprimées, type, message]
+        self.coalesced: Dict[str, list] = {}
+        self.digest: List[str] = []
+        self.chat_next_send: Dict[str, float] = {}
+        self.stats = {"sent": 0, "failed": 0, "dropped": 0, "coalesced": 0, "digested": 0}
+
+    async def start(self):
+        """Ouvrir la session HTTP et démarrer l'envoi en tâche de fond"""
+        if self.tasks:
+            return
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=10)
+        )
+        self.tasks = [asyncio.create_task(self._sender()), asyncio.create_task(self._flusher())]
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Vider les digests et la file d'envoi, puis fermer la session"""
+        self._flush_digest()
+        self._flush_coalesced(force=True)
+        if self.tasks:
+            try:
+                await asyncio.wait_for(self.outbox.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning(f"Arrêt du dispatcher avec {self.outbox.qsize()} messages non envoyés")
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            self.tasks = []
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def submit_alert(self, alert_type: str, message: str, key: Optional[str] = None) -> bool:
+        """Déposer une alerte ; retourne False si elle a été regroupée avec une alerte récente"""
+        key = key or f"{alert_type}:{message}"
+        now = time.monotonic()
+        entry = self.coalesced.get(key)
+        if entry and now < entry[0]:
+            entry[1] += 1
+            self.stats["coalesced"] += 1
+            return False
+        self.coalesced[key] = [now + self.coalesce_window, 0, alert_type, message]
+        self._enqueue_alert(alert_type, message)
+        return True
+
+    def submit_trade_notification(self, message: str):
+        """Ajouter une notification de trade au prochain digest"""
+        self.digest.append(message.strip())
+        self.stats["digested"] += 1
+        if len(self.digest) >= self.digest_max_items:
+            self._flush_digest()
+
+    def _enqueue_alert(self, alert_type: str, message: str):
+        alert_data = {
+            "type": alert_type,
+            "message": message,
+            "timestamp": datetime.utcnow().isoformat(),
+            "service": "trading-api"
+        }
+        if self.webhook_url:
+            self._put("webhook", self.webhook_url, alert_data)
+        if self.telegram_bot_token and self.telegram_chat_id:
+            text = f"🚨 ALERTE {alert_data['type']}\n\n{alert_data['message']}\n\n⏰ {alert_data['timestamp']}"
+            self._put("telegram", self.telegram_chat_id, text)
+
+    def _put(self, channel: str, target: str, payload):
+        try:
+            self.outbox.put_nowait((channel, target, payload))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            self.logger.error(f"File d'alertes saturée, message {channel} abandonné")
+
+    def _flush_digest(self):
+        if not self.digest:
+            return
+        items, self.digest = self.digest, []
+        if not (self.telegram_bot_token and self.telegram_chat_id):
+            return
+        for text in _digest_messages(items):
+            self._put("telegram", self.telegram_chat_id, text)
+
+    def _flush_coalesced(self, force: bool = False):
+        """Clore les fenêtres expirées et signaler les alertes regroupées"""
+        now = time.monotonic()
+        for key, (window_end, suppressed, alert_type, message) in list(self.coalesced.items()):
+            if force or now >= window_end:
+                del self.coalesced[key]
+                if suppressed:
+                    self._enqueue_alert(alert_type, f"{message}\n(+{suppressed} alertes similaires)")
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(self.digest_interval)
+            self._flush_digest()
+            self._flush_coalesced()
+
+    async def _sender(self):
+        while True:
+            channel, target, payload = await self.outbox.get()
+            try:
+                if channel == "telegram":
+                    await self._send_telegram(target, payload)
+                else:
+                    await self._send_webhook(target, payload)
+            except Exception as e:
+                self.stats["failed"] += 1
+                self.logger.error(f"Erreur envoi {channel}: {e}")
+            finally:
+                self.outbox.task_done()
+
+    async def _send_webhook(self, url: str, alert_data: Dict):
+        async with self.session.post(url, json=alert_data) as response:
+            if response.status != 200:
+                self.stats["failed"] += 1
+                self.logger.error(f"Échec envoi webhook: {response.status}")
+                return
+        self.stats["sent"] += 1
+
+    async def _send_telegram(self, chat_id: str, text: str, attempts: int = 3):
+        url = f"{self.telegram_api_url}/bot{self.telegram_bot_token}/sendMessage"
+        for _ in range(attempts):
+            # Respecter l'intervalle minimal entre deux messages d'un même chat
+            wait = self.chat_next_send.get(chat_id, 0.0) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.chat_next_send[chat_id] = time.monotonic() + self.telegram_interval
+
+            async with self.session.post(url, json={
+                "chat_id": chat_id,
+                "text": text,
+                "parse_mode": "HTML"
+            }) as response:
+                if response.status == 200:
+                    self.stats["sent"] += 1
+                    return
+                if response.status != 429:
+                    self.stats["failed"] += 1
+                    self.logger.error(f"Échec envoi Telegram: {response.status}")
+                    return
+                # Limite Telegram atteinte : attendre le délai indiqué
+                body = await response.json(content_type=None)
+                retry_after = body.get("parameters", {}).get("retry_after", 1)
+                self.chat_next_send[chat_id] = time.monotonic() + retry_after
+        self.stats["failed"] += 1
+        self.logger.error("Échec envoi Telegram: limite de débit persistante")
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "queue_depth": self.outbox.qsize(),
+            "pending_digest": len(self.digest),
+            "open_windows": len(self.coalesced)
+        }
+
+def _digest_messages(items: List[str]) -> List[str]:
+    """Regrouper les notifications en messages sous la limite Telegram"""
+    header = f"📬 {len(items)} trades exécutés\n\n"
+    separator = "\n\n―――\n\n"
+    messages = []
+    current = header
+    for item in items:
+        item = item[:TELEGRAM_MAX_LENGTH - len(header)]
+        candidate = current + (separator if current != header else "") + item
+        if len(candidate) > TELEGRAM_MAX_LENGTH:
+            messages.append(current)
+            current = header + item
+        else:
+            current = candidate
+    messages.append(current)
+    return messages
+
+alert_dispatcher = AlertDispatcher(
+    coalesce_window=float(os.environ.get("ALERT_COALESCE_WINDOW", "60")),
+    digest_interval=float(os.environ.get("ALERT_DIGEST_INTERVAL", "5")),
+    telegram_interval=float(os.environ.get("TELEGRAM_MIN_INTERVAL", "1"))
+)
\ No newline at end of file
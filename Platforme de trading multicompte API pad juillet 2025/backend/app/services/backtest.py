@@ -0,0 +1,600 @@
+"""Rejeu vectorisé des signaux enregistrés sur des bougies OHLCV historiques (backtest)
+
+Usage (depuis backend/) :
+    python -m app.services.backtest --signals signals.csv --ohlcv-dir data/ohlcv
+    python -m app.services.backtest --from-trades --user-id 1 --strategy ema_cross --ohlcv-dir data/ohlcv \\
+        --grid stop_loss_pct=0.01,0.02 take_profit_pct=0.02,0.04 size=0.5,1 --workers 4 --equity-out equity.csv
+
+Signaux : fichier CSV ou Parquet (colonnes timestamp, symbol, side, strategy, quantity et, optionnelles,
+stop_loss, take_profit en prix ; une archive trades_AAAA_MM.parquet convient), ou trades d'un compte en base
+(--from-trades, hors clôtures SL/TP, niveaux SL/TP repris des déclencheurs enregistrés).
+Bougies : un fichier <SYMBOLE>.csv ou <SYMBOLE>.parquet par symbole (timestamp d'ouverture ISO ou epoch,
+open, high, low, close).
+
+Modèle d'exécution : ordres à l'ouverture de la première bougie qui suit le signal, positions nettes par
+stratégie et par symbole (comme le carnet de positions). Un signal opposé clôture les lots ouverts (FIFO)
+à hauteur de sa quantité ; seul le reliquat ouvre une position dans l'autre sens. Un lot sort aussi au
+premier stop-loss ou take-profit touché (stop-loss retenu si les deux le sont dans la même bougie, ouverture
+retenue en cas de gap), sinon à la clôture de la dernière bougie. Frais proportionnels à chaque exécution,
+glissement sur les ordres au marché.
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+
+from ..database import SessionLocal
+from ..models import PriceTrigger, Trade
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow optionnel : fichiers CSV uniquement
+    pq = None
+
+EPOCH = datetime(1970, 1, 1)
+
+# Motifs de sortie, dans l'ordre des codes
+EXIT_REASONS = ("signal", "stop_loss", "take_profit", "end")
+EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_END = range(4)
+
+# Quantité des signaux qui n'en précisent pas (comme le webhook TradingView)
+DEFAULT_QUANTITY = 0.01
+
+def read_columns(path: str) -> Dict[str, np.ndarray]:
+    """Colonnes d'un fichier CSV ou Parquet (noms en minuscules)"""
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError("Le package pyarrow est requis pour lire les fichiers Parquet")
+        table = pq.read_table(path)
+        return {
+            name.lower(): table.column(name).to_numpy(zero_copy_only=False)
+            for name in table.column_names
+        }
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader)]
+        rows = list(reader)
+    values = list(zip(*rows)) if rows else [()] * len(header)
+    return {name: np.array(column, dtype=object) for name, column in zip(header, values)}
+
+def _iso_millis(value) -> int:
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // timedelta(milliseconds=1)
+
+def to_millis(values: np.ndarray) -> np.ndarray:
+    """Horodatages (datetime, ISO ou epoch en secondes/millisecondes) en millisecondes UTC"""
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ms]").astype(np.int64)
+    try:
+        numbers = values.astype(np.float64)
+    except (TypeError, ValueError):
+        return np.array([_iso_millis(value) for value in values], dtype=np.int64)
+    return np.where(numbers < 1e11, numbers * 1000, numbers).astype(np.int64)
+
+def _float_column(columns: Dict[str, np.ndarray], name: str, size: int, default: float = np.nan) -> np.ndarray:
+    values = columns.get(name)
+    if values is None:
+        return np.full(size, default)
+    if values.dtype == object:
+        values = np.where((values == "") | np.equal(values, None), default, values)
+    return values.astype(np.float64)
+
+class Bars:
+    """Bougies d'un symbole, triées par horodatage d'ouverture (millisecondes)"""
+
+    __slots__ = ("times", "open", "high", "low", "close", "_extrema")
+
+    def __init__(self, times: np.ndarray, open: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+        order = np.argsort(times, kind="stable")
+        self.times = times[order]
+        self.open = open[order]
+        self.high = high[order]
+        self.low = low[order]
+        self.close = close[order]
+        self._extrema = None
+
+    def extrema(self) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """Tables creuses : plus bas minimal et plus haut maximal sur 2^j bougies à partir de chaque bougie
+
+        Calculées une fois par symbole (n log n valeurs) et partagées par tous les jeux de paramètres.
+        """
+        if self._extrema is None:
+            lows, highs = [self.low], [self.high]
+            span = 1
+            while span * 2 <= len(self):
+                lows.append(np.minimum(lows[-1][:-span], lows[-1][span:]))
+                highs.append(np.maximum(highs[-1][:-span], highs[-1][span:]))
+                span *= 2
+            self._extrema = (lows, highs)
+        return self._extrema
+
+    def __getstate__(self):
+        # Tables non transmises aux processus démarrés par spawn : recalculées sur place
+        return self.times, self.open, self.high, self.low, self.close
+
+    def __setstate__(self, state):
+        self.times, self.open, self.high, self.low, self.close = state
+        self._extrema = None
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> "Bars":
+        time_column = next(name for name in ("timestamp", "time", "open_time", "date") if name in columns)
+        size = len(columns[time_column])
+        return cls(
+            to_millis(columns[time_column]),
+            *(_float_column(columns, name, size) for name in ("open", "high", "low", "close"))
+        )
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+class Signals:
+    """Signaux en colonnes, triés par horodatage ; symboles et stratégies codés en entiers"""
+
+    __slots__ = ("times", "symbols", "sides", "strategies", "quantities", "stop_losses", "take_profits",
+                 "symbol_names", "strategy_names")
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        size = len(columns["symbol"])
+        order = np.argsort(to_millis(columns["timestamp"]), kind="stable")
+        self.times = to_millis(columns["timestamp"])[order]
+        self.symbol_names, self.symbols = np.unique(columns["symbol"][order].astype(str), return_inverse=True)
+        strategies = columns.get("strategy", np.full(size, "", dtype=object))[order]
+        self.strategy_names, self.strategies = np.unique(
+            np.where(np.equal(strategies, None), "", strategies).astype(str), return_inverse=True
+        )
+        sides = np.char.upper(columns["side"][order].astype(str))
+        if not np.isin(sides, ("BUY", "SELL")).all():
+            raise ValueError("Colonne side : BUY ou SELL attendu")
+        self.sides = np.where(sides == "BUY", 1.0, -1.0)
+        self.quantities = _float_column(columns, "quantity", size, DEFAULT_QUANTITY)[order]
+        self.stop_losses = _float_column(columns, "stop_loss", size)[order]
+        self.take_profits = _float_column(columns, "take_profit", size)[order]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+class BacktestParams:
+    """Jeu de paramètres rejoué sur les signaux"""
+
+    __slots__ = ("size", "notional", "stop_loss_pct", "take_profit_pct", "fee_rate", "slippage_bps")
+
+    def __init__(self, size: float = 1.0, notional: Optional[float] = None, stop_loss_pct: Optional[float] = None,
+                 take_profit_pct: Optional[float] = None, fee_rate: float = 0.001, slippage_bps: float = 0.0):
+        # Multiplicateur de la quantité du signal, ou montant fixe par trade (notional)
+        self.size = size
+        self.notional = notional
+        # Écarts SL/TP relatifs au prix d'entrée ; à défaut, niveaux portés par le signal
+        self.stop_loss_pct = stop_loss_pct
+        self.take_profit_pct = take_profit_pct
+        self.fee_rate = fee_rate
+        self.slippage_bps = slippage_bps
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+def _net_lots(entry_bar: np.ndarray, side: np.ndarray, quantity: np.ndarray, strategy: np.ndarray,
+              hit_bar: np.ndarray, end: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Netting des signaux (triés) par stratégie ; retourne, par fragment de lot : signal d'ouverture,
+    quantité et bougie de clôture par un signal opposé (end si le lot n'est pas clôturé par un signal)
+
+    Seule passe séquentielle du modèle, en O(signaux + fragments) : les sorties SL/TP (hit_bar, -1 si
+    aucune) ne dépendent que du lot et sont calculées avant, de façon vectorisée.
+    """
+    entries, sides, quantities = entry_bar.tolist(), side.tolist(), quantity.tolist()
+    hits = np.where(hit_bar >= 0, hit_bar, end).tolist()
+    open_lots: Dict[int, List[List]] = defaultdict(list)
+    fragments: List[Tuple[int, float, int]] = []
+    for index, (bar, strategy_code) in enumerate(zip(entries, strategy.tolist())):
+        held = open_lots[strategy_code]
+        if held:
+            # Lots sortis sur SL/TP avant cette bougie : clôturés par leur déclencheur
+            for lot in held:
+                if hits[lot[0]] < bar:
+                    fragments.append((lot[0], lot[1], end))
+            held[:] = [lot for lot in held if hits[lot[0]] >= bar]
+        remaining = quantities[index]
+        while held and remaining > 0 and sides[held[0][0]] != sides[index]:
+            lot = held[0]
+            closed = min(lot[1], remaining)
+            fragments.append((lot[0], closed, bar))
+            remaining -= closed
+            lot[1] -= closed
+            if lot[1] <= 1e-12 * quantities[lot[0]]:
+                held.pop(0)
+        if remaining > 1e-12 * quantities[index]:
+            held.append([index, remaining])
+    fragments += [(signal, size, end) for held in open_lots.values() for signal, size in held]
+    lots, sizes, closes = zip(*fragments) if fragments else ((), (), ())
+    return np.array(lots, dtype=np.int64), np.array(sizes, dtype=np.float64), np.array(closes, dtype=np.int64)
+
+def _first_crossing(table: List[np.ndarray], start: np.ndarray, end: np.ndarray, threshold: np.ndarray,
+                    below: bool) -> np.ndarray:
+    """Première bougie de [start, end) dont le plus bas passe sous le seuil (below) ou dont le plus haut
+    le dépasse ; end si aucune
+
+    Remontée binaire sur la table creuse : log2(n) étapes vectorisées, quelle que soit la durée des trades.
+    """
+    position = start.copy()
+    for level in range(len(table) - 1, -1, -1):
+        span = 1 << level
+        fits = position + span <= end
+        extreme = table[level][np.where(fits, position, 0)]
+        # Fenêtre de 2^level bougies sans franchissement : sautée
+        clear = fits & (extreme > threshold if below else extreme < threshold)
+        position = np.where(clear, position + span, position)
+    return position
+
+def _first_hits(bars: Bars, entry_bar: np.ndarray, end_bar: np.ndarray, side: np.ndarray,
+                stop_loss: np.ndarray, take_profit: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Première bougie de [entrée, end_bar) où le stop-loss ou le take-profit est touché (-1 sinon),
+    et si c'est le stop-loss (retenu si les deux le sont dans la même bougie)"""
+    lows, highs = bars.extrema()
+    long = side > 0
+    # Long : stop sous le prix (plus bas), take-profit au-dessus (plus haut) ; l'inverse en short
+    low_level = np.where(long, stop_loss, take_profit)
+    high_level = np.where(long, take_profit, stop_loss)
+    low_cross = _first_crossing(lows, entry_bar, end_bar, np.where(np.isnan(low_level), -np.inf, low_level), True)
+    high_cross = _first_crossing(highs, entry_bar, end_bar, np.where(np.isnan(high_level), np.inf, high_level), False)
+    stop_bar = np.where(long, low_cross, high_cross)
+    take_bar = np.where(long, high_cross, low_cross)
+    first = np.minimum(stop_bar, take_bar)
+    hit = first < end_bar
+    return np.where(hit, first, -1), hit & (stop_bar <= take_bar)
+
+def simulate(bars: Bars, signals: Signals, mask: np.ndarray, params: BacktestParams,
+             strategy_count: int) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """Trades simulés des signaux `mask` sur les bougies d'un symbole, et PnL cumulé (réalisé + latent)
+    par stratégie à chaque bougie (tableau stratégies x bougies)
+
+    Un trade est un fragment de lot : la part d'une position ouverte par un signal et clôturée en une fois.
+    """
+    n = len(bars)
+    entry_bar = np.searchsorted(bars.times, signals.times[mask], side="left")
+    valid = entry_bar < n
+    entry_bar = entry_bar[valid]
+    side = signals.sides[mask][valid]
+    strategy = signals.strategies[mask][valid]
+
+    slippage = params.slippage_bps / 10000
+    entry_price = bars.open[entry_bar] * (1 + side * slippage)
+    if params.notional:
+        quantity = params.notional / entry_price
+    else:
+        quantity = signals.quantities[mask][valid] * params.size
+    stop_loss = (entry_price * (1 - side * params.stop_loss_pct) if params.stop_loss_pct is not None
+                 else signals.stop_losses[mask][valid])
+    take_profit = (entry_price * (1 + side * params.take_profit_pct) if params.take_profit_pct is not None
+                   else signals.take_profits[mask][valid])
+
+    # SL/TP de chaque lot potentiel examinés jusqu'à la dernière bougie, puis netting des signaux
+    lot_hit_bar, lot_hit_stop = _first_hits(bars, entry_bar, np.full(len(entry_bar), n), side, stop_loss, take_profit)
+    lot, quantity, signal_bar = _net_lots(entry_bar, side, quantity, strategy, lot_hit_bar, n)
+    entry_bar, side, strategy = entry_bar[lot], side[lot], strategy[lot]
+    entry_price, stop_loss, take_profit = entry_price[lot], stop_loss[lot], take_profit[lot]
+    # Le déclencheur ne compte que s'il est touché avant la clôture par un signal
+    hit_bar = np.where(lot_hit_bar[lot] < signal_bar, lot_hit_bar[lot], -1)
+    hit_stop = lot_hit_stop[lot]
+
+    hit = hit_bar >= 0
+    safe_hit_bar = np.where(hit, hit_bar, 0)
+    hit_open = bars.open[safe_hit_bar]
+    long = side > 0
+    stop_fill = np.where(long, np.minimum(hit_open, stop_loss), np.maximum(hit_open, stop_loss)) * (1 - side * slippage)
+    take_fill = np.where(long, np.maximum(hit_open, take_profit), np.minimum(hit_open, take_profit))
+    at_end = signal_bar >= n
+    time_fill = np.where(at_end, bars.close[n - 1], bars.open[np.minimum(signal_bar, n - 1)]) * (1 - side * slippage)
+
+    reason = np.select(
+        [hit & hit_stop, hit, at_end],
+        [EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_END],
+        default=EXIT_SIGNAL
+    )
+    exit_price = np.select([reason == EXIT_STOP_LOSS, reason == EXIT_TAKE_PROFIT], [stop_fill, take_fill],
+                           default=time_fill)
+    exit_bar = np.where(hit, hit_bar, np.minimum(signal_bar, n - 1))
+    fees = params.fee_rate * quantity * (entry_price + exit_price)
+    pnl = side * quantity * (exit_price - entry_price) - fees
+
+    # PnL réalisé cumulé, plus le latent des positions ouvertes marqué à la clôture de chaque bougie :
+    # sur [entrée, sortie), side * quantité * close + constante, sommés via des tableaux de différences
+    index = np.concatenate([strategy * n + entry_bar, strategy * n + exit_bar])
+
+    def steps(weights_at_entry: np.ndarray, weights_at_exit: np.ndarray) -> np.ndarray:
+        diff = np.bincount(index, weights=np.concatenate([weights_at_entry, weights_at_exit]),
+                           minlength=strategy_count * n).reshape(strategy_count, n)
+        return np.cumsum(diff, axis=1, out=diff)
+
+    exposure = side * quantity
+    offset = -quantity * entry_price * (side + params.fee_rate)
+    levels = steps(exposure, -exposure)
+    levels *= bars.close
+    levels += steps(offset, pnl - offset)
+
+    trades = {
+        "strategy": strategy,
+        "side": side,
+        "entry_time": bars.times[entry_bar],
+        "exit_time": bars.times[exit_bar],
+        "quantity": quantity,
+        "entry_price": entry_price,
+        "exit_price": exit_price,
+        "fees": fees,
+        "pnl": pnl,
+        "reason": reason
+    }
+    return trades, levels
+
+def _max_drawdown(equity: np.ndarray) -> Tuple[float, float]:
+    """Plus forte baisse depuis un plus haut, en valeur et en proportion du plus haut"""
+    if not len(equity):
+        return 0.0, 0.0
+    peak = np.maximum.accumulate(equity)
+    drawdown = peak - equity
+    ratio = np.divide(drawdown, peak, out=np.zeros_like(drawdown), where=peak > 0)
+    return float(drawdown.max()), float(ratio.max())
+
+def run_backtest(market: Dict[str, Bars], signals: Signals, params: BacktestParams,
+                 capital: float = 10000.0, with_curve: bool = False) -> Dict:
+    """Rejouer les signaux avec un jeu de paramètres ; résumé global et par stratégie"""
+    strategy_count = len(signals.strategy_names)
+    results, curves, skipped = [], [], 0
+    for code, symbol in enumerate(signals.symbol_names):
+        mask = signals.symbols == code
+        bars = market.get(symbol)
+        if bars is None or not len(bars):
+            skipped += int(mask.sum())
+            continue
+        trades, levels = simulate(bars, signals, mask, params, strategy_count)
+        # Signaux postérieurs à la dernière bougie
+        skipped += int((signals.times[mask] > bars.times[-1]).sum())
+        results.append(trades)
+        curves.append((bars.times, levels))
+
+    trades = {
+        name: np.concatenate([result[name] for result in results]) if results else np.zeros(0)
+        for name in ("strategy", "pnl", "fees", "reason")
+    }
+    strategy = trades["strategy"].astype(np.int64)
+    pnl = trades["pnl"]
+
+    # Courbes des symboles ramenées sur l'union de leurs horodatages (dernier niveau reporté)
+    if len(curves) == 1:
+        times, levels = curves[0]
+    else:
+        times = np.unique(np.concatenate([bar_times for bar_times, _ in curves])) if curves else np.zeros(0, np.int64)
+        levels = np.zeros((strategy_count, len(times)))
+        for bar_times, symbol_levels in curves:
+            position = np.searchsorted(bar_times, times, side="right") - 1
+            levels += np.where(position >= 0, symbol_levels[:, np.maximum(position, 0)], 0.0)
+    equity = capital + levels.sum(axis=0)
+    max_drawdown, max_drawdown_pct = _max_drawdown(equity)
+
+    trade_counts = np.bincount(strategy, minlength=strategy_count)
+    strategy_pnl = np.bincount(strategy, weights=pnl, minlength=strategy_count)
+    strategy_fees = np.bincount(strategy, weights=trades["fees"], minlength=strategy_count)
+    strategy_wins = np.bincount(strategy, weights=pnl > 0, minlength=strategy_count)
+    # Plus forte baisse du PnL cumulé de chaque stratégie depuis son plus haut
+    drawdowns = np.zeros(strategy_count)
+    if len(times):
+        peaks = np.maximum.accumulate(levels, axis=1)
+        peaks -= levels
+        drawdowns = peaks.max(axis=1)
+    strategies = {}
+    for code, name in enumerate(signals.strategy_names):
+        if not trade_counts[code]:
+            continue
+        strategies[name] = {
+            "trades": int(trade_counts[code]),
+            "pnl": float(strategy_pnl[code]),
+            "fees": float(strategy_fees[code]),
+            "win_rate": float(strategy_wins[code] / trade_counts[code]),
+            "max_drawdown": float(drawdowns[code])
+        }
+
+    exits = np.bincount(trades["reason"].astype(np.int64), minlength=len(EXIT_REASONS))
+    summary = {
+        "params": params.to_dict(),
+        "trades": len(pnl),
+        "signals_skipped": skipped,
+        "pnl": float(pnl.sum()),
+        "fees": float(trades["fees"].sum()),
+        "win_rate": float((pnl > 0).mean()) if len(pnl) else 0.0,
+        "final_equity": float(equity[-1]) if len(equity) else capital,
+        "max_drawdown": max_drawdown,
+        "max_drawdown_pct": max_drawdown_pct,
+        "exits": dict(zip(EXIT_REASONS, exits.tolist())),
+        "strategies": strategies
+    }
+    if with_curve:
+        summary["curve"] = {
+            "times": times,
+            "equity": equity,
+            "drawdown": np.maximum.accumulate(equity) - equity if len(equity) else equity,
+            "strategies": dict(zip(signals.strategy_names, levels))
+        }
+    return summary
+
+# Données chargées une fois par processus du pool
+_worker_data: Optional[Tuple[Dict[str, Bars], Signals, float]] = None
+
+def _init_worker(market: Dict[str, Bars], signals: Signals, capital: float):
+    global _worker_data
+    _worker_data = (market, signals, capital)
+
+def _run_worker(params: BacktestParams) -> Dict:
+    market, signals, capital = _worker_data
+    return run_backtest(market, signals, params, capital)
+
+def run_grid(market: Dict[str, Bars], signals: Signals, param_sets: Sequence[BacktestParams],
+             capital: float = 10000.0, workers: int = 1) -> List[Dict]:
+    """Rejouer plusieurs jeux de paramètres, répartis sur un pool de processus"""
+    if workers <= 1 or len(param_sets) <= 1:
+        return [run_backtest(market, signals, params, capital) for params in param_sets]
+    # Tables creuses calculées avant le pool : partagées en copie sur écriture par les processus forkés
+    for bars in market.values():
+        bars.extrema()
+    workers = min(workers, len(param_sets))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(market, signals, capital)) as pool:
+        return list(pool.map(_run_worker, param_sets, chunksize=max(1, len(param_sets) // (workers * 4))))
+
+def parameter_grid(base: BacktestParams, grid: Sequence[str]) -> List[BacktestParams]:
+    """Produit cartésien des valeurs "nom=v1,v2" appliqué aux paramètres de base"""
+    axes = []
+    for item in grid:
+        name, values = item.split("=", 1)
+        if name not in BacktestParams.__slots__:
+            raise ValueError(f"Paramètre inconnu: {name}")
+        axes.append([(name, None if value in ("", "none") else float(value)) for value in values.split(",")])
+    return [BacktestParams(**{**base.to_dict(), **dict(combination)}) for combination in itertools.product(*axes)]
+
+def load_market(directory: str, symbols: Sequence[str]) -> Dict[str, Bars]:
+    """Bougies des symboles disponibles dans le répertoire (<SYMBOLE>.parquet ou .csv)"""
+    market = {}
+    for symbol in symbols:
+        for extension in (".parquet", ".csv"):
+            path = os.path.join(directory, f"{symbol}{extension}")
+            if os.path.exists(path):
+                market[symbol] = Bars.from_columns(read_columns(path))
+                break
+    return market
+
+async def load_trade_signals(user_id: int, strategies: Optional[Sequence[str]] = None,
+                             start: Optional[datetime] = None, end: Optional[datetime] = None,
+                             session_factory=SessionLocal) -> Dict[str, np.ndarray]:
+    """Trades d'un compte rejoués comme signaux, avec les niveaux SL/TP de leurs déclencheurs
+
+    Les trades de clôture des déclencheurs sont exclus : le backtest simule ses propres sorties.
+    """
+    stop_loss = aliased(PriceTrigger)
+    take_profit = aliased(PriceTrigger)
+    closing_trades = select(PriceTrigger.closing_trade_id).where(PriceTrigger.closing_trade_id.isnot(None))
+    query = (
+        select(Trade.timestamp, Trade.symbol, Trade.side, Trade.strategy, Trade.quantity,
+               stop_loss.trigger_price, take_profit.trigger_price)
+        .outerjoin(stop_loss, (stop_loss.trade_id == Trade.id) & (stop_loss.kind == "stop_loss"))
+        .outerjoin(take_profit, (take_profit.trade_id == Trade.id) & (take_profit.kind == "take_profit"))
+        .where(Trade.user_id == user_id, Trade.strategy.isnot(None), Trade.id.notin_(closing_trades))
+        .order_by(Trade.timestamp, Trade.id)
+    )
+    if strategies:
+        query = query.where(Trade.strategy.in_(strategies))
+    if start:
+        query = query.where(Trade.timestamp >= start)
+    if end:
+        query = query.where(Trade.timestamp < end)
+    async with session_factory() as db:
+        rows = (await db.execute(query)).all()
+    names = ("timestamp", "symbol", "side", "strategy", "quantity", "stop_loss", "take_profit")
+    values = list(zip(*rows)) if rows else [()] * len(names)
+    return {name: np.array(column, dtype=object) for name, column in zip(names, values)}
+
+def _filter_columns(columns: Dict[str, np.ndarray], strategies: Optional[Sequence[str]],
+                    start: Optional[datetime], end: Optional[datetime]) -> Dict[str, np.ndarray]:
+    keep = np.ones(len(columns["symbol"]), dtype=bool)
+    if strategies:
+        keep &= np.isin(columns["strategy"].astype(str), strategies)
+    if start or end:
+        times = to_millis(columns["timestamp"])
+        if start:
+            keep &= times >= _iso_millis(start)
+        if end:
+            keep &= times < _iso_millis(end)
+    return {name: values[keep] for name, values in columns.items()}
+
+def write_curve(path: str, curve: Dict):
+    """Courbe d'équité, drawdown et PnL cumulé par stratégie, au format CSV"""
+    names = list(curve["strategies"])
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", "equity", "drawdown"] + [f"pnl_{name}" for name in names])
+        stamps = curve["times"].astype("datetime64[ms]").astype(str)
+        columns = [curve["equity"], curve["drawdown"]] + [curve["strategies"][name] for name in names]
+        writer.writerows(zip(stamps, *(np.round(column, 8).tolist() for column in columns)))
+
+def _describe(params: Dict, varying: Sequence[str]) -> str:
+    return " ".join(f"{name}={params[name]}" for name in varying) or "paramètres de base"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--signals", help="fichier de signaux CSV ou Parquet")
+    source.add_argument("--from-trades", action="store_true", help="trades d'un compte en base (--user-id)")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--ohlcv-dir", required=True, help="répertoire des bougies (<SYMBOLE>.csv|.parquet)")
+    parser.add_argument("--strategy", action="append", help="stratégie à rejouer (répétable)")
+    parser.add_argument("--start", type=datetime.fromisoformat)
+    parser.add_argument("--end", type=datetime.fromisoformat)
+    parser.add_argument("--capital", type=float, default=10000.0)
+    parser.add_argument("--size", type=float, default=1.0, help="multiplicateur de la quantité du signal")
+    parser.add_argument("--notional", type=float, help="montant fixe par trade (remplace --size)")
+    parser.add_argument("--stop-loss-pct", type=float)
+    parser.add_argument("--take-profit-pct", type=float)
+    parser.add_argument("--fee-rate", type=float, default=0.001)
+    parser.add_argument("--slippage-bps", type=float, default=0.0)
+    parser.add_argument("--grid", nargs="*", default=[], help="valeurs à croiser, ex. stop_loss_pct=0.01,0.02")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--top", type=int, default=10, help="jeux de paramètres affichés")
+    parser.add_argument("--json", help="écrire tous les résultats dans ce fichier JSON")
+    parser.add_argument("--equity-out", help="écrire la courbe d'équité du meilleur jeu (CSV)")
+    args = parser.parse_args()
+
+    if args.from_trades:
+        if args.user_id is None:
+            parser.error("--from-trades requiert --user-id")
+        columns = asyncio.run(load_trade_signals(args.user_id, args.strategy, args.start, args.end))
+    else:
+        columns = _filter_columns(read_columns(args.signals), args.strategy, args.start, args.end)
+    signals = Signals(columns)
+    if not len(signals):
+        raise SystemExit("Aucun signal à rejouer")
+    market = load_market(args.ohlcv_dir, signals.symbol_names)
+    missing = sorted(set(signals.symbol_names) - set(market))
+    if missing:
+        print(f"bougies absentes (signaux ignorés) : {', '.join(missing)}")
+
+    base = BacktestParams(args.size, args.notional, args.stop_loss_pct, args.take_profit_pct,
+                          args.fee_rate, args.slippage_bps)
+    param_sets = parameter_grid(base, args.grid)
+    results = run_grid(market, signals, param_sets, args.capital, args.workers)
+    ranked = sorted(results, key=lambda result: result["pnl"], reverse=True)
+
+    varying = [item.split("=", 1)[0] for item in args.grid]
+    print(f"signaux : {len(signals)} ({len(signals.strategy_names)} stratégies, {len(signals.symbol_names)} symboles), "
+          f"{len(param_sets)} jeux de paramètres")
+    print(f"{'paramètres':<48}{'trades':>8}{'PnL':>14}{'drawdown max':>16}{'gagnants':>10}")
+    for result in ranked[:args.top]:
+        print(f"{_describe(result['params'], varying):<48}{result['trades']:>8}{result['pnl']:>14,.2f}"
+              f"{result['max_drawdown']:>10,.2f} ({result['max_drawdown_pct']:.1%}){result['win_rate']:>10.1%}")
+    best = ranked[0]
+    print(f"\nmeilleur jeu ({_describe(best['params'], varying)}) - sorties : "
+          + ", ".join(f"{reason} {count}" for reason, count in best["exits"].items()))
+    print(f"{'stratégie':<24}{'trades':>8}{'PnL':>14}{'frais':>12}{'drawdown max':>14}{'gagnants':>10}")
+    for name, stats in sorted(best["strategies"].items(), key=lambda item: item[1]["pnl"], reverse=True):
+        print(f"{name or '(aucune)':<24}{stats['trades']:>8}{stats['pnl']:>14,.2f}{stats['fees']:>12,.2f}"
+              f"{stats['max_drawdown']:>14,.2f}{stats['win_rate']:>10.1%}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(ranked, f, indent=2)
+    if args.equity_out:
+        curve = run_backtest(market, signals, BacktestParams(**best["params"]), args.capital, with_curve=True)["curve"]
+        write_curve(args.equity_out, curve)
+        print(f"courbe d'équité : {args.equity_out} ({len(curve['times'])} points)")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Iterable, Optional
+from sqlalchemy.future import select
+from ..database import SessionLocal
+from ..models import APIKey, StrategySubscription
+from ..utils.cache import TTLCache
+from ..utils.crypto import decrypt_api_key_bytes
+from .monitoring import monitoring_service
+
+class Credentials:
+    """Clé et secret déchiffrés d'un compte exchange
+
+    Les secrets ne sont pas effacés de la mémoire : `key`, `secret` et `secret_bytes` en
+    retournent des copies immuables, conservées par le client HTTP et la signature.
+    """
+
+    __slots__ = ("api_key_id", "user_id", "exchange", "_key", "_secret")
+
+    def __init__(self, api_key_id: int, user_id: int, exchange: str, key: bytearray, secret: bytearray):
+        self.api_key_id = api_key_id
+        self.user_id = user_id
+        self.exchange = exchange
+        self._key = key
+        self._secret = secret
+
+    @property
+    def key(self) -> str:
+        return self._key.decode()
+
+    @property
+    def secret(self) -> str:
+        return self._secret.decode()
+
+    @property
+    def secret_bytes(self) -> bytes:
+        return bytes(self._secret)
+
+class CredentialVault:
+    """Cache des clés API déchiffrées, hors du chemin critique des ordres"""
+
+    def __init__(self, session_factory=SessionLocal, max_size: int = 10000, ttl: float = 900.0):
+        self.logger = logging.getLogger(__name__)
+        self.session_factory = session_factory
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.task: Optional[asyncio.Task] = None
+        self.refreshed = 0
+
+    async def start(self, interval: Optional[float] = None):
+        """Charger les clés des comptes actifs, puis les recharger avant leur expiration
+
+        Une clé expirée ferait revenir la lecture en base et le déchiffrement sur le chemin des ordres.
+        """
+        await self.warm_up()
+        if self.task is None:
+            self.task = asyncio.create_task(self._refresh_loop(interval or self.cache.ttl / 4))
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def refresh(self) -> int:
+        """Recharger en lot les clés en cache à qui il reste moins de la moitié du TTL"""
+        api_key_ids = self.cache.expiring(self.cache.ttl / 2)
+        if not api_key_ids:
+            return 0
+        loaded = await self.warm_up(api_key_ids)
+        self.refreshed += loaded
+        return loaded
+
+    async def warm_up(self, api_key_ids: Optional[Iterable[int]] = None) -> int:
+        """Charger et déchiffrer en lot les clés des comptes actifs
+
+        Sans liste explicite, charge toutes les clés rattachées à un abonnement actif.
+        """
+        query = select(APIKey)
+        if api_key_ids is None:
+            query = query.where(
+                APIKey.id.in_(
+                    select(StrategySubscription.api_key_id).where(StrategySubscription.is_active.is_(True))
+                )
+            )
+        else:
+            query = query.where(APIKey.id.in_(list(api_key_ids)))
+
+        async with self.session_factory() as db:
+            result = await db.execute(query)
+            rows = result.scalars().all()
+
+        for row in rows:
+            self._store(row)
+
+        self.logger.info(f"Coffre de clés: {len(rows)} clés chargées")
+        return len(rows)
+
+    async def get(self, api_key_id: int) -> Optional[Credentials]:
+        """Obtenir les identifiants d'une clé (chargement unitaire en cas d'absence)"""
+        creds = self.cache.get(api_key_id)
+        if creds is not None:
+            return creds
+
+        async with self.session_factory() as db:
+            result = await db.execute(select(APIKey).where(APIKey.id == api_key_id))
+            row = result.scalar_one_or_none()
+
+        return self._store(row) if row else None
+
+    def get_cached(self, api_key_id: int) -> Optional[Credentials]:
+        """Lecture sans accès base de données"""
+        return self.cache.get(api_key_id)
+
+    def invalidate(self, api_key_id: int):
+        """Retirer une clé du coffre"""
+        self.cache.pop(api_key_id)
+
+    def invalidate_user(self, user_id: int) -> int:
+        """Retirer toutes les clés d'un utilisateur"""
+        return self.cache.pop_where(lambda key, creds: creds.user_id == user_id)
+
+    async def _refresh_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                self.logger.error(f"Échec du rafraîchissement du coffre de clés: {e}")
+
+    def _store(self, row: APIKey) -> Credentials:
+        creds = Credentials(
+            api_key_id=row.id,
+            user_id=row.user_id,
+            exchange=row.exchange,
+            key=decrypt_api_key_bytes(row.encrypted_key),
+            secret=decrypt_api_key_bytes(row.encrypted_secret)
+        )
+        self.cache.set(row.id, creds)
+        return creds
+
+    def get_stats(self) -> Dict:
+        return {**self.cache.get_stats(), "refreshed": self.refreshed}
+
+credential_vault = CredentialVault(
+    max_size=int(os.environ.get("CREDENTIAL_VAULT_SIZE", "10000")),
+    ttl=float(os.environ.get("CREDENTIAL_VAULT_TTL", "900"))
+)
+
+monitoring_service.register_stats_provider("credential_vault", credential_vault.get_stats)
\ No newline at end of file
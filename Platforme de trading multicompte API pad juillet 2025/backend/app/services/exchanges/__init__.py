@@ -0,0 +1,52 @@
+import os
+from typing import Dict
+from ..monitoring import monitoring_service
+from .base import ExchangeClient, ExchangeError, OrderResult
+from .binance import BinanceClient
+from .bybit import BybitClient
+
+class ExchangeRegistry:
+    """Un connecteur (et donc un pool de connexions) par exchange, partagé par tous les comptes"""
+
+    def __init__(self, clients: Dict[str, ExchangeClient]):
+        self.clients = clients
+
+    def get(self, exchange: str) -> ExchangeClient:
+        client = self.clients.get(exchange.lower())
+        if client is None:
+            raise ExchangeError(exchange, "exchange non supporté", rejected=True)
+        return client
+
+    async def start(self):
+        for client in self.clients.values():
+            await client.start()
+
+    async def close(self):
+        for client in self.clients.values():
+            await client.close()
+
+    def get_stats(self) -> Dict:
+        return {name: client.get_stats() for name, client in self.clients.items()}
+
+def exchange_registry_from_env() -> ExchangeRegistry:
+    """Construire les connecteurs à partir des variables d'environnement"""
+    pool_options = {
+        "limit": int(os.environ.get("EXCHANGE_POOL_LIMIT", "100")),
+        "limit_per_host": int(os.environ.get("EXCHANGE_POOL_LIMIT_PER_HOST", "100")),
+        "dns_ttl": int(os.environ.get("EXCHANGE_DNS_TTL", "300")),
+        "keepalive_timeout": float(os.environ.get("EXCHANGE_KEEPALIVE_TIMEOUT", "60")),
+        "timeout": float(os.environ.get("EXCHANGE_TIMEOUT", "10"))
+    }
+    return ExchangeRegistry({
+        "binance": BinanceClient(os.environ.get("BINANCE_API_URL", "https://api.binance.com"), **pool_options),
+        "bybit": BybitClient(
+            os.environ.get("BYBIT_API_URL", "https://api.bybit.com"),
+            category=os.environ.get("BYBIT_CATEGORY", "spot"),
+            fill_timeout=float(os.environ.get("BYBIT_FILL_TIMEOUT", "5")),
+            **pool_options
+        )
+    })
+
+exchange_registry = exchange_registry_from_env()
+
+monitoring_service.register_stats_provider("exchanges", exchange_registry.get_stats)
\ No newline at end of file
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+import time
+import uuid
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+import aiohttp
+from ..credential_vault import Credentials
+
+class ExchangeError(Exception):
+    """Erreur renvoyée par un exchange (ordre refusé, signature invalide, indisponibilité...)
+
+    `rejected` : l'exchange a explicitement refusé la requête, qui n'a donc eu aucun effet. Sinon
+    (délai dépassé, réponse perdue, erreur serveur), un ordre a pu être accepté malgré l'erreur.
+    """
+
+    def __init__(self, exchange: str, message: str, status: Optional[int] = None, code: Optional[str] = None,
+                 rejected: bool = False):
+        super().__init__(f"{exchange}: {message}")
+        self.exchange = exchange
+        self.status = status
+        self.code = code
+        self.rejected = rejected
+
+class OrderResult:
+    """Résultat normalisé d'un ordre, quel que soit l'exchange"""
+
+    __slots__ = ("exchange", "symbol", "side", "order_id", "client_order_id", "status",
+                 "quantity", "filled_quantity", "avg_price", "fee", "fee_asset")
+
+    def __init__(self, exchange: str, symbol: str, side: str, order_id: str, client_order_id: Optional[str],
+                 status: str, quantity: float, filled_quantity: float = 0.0, avg_price: Optional[float] = None,
+                 fee: float = 0.0, fee_asset: Optional[str] = None):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.side = side
+        self.order_id = order_id
+        self.client_order_id = client_order_id
+        # new, partially_filled, filled, canceled, rejected, expired
+        self.status = status
+        self.quantity = quantity
+        self.filled_quantity = filled_quantity
+        self.avg_price = avg_price
+        self.fee = fee
+        self.fee_asset = fee_asset
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+def format_decimal(value: float) -> str:
+    """Nombre sans notation scientifique (0.00001 et non 1e-05)"""
+    return format(Decimal(str(value)).normalize(), "f")
+
+def new_client_order_id() -> str:
+    return uuid.uuid4().hex
+
+class ExchangeClient(ABC):
+    """Connecteur d'exchange : une session HTTP keep-alive partagée par tous les comptes
+
+    Les sous-classes implémentent la signature et la normalisation des réponses.
+    """
+
+    name = ""
+
+    def __init__(self, base_url: str, limit: int = 100, limit_per_host: int = 100,
+                 dns_ttl: int = 300, keepalive_timeout: float = 60.0, timeout: float = 10.0):
+        self.logger = logging.getLogger(__name__)
+        self.base_url = base_url.rstrip("/")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.stats = {"requests": 0, "errors": 0, "latency_total_ms": 0.0, "latency_max_ms": 0.0}
+
+    async def start(self):
+        """Ouvrir le pool de connexions"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.dns_ttl,
+                    keepalive_timeout=self.keepalive_timeout
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": "trading-api"}
+            )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @abstractmethod
+    async def place_order(self, creds: Credentials, symbol: str, side: str, quantity: float,
+                          order_type: str = "MARKET", price: Optional[float] = None,
+                          client_order_id: Optional[str] = None) -> OrderResult:
+        """Passer un ordre ; retourne son état une fois l'exécution connue"""
+
+    @abstractmethod
+    async def cancel_order(self, creds: Credentials, symbol: str, order_id: str) -> OrderResult:
+        """Annuler un ordre ouvert"""
+
+    @abstractmethod
+    async def get_order(self, creds: Credentials, symbol: str, order_id: str) -> OrderResult:
+        """État d'un ordre par identifiant exchange"""
+
+    @abstractmethod
+    async def find_order(self, creds: Credentials, symbol: str, client_order_id: str) -> Optional[OrderResult]:
+        """Ordre passé avec cet identifiant client, None si l'exchange ne le connaît pas"""
+
+    async def _send(self, method: str, path: str, **kwargs) -> Tuple[int, Dict]:
+        """Envoyer une requête sur la session partagée ; retourne (statut HTTP, JSON)"""
+        if self.session is None or self.session.closed:
+            await self.start()
+        started = time.perf_counter()
+        self.stats["requests"] += 1
+        try:
+            async with self.session.request(method, self.base_url + path, **kwargs) as response:
+                payload = await response.json(content_type=None)
+                return response.status, payload or {}
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            self.stats["errors"] += 1
+            raise ExchangeError(self.name, f"requête {method} {path.split('?')[0]} échouée: {e}")
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stats["latency_total_ms"] += elapsed_ms
+            self.stats["latency_max_ms"] = max(self.stats["latency_max_ms"], elapsed_ms)
+
+    def get_stats(self) -> Dict:
+        requests = self.stats["requests"]
+        return {
+            "requests": requests,
+            "errors": self.stats["errors"],
+            "avg_latency_ms": self.stats["latency_total_ms"] / requests if requests else None,
+            "max_latency_ms": self.stats["latency_max_ms"],
+            "pool_limit": self.limit
+        }
\ No newline at end of file
@@ -0,0 +1,89 @@
+import hashlib
+import hmac
+import time
+from typing import Dict, Optional
+from urllib.parse import urlencode
+from ..credential_vault import Credentials
+from .base import ExchangeClient, ExchangeError, OrderResult, format_decimal, new_client_order_id
+
+# Ordre inconnu de l'exchange (requête GET /api/v3/order)
+ORDER_NOT_FOUND = "-2013"
+
+class BinanceClient(ExchangeClient):
+    """API Spot Binance (v3), requêtes signées HMAC-SHA256"""
+
+    name = "binance"
+
+    def __init__(self, base_url: str, recv_window: int = 5000, **pool_options):
+        super().__init__(base_url, **pool_options)
+        self.recv_window = recv_window
+
+    def sign(self, creds: Credentials, params: Dict) -> str:
+        """Query string signée : la signature porte sur la query string exacte envoyée"""
+        query = urlencode({**params, "recvWindow": self.recv_window, "timestamp": int(time.time() * 1000)})
+        signature = hmac.new(creds.secret_bytes, query.encode(), hashlib.sha256).hexdigest()
+        return f"{query}&signature={signature}"
+
+    async def _signed(self, method: str, path: str, creds: Credentials, params: Dict) -> Dict:
+        status, payload = await self._send(
+            method,
+            f"{path}?{self.sign(creds, params)}",
+            headers={"X-MBX-APIKEY": creds.key}
+        )
+        if status != 200:
+            self.stats["errors"] += 1
+            # 4xx : requête refusée (paramètres, solde, limite de débit) ; 5xx : issue inconnue
+            raise ExchangeError(self.name, payload.get("msg", f"HTTP {status}"), status, str(payload.get("code")),
+                                rejected=400 <= status < 500)
+        return payload
+
+    async def place_order(self, creds: Credentials, symbol: str, side: str, quantity: float,
+                          order_type: str = "MARKET", price: Optional[float] = None,
+                          client_order_id: Optional[str] = None) -> OrderResult:
+        params = {
+            "symbol": symbol,
+            "side": side,
+            "type": order_type,
+            "quantity": format_decimal(quantity),
+            "newClientOrderId": client_order_id or new_client_order_id(),
+            # Réponse complète : les fills sont renvoyés sans requête supplémentaire
+            "newOrderRespType": "FULL"
+        }
+        if order_type == "LIMIT":
+            params.update(price=format_decimal(price), timeInForce="GTC")
+        return self._normalize(await self._signed("POST", "/api/v3/order", creds, params))
+
+    async def cancel_order(self, creds: Credentials, symbol: str, order_id: str) -> OrderResult:
+        return self._normalize(await self._signed("DELETE", "/api/v3/order", creds, {"symbol": symbol, "orderId": order_id}))
+
+    async def get_order(self, creds: Credentials, symbol: str, order_id: str) -> OrderResult:
+        return self._normalize(await self._signed("GET", "/api/v3/order", creds, {"symbol": symbol, "orderId": order_id}))
+
+    async def find_order(self, creds: Credentials, symbol: str, client_order_id: str) -> Optional[OrderResult]:
+        try:
+            payload = await self._signed("GET", "/api/v3/order", creds, {
+                "symbol": symbol, "origClientOrderId": client_order_id
+            })
+        except ExchangeError as e:
+            if e.code == ORDER_NOT_FOUND:
+                return None
+            raise
+        return self._normalize(payload)
+
+    def _normalize(self, payload: Dict) -> OrderResult:
+        filled = float(payload.get("executedQty", 0))
+        quote = float(payload.get("cummulativeQuoteQty", 0))
+        fills = payload.get("fills") or []
+        return OrderResult(
+            exchange=self.name,
+            symbol=payload["symbol"],
+            side=payload.get("side", ""),
+            order_id=str(payload["orderId"]),
+            client_order_id=payload.get("clientOrderId"),
+            status=payload.get("status", "NEW").lower(),
+            quantity=float(payload.get("origQty", filled)),
+            filled_quantity=filled,
+            avg_price=quote / filled if filled else None,
+            fee=sum(float(fill.get("commission", 0)) for fill in fills),
+            fee_asset=fills[0].get("commissionAsset") if fills else None
+        )
\ No newline at end of file
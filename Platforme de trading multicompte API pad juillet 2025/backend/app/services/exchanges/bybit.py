@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+from ..credential_vault import Credentials
+from .base import ExchangeClient, ExchangeError, OrderResult, format_decimal, new_client_order_id
+
+# Statuts Bybit -> statuts normalisés
+ORDER_STATUSES = {
+    "Created": "new",
+    "New": "new",
+    "PartiallyFilled": "partially_filled",
+    "Filled": "filled",
+    "Cancelled": "canceled",
+    "PartiallyFilledCanceled": "canceled",
+    "Rejected": "rejected",
+    "Deactivated": "expired"
+}
+
+# retCode sans garantie que la requête a échoué (délai interne dépassé, erreur serveur)
+AMBIGUOUS_RET_CODES = {"10000", "10016"}
+
+# Statuts normalisés après lesquels l'ordre n'évolue plus
+TERMINAL_STATUSES = {"filled", "canceled", "rejected", "expired"}
+
+class BybitClient(ExchangeClient):
+    """API unifiée Bybit (v5), requêtes signées HMAC-SHA256
+
+    La création d'un ordre ne renvoie que ses identifiants et l'exécution est asynchrone : l'ordre est
+    relu jusqu'à un statut final. Un ordre clos peut ne plus figurer dans /v5/order/realtime (compte
+    spot classique) : repli sur l'historique des ordres, puis sur les exécutions.
+    """
+
+    name = "bybit"
+
+    def __init__(self, base_url: str, category: str = "spot", recv_window: int = 5000,
+                 fill_timeout: float = 5.0, poll_interval: float = 0.1, **pool_options):
+        super().__init__(base_url, **pool_options)
+        self.category = category
+        self.recv_window = recv_window
+        # Attente maximale d'un statut final après la création, intervalle initial entre deux lectures
+        self.fill_timeout = fill_timeout
+        self.poll_interval = poll_interval
+
+    def sign(self, creds: Credentials, payload: str) -> Dict[str, str]:
+        """En-têtes d'authentification : signature de timestamp + clé + recv_window + payload"""
+        timestamp = str(int(time.time() * 1000))
+        message = f"{timestamp}{creds.key}{self.recv_window}{payload}"
+        return {
+            "X-BAPI-API-KEY": creds.key,
+            "X-BAPI-TIMESTAMP": timestamp,
+            "X-BAPI-RECV-WINDOW": str(self.recv_window),
+            "X-BAPI-SIGN": hmac.new(creds.secret_bytes, message.encode(), hashlib.sha256).hexdigest()
+        }
+
+    async def _signed(self, method: str, path: str, creds: Credentials, params: Dict) -> Dict:
+        if method == "GET":
+            query = urlencode(params)
+            status, payload = await self._send(method, f"{path}?{query}", headers=self.sign(creds, query))
+        else:
+            body = json.dumps(params, separators=(",", ":"))
+            headers = {**self.sign(creds, body), "Content-Type": "application/json"}
+            status, payload = await self._send(method, path, data=body, headers=headers)
+        # Bybit répond en HTTP 200 avec un retCode non nul en cas d'erreur métier
+        if status != 200 or payload.get("retCode", 0) != 0:
+            self.stats["errors"] += 1
+            code = str(payload.get("retCode"))
+            rejected = 400 <= status < 500 or (status == 200 and code not in AMBIGUOUS_RET_CODES)
+            raise ExchangeError(self.name, payload.get("retMsg", f"HTTP {status}"), status, code, rejected=rejected)
+        return payload.get("result") or {}
+
+    async def place_order(self, creds: Credentials, symbol: str, side: str, quantity: float,
+                          order_type: str = "MARKET", price: Optional[float] = None,
+                          client_order_id: Optional[str] = None) -> OrderResult:
+        params = {
+            "category": self.category,
+            "symbol": symbol,
+            "side": side.capitalize(),
+            "orderType": order_type.capitalize(),
+            "qty": format_decimal(quantity),
+            "orderLinkId": client_order_id or new_client_order_id()
+        }
+        if order_type == "LIMIT":
+            params["price"] = format_decimal(price)
+        elif self.category == "spot":
+            # Achat spot au marché : qty en devise de cotation par défaut, ici toujours en actif de base
+            params["marketUnit"] = "baseCoin"
+        created = await self._signed("POST", "/v5/order/create", creds, params)
+        if order_type != "MARKET":
+            return await self.get_order(creds, symbol, created["orderId"])
+        return await self._wait_final(creds, symbol, created["orderId"])
+
+    async def _wait_final(self, creds: Credentials, symbol: str, order_id: str) -> OrderResult:
+        """Relire l'ordre jusqu'à un statut final ; au-delà de `fill_timeout`, dernier état connu"""
+        deadline = time.monotonic() + self.fill_timeout
+        delay = self.poll_interval
+        while True:
+            order = await self._lookup(creds, symbol, {"orderId": order_id})
+            if order is not None and order.status in TERMINAL_STATUSES:
+                return order
+            if time.monotonic() >= deadline:
+                if order is None:
+                    raise ExchangeError(self.name, f"ordre {order_id} introuvable", 404)
+                self.logger.warning(f"Ordre Bybit {order_id} toujours {order.status} après {self.fill_timeout} s")
+                return order
+            await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            delay = min(delay * 2, 1.0)
+
+    async def cancel_order(self, creds: Credentials, symbol: str, order_id: str) -> OrderResult:
+        await self._signed("POST", "/v5/order/cancel", creds, {
+            "category": self.category, "symbol": symbol, "orderId": order_id
+        })
+        return await self.get_order(creds, symbol, order_id)
+
+    async def get_order(self, creds: Credentials, symbol: str, order_id: str) -> OrderResult:
+        order = await self._lookup(creds, symbol, {"orderId": order_id})
+        if order is None:
+            raise ExchangeError(self.name, f"ordre {order_id} introuvable", 404)
+        return order
+
+    async def find_order(self, creds: Credentials, symbol: str, client_order_id: str) -> Optional[OrderResult]:
+        return await self._lookup(creds, symbol, {"orderLinkId": client_order_id})
+
+    async def _lookup(self, creds: Credentials, symbol: str, ids: Dict[str, str]) -> Optional[OrderResult]:
+        """Ordre par orderId ou orderLinkId : ordres ouverts et récents, historique, puis exécutions"""
+        params = {"category": self.category, "symbol": symbol, **ids}
+        for path in ("/v5/order/realtime", "/v5/order/history"):
+            orders = (await self._signed("GET", path, creds, params)).get("list") or []
+            if orders:
+                return self._normalize(orders[0])
+        executions = (await self._signed("GET", "/v5/execution/list", creds, params)).get("list") or []
+        if not executions:
+            return None
+        return self._from_executions(executions)
+
+    def _from_executions(self, executions: List[Dict]) -> OrderResult:
+        """Ordre reconstitué à partir de ses exécutions (quantité, prix moyen pondéré, frais)"""
+        filled = sum(float(execution["execQty"]) for execution in executions)
+        notional = sum(float(execution["execQty"]) * float(execution["execPrice"]) for execution in executions)
+        first = executions[0]
+        return OrderResult(
+            exchange=self.name,
+            symbol=first["symbol"],
+            side=first.get("side", "").upper(),
+            order_id=first["orderId"],
+            client_order_id=first.get("orderLinkId"),
+            status="filled",
+            quantity=filled,
+            filled_quantity=filled,
+            avg_price=notional / filled if filled else None,
+            fee=sum(float(execution.get("execFee") or 0) for execution in executions)
+        )
+
+    def _normalize(self, order: Dict) -> OrderResult:
+        filled = float(order.get("cumExecQty") or 0)
+        avg_price = float(order.get("avgPrice") or 0)
+        return OrderResult(
+            exchange=self.name,
+            symbol=order["symbol"],
+            side=order.get("side", "").upper(),
+            order_id=order["orderId"],
+            client_order_id=order.get("orderLinkId"),
+            status=ORDER_STATUSES.get(order.get("orderStatus"), "new"),
+            quantity=float(order.get("qty") or filled),
+            filled_quantity=filled,
+            avg_price=avg_price if filled and avg_price else None,
+            fee=float(order.get("cumExecFee") or 0)
+        )
\ No newline at end of file
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis optionnel : dédoublonnage limité au worker
+    aioredis = None
+
+from ..utils.cache import TTLCache
+from .monitoring import monitoring_service
+
+# Valeur Redis d'une clé réservée dont le résultat n'est pas encore connu
+PENDING = b"__pending__"
+
+class SignalInProgress(Exception):
+    """Le signal est en cours de traitement par un autre worker"""
+
+class IdempotencyStore:
+    """Résultats des signaux déjà traités, par clé d'idempotence (O(1), sans base de données)
+
+    Niveau local : cache TTL borné et futures des traitements en cours, partagées avec les
+    doublons arrivés pendant l'exécution. Niveau Redis optionnel (SET NX) pour les workers
+    multiples ; en cas d'indisponibilité, repli sur le seul niveau local.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0, redis_url: Optional[str] = None,
+                 prefix: str = "idempotency:"):
+        if redis_url and aioredis is None:
+            raise RuntimeError("Le package redis est requis pour TRADINGVIEW_IDEMPOTENCY_BACKEND=redis")
+        self.logger = logging.getLogger(__name__)
+        self.results = TTLCache(max_size=max_size, ttl=ttl)
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.ttl = ttl
+        self.prefix = prefix
+        self.client = aioredis.from_url(redis_url) if redis_url else None
+        self.processed = 0
+        self.duplicates = 0
+        self.duplicates_in_flight = 0
+        self.duplicates_remote = 0
+        self.conflicts = 0
+        self.redis_errors = 0
+        # Signaux sans clé d'idempotence : refusés, ou exécutés sans dédoublonnage
+        self.missing_key = 0
+
+    async def run(self, key: Optional[str], handler: Callable[[], Awaitable[Dict]]) -> Tuple[Dict, bool]:
+        """Exécuter `handler` une seule fois par clé ; retourne (résultat, rejoué)
+
+        Sans clé, `handler` est exécuté à chaque appel.
+        """
+        if key is None:
+            self.missing_key += 1
+            return await handler(), False
+
+        result = self.results.get(key)
+        if result is not None:
+            self.duplicates += 1
+            return result, True
+
+        pending = self.in_flight.get(key)
+        if pending is not None:
+            # Doublon arrivé pendant l'exécution : même résultat que l'original
+            self.duplicates += 1
+            self.duplicates_in_flight += 1
+            return await asyncio.shield(pending), True
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            result = await self._claim_remote(key) if self.client is not None else None
+            replayed = result is not None
+            if not replayed:
+                try:
+                    result = await handler()
+                except BaseException:
+                    # Échec avant résultat : la clé est libérée pour qu'un renvoi soit exécuté
+                    await self._release_remote(key)
+                    raise
+                self.processed += 1
+                await self._store_remote(key, result)
+            self.results.set(key, result)
+            future.set_result(result)
+            return result, replayed
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self.in_flight.pop(key, None)
+
+    async def _claim_remote(self, key: str) -> Optional[Dict]:
+        """Réserver la clé dans Redis ; retourne le résultat d'un autre worker s'il existe"""
+        try:
+            if await self.client.set(self.prefix + key, PENDING, nx=True, px=int(self.ttl * 1000)):
+                return None
+            value = await self.client.get(self.prefix + key)
+        except Exception as e:
+            self.redis_errors += 1
+            self.logger.warning(f"Idempotence Redis indisponible, repli local: {e}")
+            return None
+        if value is None:
+            # Clé expirée entre les deux commandes : nouvelle tentative de réservation
+            return await self._claim_remote(key)
+        self.duplicates += 1
+        if value == PENDING:
+            self.conflicts += 1
+            raise SignalInProgress(key)
+        self.duplicates_remote += 1
+        return json.loads(value)
+
+    async def _store_remote(self, key: str, result: Dict):
+        if self.client is None:
+            return
+        try:
+            await self.client.set(self.prefix + key, json.dumps(result, default=str), px=int(self.ttl * 1000))
+        except Exception as e:
+            self.redis_errors += 1
+            self.logger.warning(f"Idempotence Redis : résultat non enregistré: {e}")
+
+    async def _release_remote(self, key: str):
+        if self.client is None:
+            return
+        try:
+            await self.client.delete(self.prefix + key)
+        except Exception as e:
+            self.redis_errors += 1
+            self.logger.warning(f"Idempotence Redis : clé non libérée: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            "backend": "redis" if self.client is not None else "memory",
+            "ttl": self.ttl,
+            "processed": self.processed,
+            # Doublons rejetés (résultat rejoué ou 409 si encore en cours dans un autre worker)
+            "duplicates": self.duplicates,
+            "duplicates_in_flight": self.duplicates_in_flight,
+            "duplicates_remote": self.duplicates_remote,
+            "conflicts": self.conflicts,
+            "redis_errors": self.redis_errors,
+            "missing_key": self.missing_key,
+            "in_flight": len(self.in_flight),
+            "cache": self.results.get_stats()
+        }
+
+def idempotency_store_from_env() -> IdempotencyStore:
+    """Construire le store des signaux TradingView à partir des variables d'environnement"""
+    redis_url = None
+    if os.environ.get("TRADINGVIEW_IDEMPOTENCY_BACKEND", "memory") == "redis":
+        redis_url = os.environ.get("REDIS_URL", "redis://localhost:6379")
+    return IdempotencyStore(
+        max_size=int(os.environ.get("TRADINGVIEW_IDEMPOTENCY_SIZE", "10000")),
+        ttl=float(os.environ.get("TRADINGVIEW_IDEMPOTENCY_TTL", "300")),
+        redis_url=redis_url,
+        prefix="idempotency:tradingview:"
+    )
+
+signal_idempotency = idempotency_store_from_env()
+
+monitoring_service.register_stats_provider("signal_idempotency", signal_idempotency.get_stats)
\ No newline at end of file
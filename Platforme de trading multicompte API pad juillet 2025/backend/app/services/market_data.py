@@ -0,0 +1,342 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import aiohttp
+from sqlalchemy.future import select
+from ..database import SessionLocal
+from ..models import PnLRollup
+from .monitoring import monitoring_service
+
+class Ticker:
+    """Dernier prix et meilleur bid/ask d'un symbole sur un exchange"""
+
+    __slots__ = ("exchange", "symbol", "last", "bid", "bid_size", "ask", "ask_size", "event_time", "updated_at")
+
+    def __init__(self, exchange: str, symbol: str):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.last: Optional[float] = None
+        self.bid: Optional[float] = None
+        self.bid_size: Optional[float] = None
+        self.ask: Optional[float] = None
+        self.ask_size: Optional[float] = None
+        # Horodatage exchange (ms) et réception locale (time.monotonic)
+        self.event_time: Optional[int] = None
+        self.updated_at = 0.0
+
+    @property
+    def mid(self) -> Optional[float]:
+        if self.bid is None or self.ask is None:
+            return self.last
+        return (self.bid + self.ask) / 2
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__ if name != "updated_at"}
+
+class TickerStore:
+    """Derniers tickers en mémoire, lecture O(1) par (exchange, symbole)"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.tickers: Dict[Tuple[str, str], Ticker] = {}
+        # Appelés à chaque mise à jour (moteur de déclenchement SL/TP...)
+        self.listeners: List[Callable[[Ticker], None]] = []
+        self.updates = 0
+
+    def get(self, exchange: str, symbol: str) -> Optional[Ticker]:
+        return self.tickers.get((exchange, symbol))
+
+    def last_price(self, exchange: str, symbol: str) -> Optional[float]:
+        ticker = self.tickers.get((exchange, symbol))
+        return ticker.last if ticker else None
+
+    def update(self, exchange: str, symbol: str, last: Optional[float] = None,
+               bid: Optional[float] = None, bid_size: Optional[float] = None,
+               ask: Optional[float] = None, ask_size: Optional[float] = None,
+               event_time: Optional[int] = None) -> Ticker:
+        """Mettre à jour les champs fournis (les autres sont conservés)"""
+        ticker = self.tickers.get((exchange, symbol))
+        if ticker is None:
+            ticker = self.tickers[(exchange, symbol)] = Ticker(exchange, symbol)
+        if last is not None:
+            ticker.last = last
+        if bid is not None:
+            ticker.bid, ticker.bid_size = bid, bid_size
+        if ask is not None:
+            ticker.ask, ticker.ask_size = ask, ask_size
+        if event_time is not None:
+            ticker.event_time = event_time
+        ticker.updated_at = time.monotonic()
+        self.updates += 1
+        for listener in self.listeners:
+            try:
+                listener(ticker)
+            except Exception as e:
+                self.logger.error(f"Erreur d'un abonné aux prix ({exchange} {symbol}): {e}")
+        return ticker
+
+    def add_listener(self, listener: Callable[[Ticker], None]):
+        self.listeners.append(listener)
+
+class MarketDataStream(ABC):
+    """Connexion websocket unique par exchange, multiplexant tous les symboles suivis
+
+    Reconnexion automatique avec backoff exponentiel ; les abonnements sont rejoués à
+    chaque reconnexion. Les messages bruts peuvent être enregistrés pour la relecture.
+    """
+
+    exchange = ""
+
+    def __init__(self, url: str, store: TickerStore, record_path: Optional[str] = None,
+                 max_backoff: float = 30.0):
+        self.logger = logging.getLogger(__name__)
+        self.url = url
+        self.store = store
+        self.record_path = record_path
+        self.max_backoff = max_backoff
+        self.symbols: Set[str] = set()
+        self.ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"messages": 0, "reconnects": 0, "parse_errors": 0}
+        self.last_recorded: Optional[float] = None
+
+    async def start(self, session: aiohttp.ClientSession):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run(session))
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def subscribe(self, symbols: Iterable[str]):
+        """Ajouter des symboles ; envoyé immédiatement si la connexion est ouverte"""
+        new = {symbol.upper() for symbol in symbols} - self.symbols
+        if not new:
+            return
+        self.symbols |= new
+        if self.ws is not None and not self.ws.closed:
+            await self._send_subscribe(sorted(new))
+
+    async def _run(self, session: aiohttp.ClientSession):
+        backoff = 1.0
+        record = open(self.record_path, "a") if self.record_path else None
+        try:
+            while True:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=20, autoping=True) as ws:
+                        self.ws = ws
+                        backoff = 1.0
+                        if self.symbols:
+                            await self._send_subscribe(sorted(self.symbols))
+                        self.logger.info(f"Flux {self.exchange} connecté ({len(self.symbols)} symboles)")
+                        await self._consume(ws, record)
+                except Exception as e:
+                    self.logger.warning(f"Flux {self.exchange} interrompu: {e}")
+                finally:
+                    self.ws = None
+                self.stats["reconnects"] += 1
+                # Backoff avec gigue pour éviter les reconnexions synchronisées
+                await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+                backoff = min(backoff * 2, self.max_backoff)
+        finally:
+            if record:
+                record.close()
+
+    async def _consume(self, ws: aiohttp.ClientWebSocketResponse, record):
+        keepalive = asyncio.create_task(self._keepalive(ws))
+        try:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                if record:
+                    now = time.monotonic()
+                    delay = now - self.last_recorded if self.last_recorded else 0.0
+                    self.last_recorded = now
+                    record.write(json.dumps({"exchange": self.exchange, "message": message.data, "delay": delay}) + "\n")
+                self.handle(message.data)
+        finally:
+            keepalive.cancel()
+
+    def handle(self, raw: str):
+        """Appliquer un message brut au store (utilisé aussi par la relecture)"""
+        self.stats["messages"] += 1
+        try:
+            self.parse(json.loads(raw))
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            self.stats["parse_errors"] += 1
+            self.logger.debug(f"Message {self.exchange} ignoré: {e}")
+
+    async def _keepalive(self, ws: aiohttp.ClientWebSocketResponse):
+        """Ping applicatif éventuel (en plus des pings websocket)"""
+
+    @abstractmethod
+    async def _send_subscribe(self, symbols: List[str]):
+        """Envoyer l'abonnement aux flux de ces symboles sur la connexion ouverte"""
+
+    @abstractmethod
+    def parse(self, message: Dict):
+        """Appliquer un message décodé de l'exchange au store"""
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "symbols": len(self.symbols), "connected": self.ws is not None}
+
+class BinanceMarketStream(MarketDataStream):
+    """Flux combiné Binance : bookTicker (meilleur bid/ask) et miniTicker (dernier prix)"""
+
+    exchange = "binance"
+
+    async def _send_subscribe(self, symbols: List[str]):
+        params = [f"{symbol.lower()}@{channel}" for symbol in symbols for channel in ("bookTicker", "miniTicker")]
+        # 1024 flux maximum par connexion, messages limités en taille : envoi par lots
+        for offset in range(0, len(params), 200):
+            await self.ws.send_json({"method": "SUBSCRIBE", "params": params[offset:offset + 200], "id": offset + 1})
+
+    def parse(self, message: Dict):
+        data = message.get("data")
+        if data is None:
+            return  # Réponse d'abonnement
+        if data.get("e") == "24hrMiniTicker":
+            self.store.update(self.exchange, data["s"], last=float(data["c"]), event_time=data["E"])
+        else:
+            self.store.update(
+                self.exchange, data["s"],
+                bid=float(data["b"]), bid_size=float(data["B"]),
+                ask=float(data["a"]), ask_size=float(data["A"])
+            )
+
+class BybitMarketStream(MarketDataStream):
+    """Flux public Bybit v5 : orderbook.1 (meilleur bid/ask) et tickers (dernier prix)"""
+
+    exchange = "bybit"
+
+    async def _send_subscribe(self, symbols: List[str]):
+        args = [f"{topic}.{symbol}" for symbol in symbols for topic in ("orderbook.1", "tickers")]
+        # 10 topics maximum par requête sur le flux spot
+        for offset in range(0, len(args), 10):
+            await self.ws.send_json({"op": "subscribe", "args": args[offset:offset + 10]})
+
+    async def _keepalive(self, ws: aiohttp.ClientWebSocketResponse):
+        # Bybit ferme les connexions sans ping applicatif pendant 20 s
+        while not ws.closed:
+            await asyncio.sleep(20)
+            await ws.send_json({"op": "ping"})
+
+    def parse(self, message: Dict):
+        topic = message.get("topic")
+        if topic is None:
+            return  # Réponse d'abonnement ou pong
+        data = message["data"]
+        if topic.startswith("tickers."):
+            self.store.update(self.exchange, data["symbol"], last=float(data["lastPrice"]), event_time=message.get("ts"))
+        else:
+            bids, asks = data.get("b") or [], data.get("a") or []
+            self.store.update(
+                self.exchange, data["s"],
+                bid=float(bids[0][0]) if bids else None, bid_size=float(bids[0][1]) if bids else None,
+                ask=float(asks[0][0]) if asks else None, ask_size=float(asks[0][1]) if asks else None,
+                event_time=message.get("ts")
+            )
+
+class MarketDataService:
+    """Flux de prix partagés par tous les comptes, un par exchange"""
+
+    def __init__(self, streams: Dict[str, MarketDataStream], store: TickerStore, session_factory=SessionLocal):
+        self.logger = logging.getLogger(__name__)
+        self.streams = streams
+        self.store = store
+        self.session_factory = session_factory
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self, extra_symbols: Iterable[Tuple[str, str]] = ()):
+        """S'abonner à tous les symboles déjà tradés, puis ouvrir les flux"""
+        async with self.session_factory() as db:
+            result = await db.execute(select(PnLRollup.exchange, PnLRollup.symbol).distinct())
+            traded = list(result.all())
+        for exchange, symbol in [*traded, *extra_symbols]:
+            await self.ensure_subscribed(exchange, symbol)
+
+        self.session = aiohttp.ClientSession()
+        for stream in self.streams.values():
+            await stream.start(self.session)
+        self.logger.info(f"Flux de prix démarrés ({sum(len(s.symbols) for s in self.streams.values())} symboles)")
+
+    async def stop(self):
+        for stream in self.streams.values():
+            await stream.stop()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def ensure_subscribed(self, exchange: str, symbol: str):
+        """Suivre un symbole nouvellement tradé (sans effet s'il l'est déjà)"""
+        stream = self.streams.get(exchange.lower())
+        if stream is not None:
+            await stream.subscribe([symbol])
+
+    def get_ticker(self, exchange: str, symbol: str) -> Optional[Ticker]:
+        return self.store.get(exchange, symbol)
+
+    def last_price(self, exchange: str, symbol: str) -> Optional[float]:
+        return self.store.last_price(exchange, symbol)
+
+    async def replay(self, path: str, speed: float = 0.0) -> int:
+        """Rejouer un flux enregistré (tests, benchmarks) ; speed=0 : sans attente
+
+        Chaque ligne : {"exchange": ..., "message": <message brut>, "delay": <secondes, optionnel>}
+        """
+        count = 0
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if speed and entry.get("delay"):
+                    await asyncio.sleep(entry["delay"] / speed)
+                stream = self.streams.get(entry["exchange"])
+                if stream is not None:
+                    stream.handle(entry["message"])
+                    count += 1
+        return count
+
+    def get_stats(self) -> Dict:
+        return {
+            "tickers": len(self.store.tickers),
+            "updates": self.store.updates,
+            **{name: stream.get_stats() for name, stream in self.streams.items()}
+        }
+
+def market_data_from_env() -> MarketDataService:
+    store = TickerStore()
+    record_path = os.environ.get("MARKET_DATA_RECORD")
+    return MarketDataService({
+        "binance": BinanceMarketStream(
+            os.environ.get("BINANCE_WS_URL", "wss://stream.binance.com:9443/stream"), store,
+            record_path=f"{record_path}.binance.ndjson" if record_path else None
+        ),
+        "bybit": BybitMarketStream(
+            os.environ.get("BYBIT_WS_URL", "wss://stream.bybit.com/v5/public/spot"), store,
+            record_path=f"{record_path}.bybit.ndjson" if record_path else None
+        )
+    }, store)
+
+market_data_service = market_data_from_env()
+
+monitoring_service.register_stats_provider("market_data", market_data_service.get_stats)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Relecture d'un flux de prix enregistré")
+    parser.add_argument("command", choices=["replay"])
+    parser.add_argument("path")
+    parser.add_argument("--speed", type=float, default=0.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    count = asyncio.run(market_data_service.replay(args.path, args.speed))
+    elapsed = time.perf_counter() - started
+    print(f"{count} messages rejoués en {elapsed:.2f} s, {len(market_data_service.store.tickers)} tickers")
\ No newline at end of file
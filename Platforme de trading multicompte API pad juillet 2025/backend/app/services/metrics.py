@@ -0,0 +1,214 @@
+import math
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+# Sous-intervalles par puissance de 2 : erreur relative des quantiles < 1/16
+SUB_BUCKETS = 16
+# Plage couverte : 1 µs à 2^37 µs (~38 h)
+MAX_EXPONENT = 37
+BUCKET_COUNT = (MAX_EXPONENT + 1) * SUB_BUCKETS
+
+# Fenêtres glissantes exposées (secondes)
+WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+
+def _bucket_index(seconds: float) -> int:
+    micros = seconds * 1e6
+    if micros < 1:
+        return 0
+    mantissa, exponent = math.frexp(micros)  # micros = mantissa * 2**exponent, mantissa dans [0.5, 1)
+    if exponent > MAX_EXPONENT:
+        return BUCKET_COUNT - 1
+    return exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+
+def _bucket_upper_bound(index: int) -> float:
+    """Borne supérieure d'un bucket, en secondes"""
+    exponent, sub = divmod(index, SUB_BUCKETS)
+    return (0.5 + (sub + 1) / (2 * SUB_BUCKETS)) * 2 ** exponent / 1e6
+
+class LatencyHistogram:
+    """Histogramme log-linéaire à mémoire fixe (type HDR), fusionnable"""
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = array("Q", bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.counts[_bucket_index(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: "LatencyHistogram"):
+        for i, value in enumerate(other.counts):
+            if value:
+                self.counts[i] += value
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantiles(self, qs: Iterable[float]) -> List[Optional[float]]:
+        """Quantiles (en secondes) calculés en un seul parcours des buckets"""
+        qs = list(qs)
+        if not self.count:
+            return [None] * len(qs)
+        targets = sorted((max(1, math.ceil(q * self.count)), i) for i, q in enumerate(qs))
+        results: List[Optional[float]] = [None] * len(qs)
+        seen = 0
+        position = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            while position < len(targets) and seen >= targets[position][0]:
+                results[targets[position][1]] = min(_bucket_upper_bound(index), self.max)
+                position += 1
+            if position == len(targets):
+                break
+        return results
+
+    def cumulative_buckets(self, bounds: Iterable[float]) -> List[int]:
+        """Comptes cumulés pour des bornes croissantes (format Prometheus)"""
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            while index < BUCKET_COUNT and _bucket_upper_bound(index) <= bound:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+class RotatingHistogram:
+    """Histogrammes par tranche de temps, pour des quantiles sur fenêtre glissante"""
+
+    def __init__(self, slots: int = 5, resolution: float = 60.0):
+        self.resolution = resolution
+        self.histograms = [LatencyHistogram() for _ in range(slots)]
+        self.slot_ids = array("q", [-1] * slots)
+
+    def record(self, seconds: float, now: Optional[float] = None):
+        slot = int((now or time.monotonic()) // self.resolution)
+        index = slot % len(self.histograms)
+        if self.slot_ids[index] != slot:
+            self.histograms[index].reset()
+            self.slot_ids[index] = slot
+        self.histograms[index].record(seconds)
+
+    def window(self, seconds: float, now: Optional[float] = None) -> LatencyHistogram:
+        """Histogramme fusionné des tranches couvrant la fenêtre demandée"""
+        current = int((now or time.monotonic()) // self.resolution)
+        slots = min(len(self.histograms), max(1, math.ceil(seconds / self.resolution)))
+        merged = LatencyHistogram()
+        for slot in range(current - slots + 1, current + 1):
+            index = slot % len(self.histograms)
+            if self.slot_ids[index] == slot:
+                merged.merge(self.histograms[index])
+        return merged
+
+class WindowedCounter:
+    """Compteur sur fenêtres glissantes (anneau de tranches de `resolution` secondes)"""
+
+    __slots__ = ("resolution", "counts", "slot_ids", "total")
+
+    def __init__(self, horizon: float = 3600.0, resolution: float = 10.0):
+        slots = math.ceil(horizon / resolution)
+        self.resolution = resolution
+        self.counts = array("Q", bytes(8 * slots))
+        self.slot_ids = array("q", [-1] * slots)
+        self.total = 0
+
+    def add(self, amount: int = 1, now: Optional[float] = None):
+        slot = int((now or time.monotonic()) // self.resolution)
+        index = slot % len(self.counts)
+        if self.slot_ids[index] != slot:
+            self.counts[index] = 0
+            self.slot_ids[index] = slot
+        self.counts[index] += amount
+        self.total += amount
+
+    def sum(self, seconds: float, now: Optional[float] = None) -> int:
+        current = int((now or time.monotonic()) // self.resolution)
+        slots = min(len(self.counts), max(1, math.ceil(seconds / self.resolution)))
+        total = 0
+        for slot in range(current - slots + 1, current + 1):
+            index = slot % len(self.counts)
+            if self.slot_ids[index] == slot:
+                total += self.counts[index]
+        return total
+
+class EndpointMetrics:
+    """Latences et erreurs d'un endpoint, en mémoire fixe"""
+
+    __slots__ = ("histogram", "recent", "requests", "errors", "stages")
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.recent = RotatingHistogram(slots=5, resolution=60.0)
+        self.requests = WindowedCounter()
+        self.errors = WindowedCounter()
+        # Un histogramme par étape (auth, db, exchange, notification), requêtes échantillonnées
+        self.stages: Dict[str, LatencyHistogram] = {}
+
+    def record(self, seconds: float, error: bool = False):
+        now = time.monotonic()
+        self.histogram.record(seconds)
+        self.recent.record(seconds, now)
+        self.requests.add(1, now)
+        if error:
+            self.errors.add(1, now)
+
+    def record_stages(self, stages: Dict[str, float]):
+        for name, seconds in stages.items():
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def summary(self) -> Dict:
+        p50, p95, p99 = self.histogram.quantiles((0.5, 0.95, 0.99))
+        recent = self.recent.window(WINDOWS["5m"])
+        recent_p50, recent_p95, recent_p99 = recent.quantiles((0.5, 0.95, 0.99))
+        windows = {}
+        for name, seconds in WINDOWS.items():
+            requests = self.requests.sum(seconds)
+            errors = self.errors.sum(seconds)
+            windows[name] = {
+                "requests": requests,
+                "errors": errors,
+                "error_rate": errors / requests if requests else 0.0
+            }
+        return {
+            "avg_response_time": self.histogram.total / self.histogram.count if self.histogram.count else None,
+            "min_response_time": self.histogram.min if self.histogram.count else None,
+            "max_response_time": self.histogram.max if self.histogram.count else None,
+            "request_count": self.histogram.count,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+            "p50_5m": recent_p50,
+            "p95_5m": recent_p95,
+            "p99_5m": recent_p99,
+            "windows": windows,
+            "stages": {name: _stage_summary(histogram) for name, histogram in self.stages.items()}
+        }
+
+def _stage_summary(histogram: LatencyHistogram) -> Dict:
+    p50, p95, p99 = histogram.quantiles((0.5, 0.95, 0.99))
+    return {
+        "count": histogram.count,
+        "avg": histogram.total / histogram.count if histogram.count else None,
+        "p50": p50,
+        "p95": p95,
+        "p99": p99
+    }
\ No newline at end of file
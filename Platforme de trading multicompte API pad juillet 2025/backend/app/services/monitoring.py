@@ -1,32 +1,50 @@
 import logging
 import asyncio
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-import aiohttp
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
 import json
 import os
+from .metrics import WINDOWS, EndpointMetrics, WindowedCounter
+from .shared_state import SharedEndpointMetrics, SharedState, shared_state
+from .alert_dispatcher import AlertDispatcher, alert_dispatcher
+
+# Bornes des buckets exportés au format Prometheus (secondes)
+PROMETHEUS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
 
 class MonitoringService:
-    def __init__(self):
+    def __init__(self, dispatcher: AlertDispatcher = alert_dispatcher, shared: Optional[SharedState] = None):
         self.logger = logging.getLogger(__name__)
-        self.performance_metrics: Dict[str, List[float]] = {}
+        self.alert_dispatcher = dispatcher
+        # Histogrammes et compteurs glissants à mémoire fixe, par endpoint
+        self.performance_metrics: Dict[str, EndpointMetrics] = {}
+        # Mode multi-workers : métriques par endpoint dans le segment partagé du nœud
+        self.shared_endpoints = shared.endpoints if shared else None
         self.error_counts: Dict[str, int] = {}
+        self.error_windows: Dict[str, WindowedCounter] = {}
+        self.request_window = WindowedCounter()
+        # Fournisseurs de statistiques des composants (files d'attente, pools...)
+        self.stats_providers: Dict[str, Callable[[], Dict]] = {}
         self.alert_thresholds = {
             "error_rate": 0.05,  # 5% d'erreurs
             "response_time": 2.0,  # 2 secondes
             "memory_usage": 0.8,  # 80% de mémoire
         }
         
-    async def log_performance(self, endpoint: str, response_time: float):
-        """Enregistrer les métriques de performance"""
-        if endpoint not in self.performance_metrics:
-            self.performance_metrics[endpoint] = []
+    async def log_performance(self, endpoint: str, response_time: float, error: bool = False,
+                              stages: Optional[Dict[str, float]] = None):
+        """Enregistrer les métriques de performance (O(1)), avec le détail par étape si fourni"""
+        metrics = self.performance_metrics.get(endpoint)
+        if metrics is None:
+            shared = self.shared_endpoints.get_or_create(endpoint) if self.shared_endpoints else None
+            metrics = self.performance_metrics[endpoint] = shared or EndpointMetrics()
         
-        self.performance_metrics[endpoint].append(response_time)
-        
-        # Garder seulement les 1000 dernières mesures
-        if len(self.performance_metrics[endpoint]) > 1000:
-            self.performance_metrics[endpoint] = self.performance_metrics[endpoint][-1000:]
+        metrics.record(response_time, error)
+        if stages:
+            metrics.record_stages(stages)
+        self.request_window.add()
         
         # Vérifier les seuils d'alerte
         await self._check_performance_alerts(endpoint, response_time)
@@ -37,6 +55,9 @@ class MonitoringService:
             self.error_counts[error_type] = 0
         
         self.error_counts[error_type] += 1
+        if error_type not in self.error_windows:
+            self.error_windows[error_type] = WindowedCounter()
+        self.error_windows[error_type].add()
         
         # Log détaillé de l'erreur
         self.logger.error(f"Error {error_type}: {error_message}", extra={
@@ -52,101 +73,167 @@ class MonitoringService:
     async def _check_performance_alerts(self, endpoint: str, response_time: float):
         """Vérifier les alertes de performance"""
         if response_time > self.alert_thresholds["response_time"]:
-            await self._send_alert(
+            self._send_alert(
                 "PERFORMANCE",
-                f"Temps de réponse élevé sur {endpoint}: {response_time:.2f}s"
+                f"Temps de réponse élevé sur {endpoint}: {response_time:.2f}s",
+                key=f"PERFORMANCE:{endpoint}"
             )
     
     async def _check_error_alerts(self, error_type: str):
-        """Vérifier les alertes d'erreur"""
-        total_requests = sum(len(metrics) for metrics in self.performance_metrics.values())
+        """Vérifier les alertes d'erreur (taux sur les 5 dernières minutes)"""
+        total_requests = self.request_window.sum(WINDOWS["5m"])
         if total_requests > 0:
-            error_rate = self.error_counts.get(error_type, 0) / total_requests
+            error_rate = self.error_windows[error_type].sum(WINDOWS["5m"]) / total_requests
             if error_rate > self.alert_thresholds["error_rate"]:
-                await self._send_alert(
+                self._send_alert(
                     "ERROR",
-                    f"Taux d'erreur élevé pour {error_type}: {error_rate:.2%}"
+                    f"Taux d'erreur élevé pour {error_type}: {error_rate:.2%}",
+                    key=f"ERROR:{error_type}"
                 )
     
-    async def _send_alert(self, alert_type: str, message: str):
-        """Envoyer une alerte"""
-        alert_data = {
-            "type": alert_type,
-            "message": message,
-            "timestamp": datetime.utcnow().isoformat(),
-            "service": "trading-api"
-        }
-        
-        # Log de l'alerte
-        self.logger.warning(f"ALERT: {alert_type} - {message}")
-        
-        # Envoyer via webhook (configurable)
-        await self._send_webhook_alert(alert_data)
-        
-        # Envoyer via Telegram (si configuré)
-        await self._send_telegram_alert(alert_data)
+    def _send_alert(self, alert_type: str, message: str, key: Optional[str] = None):
+        """Envoyer une alerte (remise au dispatcher, sans attente réseau)"""
+        if self.alert_dispatcher.submit_alert(alert_type, message, key):
+            # Log de l'alerte (une seule fois par fenêtre de regroupement)
+            self.logger.warning(f"ALERT: {alert_type} - {message}")
     
-    async def _send_webhook_alert(self, alert_data: Dict):
-        """Envoyer une alerte via webhook"""
-        webhook_url = os.environ.get("ALERT_WEBHOOK_URL")
-        if not webhook_url:
-            return
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(webhook_url, json=alert_data) as response:
-                    if response.status != 200:
-                        self.logger.error(f"Échec envoi webhook: {response.status}")
-        except Exception as e:
-            self.logger.error(f"Erreur envoi webhook: {e}")
+    def _endpoints(self) -> Dict[str, EndpointMetrics]:
+        """Métriques par endpoint ; en mode multi-workers, celles de tous les workers du nœud"""
+        if self.shared_endpoints is None:
+            return self.performance_metrics
+        endpoints = {
+            endpoint: metrics for endpoint, metrics in self.performance_metrics.items()
+            if not isinstance(metrics, SharedEndpointMetrics)
+        }
+        endpoints.update(self.shared_endpoints.all())
+        return endpoints
     
-    async def _send_telegram_alert(self, alert_data: Dict):
-        """Envoyer une alerte via Telegram"""
-        bot_token = os.environ.get("TELEGRAM_BOT_TOKEN")
-        chat_id = os.environ.get("TELEGRAM_CHAT_ID")
-        
-        if not bot_token or not chat_id:
-            return
-        
-        try:
-            message = f"🚨 ALERTE {alert_data['type']}\n\n{alert_data['message']}\n\n⏰ {alert_data['timestamp']}"
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json={
-                    "chat_id": chat_id,
-                    "text": message,
-                    "parse_mode": "HTML"
-                }) as response:
-                    if response.status != 200:
-                        self.logger.error(f"Échec envoi Telegram: {response.status}")
-        except Exception as e:
-            self.logger.error(f"Erreur envoi Telegram: {e}")
+    def register_stats_provider(self, name: str, provider: Callable[[], Dict]):
+        """Exposer les statistiques d'un composant dans le résumé des métriques"""
+        self.stats_providers[name] = provider
     
     def get_metrics_summary(self) -> Dict:
         """Obtenir un résumé des métriques"""
         summary = {
             "performance": {},
             "errors": self.error_counts.copy(),
+            "components": {name: provider() for name, provider in self.stats_providers.items()},
             "timestamp": datetime.utcnow().isoformat()
         }
         
-        for endpoint, metrics in self.performance_metrics.items():
-            if metrics:
-                summary["performance"][endpoint] = {
-                    "avg_response_time": sum(metrics) / len(metrics),
-                    "min_response_time": min(metrics),
-                    "max_response_time": max(metrics),
-                    "request_count": len(metrics)
-                }
+        for endpoint, metrics in self._endpoints().items():
+            summary["performance"][endpoint] = metrics.summary()
+        
+        summary["error_rates"] = self._error_rates()
         
         return summary
     
+    def _error_rates(self) -> Dict:
+        """Taux d'erreur par type sur les fenêtres 1m / 5m / 1h"""
+        rates = {}
+        for name, seconds in WINDOWS.items():
+            requests = self.request_window.sum(seconds)
+            rates[name] = {
+                error_type: counter.sum(seconds) / requests if requests else 0.0
+                for error_type, counter in self.error_windows.items()
+            }
+        return rates
+    
+    def render_prometheus(self) -> str:
+        """Exporter les métriques au format texte Prometheus"""
+        endpoints = self._endpoints()
+        lines = [
+            "# HELP http_request_duration_seconds Durée des requêtes par route",
+            "# TYPE http_request_duration_seconds histogram"
+        ]
+        for endpoint, metrics in endpoints.items():
+            label = f'endpoint="{_label(endpoint)}"'
+            counts = metrics.histogram.cumulative_buckets(PROMETHEUS_BUCKETS)
+            for bound, count in zip(PROMETHEUS_BUCKETS, counts):
+                lines.append(f'http_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'http_request_duration_seconds_bucket{{{label},le="+Inf"}} {metrics.histogram.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{label}}} {metrics.histogram.total}")
+            lines.append(f"http_request_duration_seconds_count{{{label}}} {metrics.histogram.count}")
+        
+        lines += [
+            "# HELP http_request_stage_duration_seconds Durée par étape (auth, db, exchange, notification), requêtes échantillonnées",
+            "# TYPE http_request_stage_duration_seconds histogram"
+        ]
+        for endpoint, metrics in endpoints.items():
+            for stage, histogram in metrics.stages.items():
+                label = f'endpoint="{_label(endpoint)}",stage="{_label(stage)}"'
+                counts = histogram.cumulative_buckets(PROMETHEUS_BUCKETS)
+                for bound, count in zip(PROMETHEUS_BUCKETS, counts):
+                    lines.append(f'http_request_stage_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'http_request_stage_duration_seconds_bucket{{{label},le="+Inf"}} {histogram.count}')
+                lines.append(f"http_request_stage_duration_seconds_sum{{{label}}} {histogram.total}")
+                lines.append(f"http_request_stage_duration_seconds_count{{{label}}} {histogram.count}")
+        
+        lines += [
+            "# HELP http_request_duration_quantile_seconds Quantiles de latence sur les 5 dernières minutes",
+            "# TYPE http_request_duration_quantile_seconds gauge"
+        ]
+        for endpoint, metrics in endpoints.items():
+            quantiles = metrics.recent.window(WINDOWS["5m"]).quantiles((0.5, 0.95, 0.99))
+            for q, value in zip(("0.5", "0.95", "0.99"), quantiles):
+                if value is not None:
+                    lines.append(f'http_request_duration_quantile_seconds{{endpoint="{_label(endpoint)}",quantile="{q}"}} {value}')
+        
+        lines += [
+            "# HELP http_requests_window Requêtes et erreurs par fenêtre glissante",
+            "# TYPE http_requests_window gauge"
+        ]
+        for endpoint, metrics in endpoints.items():
+            for name, seconds in WINDOWS.items():
+                label = f'endpoint="{_label(endpoint)}",window="{name}"'
+                lines.append(f"http_requests_window{{{label}}} {metrics.requests.sum(seconds)}")
+                lines.append(f'http_requests_window{{{label},status="error"}} {metrics.errors.sum(seconds)}')
+        
+        lines += [
+            "# HELP app_errors_total Erreurs applicatives par type",
+            "# TYPE app_errors_total counter"
+        ]
+        for error_type, count in self.error_counts.items():
+            lines.append(f'app_errors_total{{type="{_label(error_type)}"}} {count}')
+        
+        lines += [
+            "# HELP app_error_rate Taux d'erreur par type et par fenêtre",
+            "# TYPE app_error_rate gauge"
+        ]
+        for window, rates in self._error_rates().items():
+            for error_type, rate in rates.items():
+                lines.append(f'app_error_rate{{type="{_label(error_type)}",window="{window}"}} {rate}')
+        
+        lines += [
+            "# HELP app_component_stat Statistiques numériques des composants",
+            "# TYPE app_component_stat gauge"
+        ]
+        for component, provider in self.stats_providers.items():
+            for stat, value in _flatten(provider()):
+                lines.append(f'app_component_stat{{component="{_label(component)}",stat="{_label(stat)}"}} {value}')
+        
+        return "\n".join(lines) + "\n"
+    
     async def cleanup_old_metrics(self):
-        """Nettoyer les anciennes métriques"""
-        cutoff_time = datetime.utcnow() - timedelta(hours=24)
-        
+        """Nettoyer les anciennes métriques (endpoints sans trafic depuis une heure)
+
+        Les entrées du segment partagé sont conservées : leur nombre est borné par les gabarits de route.
+        """
         for endpoint in list(self.performance_metrics.keys()):
-            # Garder seulement les métriques des dernières 24h
-            if len(self.performance_metrics[endpoint]) > 1000:
-                self.performance_metrics[endpoint] = self.performance_metrics[endpoint][-1000:] 
\ No newline at end of file
+            metrics = self.performance_metrics[endpoint]
+            if not isinstance(metrics, SharedEndpointMetrics) and not metrics.requests.sum(WINDOWS["1h"]):
+                del self.performance_metrics[endpoint]
+
+def _flatten(stats: Dict, prefix: str = ""):
+    """Aplatir un dictionnaire de statistiques en paires (nom, valeur numérique)"""
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+monitoring_service = MonitoringService(shared=shared_state)
+monitoring_service.register_stats_provider("alert_dispatcher", alert_dispatcher.get_stats)
+if shared_state is not None:
+    monitoring_service.register_stats_provider("shared_state", shared_state.get_stats)
\ No newline at end of file
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from passlib.context import CryptContext
+from .metrics import LatencyHistogram
+from .monitoring import monitoring_service
+
+class HasherBusy(Exception):
+    """Trop de hachages en attente : la requête doit être refusée (503) plutôt que mise en file"""
+
+def crypt_context(rounds: int) -> CryptContext:
+    """Contexte bcrypt au coût configuré ; tout hash d'un autre coût est à recalculer"""
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds
+    )
+
+class PasswordHasher:
+    """Hachage et vérification bcrypt hors de la boucle d'événements
+
+    bcrypt libère le GIL pendant le calcul : un pool de threads borné suffit. Au-delà de
+    max_pending appels en attente, les nouveaux sont refusés au lieu d'allonger la file.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int = 4, max_pending: int = 64):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self.pending = 0
+        self.latency = LatencyHistogram()
+        self.stats = {"hashes": 0, "verifications": 0, "rehashes": 0, "rejected": 0}
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise HasherBusy()
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+        finally:
+            self.pending -= 1
+            self.latency.record(time.perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        self.stats["hashes"] += 1
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """Vérifier un mot de passe ; retourne aussi le nouveau hash si le coût a changé"""
+        if not hashed:
+            return False, None
+        self.stats["verifications"] += 1
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        if new_hash:
+            self.stats["rehashes"] += 1
+        return valid, new_hash
+
+    def close(self):
+        self.pool.shutdown(wait=False)
+
+    def get_stats(self) -> Dict:
+        p50, p99 = self.latency.quantiles((0.5, 0.99))
+        return {
+            **self.stats,
+            "pending": self.pending,
+            "workers": self.max_workers,
+            "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+            "p99_ms": round(p99 * 1000, 2) if p99 is not None else None
+        }
+
+password_hasher = PasswordHasher(
+    crypt_context(int(os.environ.get("BCRYPT_ROUNDS", "12"))),
+    max_workers=int(os.environ.get("PASSWORD_HASH_WORKERS", "4")),
+    max_pending=int(os.environ.get("PASSWORD_HASH_MAX_PENDING", "64"))
+)
+
+monitoring_service.register_stats_provider("password_hasher", password_hasher.get_stats)
\ No newline at end of file
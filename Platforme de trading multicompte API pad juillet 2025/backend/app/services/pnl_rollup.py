@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from ..database import SessionLocal
+from ..models import PnLRollup, Trade
+from .trade_archive import trade_archive
+
+# (user_id, day, strategy, symbol, exchange)
+BucketKey = Tuple[int, date, str, str, str]
+
+GROUP_COLUMNS = {
+    "strategy": PnLRollup.strategy,
+    "symbol": PnLRollup.symbol,
+    "exchange": PnLRollup.exchange
+}
+
+def empty_stats() -> Dict:
+    return {
+        "trade_count": 0, "volume": 0.0, "realized_pnl": 0.0, "wins": 0, "losses": 0,
+        "peak_pnl": 0.0, "trough_pnl": 0.0, "max_drawdown": 0.0
+    }
+
+def merge_stats(first: Dict, second: Dict) -> Dict:
+    """Combiner deux séquences de trades consécutives (first puis second)
+
+    Les extrêmes du PnL cumulé suffisent pour obtenir le drawdown de la séquence complète.
+    """
+    return {
+        "trade_count": first["trade_count"] + second["trade_count"],
+        "volume": first["volume"] + second["volume"],
+        "realized_pnl": first["realized_pnl"] + second["realized_pnl"],
+        "wins": first["wins"] + second["wins"],
+        "losses": first["losses"] + second["losses"],
+        "peak_pnl": max(first["peak_pnl"], first["realized_pnl"] + second["peak_pnl"]),
+        "trough_pnl": min(first["trough_pnl"], first["realized_pnl"] + second["trough_pnl"]),
+        "max_drawdown": max(
+            first["max_drawdown"],
+            second["max_drawdown"],
+            first["peak_pnl"] - (first["realized_pnl"] + second["trough_pnl"])
+        )
+    }
+
+def trade_stats(trade: Trade) -> Dict:
+    pnl = trade.pnl or 0.0
+    return {
+        "trade_count": 1,
+        "volume": abs(trade.quantity * trade.price),
+        "realized_pnl": pnl,
+        "wins": 1 if trade.pnl is not None and pnl > 0 else 0,
+        "losses": 1 if trade.pnl is not None and pnl <= 0 else 0,
+        "peak_pnl": max(0.0, pnl),
+        "trough_pnl": min(0.0, pnl),
+        "max_drawdown": max(0.0, -pnl)
+    }
+
+def bucket_key(trade: Trade) -> BucketKey:
+    timestamp = trade.timestamp or datetime.utcnow()
+    return (trade.user_id, timestamp.date(), trade.strategy or "", trade.symbol, trade.exchange)
+
+def aggregate_trades(trades: Iterable[Trade]) -> Dict[BucketKey, Dict]:
+    """Agréger des trades (triés par date) par jour et par bucket"""
+    buckets: Dict[BucketKey, Dict] = {}
+    for trade in trades:
+        key = bucket_key(trade)
+        buckets[key] = merge_stats(buckets.get(key) or empty_stats(), trade_stats(trade))
+    return buckets
+
+class PnLRollupService:
+    """Tenue incrémentale des agrégats PnL journaliers"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+
+    async def apply_trades(self, db: AsyncSession, trades: List[Trade]):
+        """Répercuter de nouveaux trades dans les agrégats (dans la transaction de l'appelant)"""
+        for key, stats in aggregate_trades(trades).items():
+            user_id, day, strategy, symbol, exchange = key
+            stmt = insert(PnLRollup).values(
+                user_id=user_id, day=day, strategy=strategy, symbol=symbol, exchange=exchange,
+                updated_at=datetime.utcnow(), **stats
+            )
+            existing, new = PnLRollup.__table__.c, stmt.excluded
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_pnl_daily_rollups_bucket",
+                set_={
+                    "trade_count": existing.trade_count + new.trade_count,
+                    "volume": existing.volume + new.volume,
+                    "realized_pnl": existing.realized_pnl + new.realized_pnl,
+                    "wins": existing.wins + new.wins,
+                    "losses": existing.losses + new.losses,
+                    "peak_pnl": func.greatest(existing.peak_pnl, existing.realized_pnl + new.peak_pnl),
+                    "trough_pnl": func.least(existing.trough_pnl, existing.realized_pnl + new.trough_pnl),
+                    "max_drawdown": func.greatest(
+                        existing.max_drawdown,
+                        new.max_drawdown,
+                        existing.peak_pnl - (existing.realized_pnl + new.trough_pnl)
+                    ),
+                    "updated_at": new.updated_at
+                }
+            )
+            await db.execute(stmt)
+
+    async def rebuild(self, session_factory=SessionLocal, user_id: Optional[int] = None,
+                      chunk_size: int = 5000, since: Optional[date] = None) -> int:
+        """Recalculer les agrégats depuis la table des trades (backfill)
+
+        Les jours antérieurs à `since` (par défaut, ceux des partitions archivées) sont conservés.
+        """
+        since = since or trade_archive.live_since()
+        async with session_factory() as db:
+            reset = delete(PnLRollup)
+            query = select(Trade).order_by(Trade.timestamp, Trade.id).execution_options(yield_per=chunk_size)
+            if user_id is not None:
+                reset = reset.where(PnLRollup.user_id == user_id)
+                query = query.where(Trade.user_id == user_id)
+            if since is not None:
+                reset = reset.where(PnLRollup.day >= since)
+                query = query.where(Trade.timestamp >= datetime.combine(since, datetime.min.time()))
+            await db.execute(reset)
+
+            buckets: Dict[BucketKey, Dict] = {}
+            count = 0
+            result = await db.stream(query)
+            async for trades in result.scalars().partitions(chunk_size):
+                for key, stats in aggregate_trades(trades).items():
+                    buckets[key] = merge_stats(buckets[key], stats) if key in buckets else stats
+                count += len(trades)
+
+            db.add_all([
+                PnLRollup(user_id=key[0], day=key[1], strategy=key[2], symbol=key[3], exchange=key[4], **stats)
+                for key, stats in buckets.items()
+            ])
+            await db.commit()
+
+        self.logger.info(f"Agrégats PnL reconstruits: {count} trades, {len(buckets)} buckets")
+        return len(buckets)
+
+    async def get_performance(self, db: AsyncSession, user_id: int, group_by: str = "strategy",
+                              start: Optional[date] = None, end: Optional[date] = None) -> List[Dict]:
+        """Performances par stratégie, symbole ou exchange, lues depuis les agrégats"""
+        group_column = GROUP_COLUMNS[group_by]
+        query = (
+            select(PnLRollup)
+            .where(PnLRollup.user_id == user_id)
+            .order_by(group_column, PnLRollup.day, PnLRollup.id)
+        )
+        if start:
+            query = query.where(PnLRollup.day >= start)
+        if end:
+            query = query.where(PnLRollup.day < end)
+
+        result = await db.execute(query)
+        # Les buckets d'un même groupe sont combinés jour par jour ; au sein d'une journée
+        # le drawdown est donc approché à la granularité du bucket
+        groups: Dict[str, Dict] = {}
+        for rollup in result.scalars():
+            stats = {column: getattr(rollup, column) for column in empty_stats()}
+            key = getattr(rollup, group_by)
+            groups[key] = merge_stats(groups[key], stats) if key in groups else stats
+
+        performance = []
+        for key, stats in groups.items():
+            closed = stats["wins"] + stats["losses"]
+            performance.append({
+                "group": key,
+                "trade_count": stats["trade_count"],
+                "volume": stats["volume"],
+                "realized_pnl": stats["realized_pnl"],
+                "win_rate": stats["wins"] / closed if closed else None,
+                "max_drawdown": stats["max_drawdown"]
+            })
+        return performance
+
+pnl_rollup_service = PnLRollupService()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance des agrégats PnL")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user-id", type=int)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(pnl_rollup_service.rebuild(user_id=args.user_id))
\ No newline at end of file
@@ -0,0 +1,330 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import case, func, union_all
+from sqlalchemy.future import select
+from ..database import SessionLocal
+from ..models import ArchivedPosition, Trade
+from .market_data import MarketDataService, market_data_service
+from .monitoring import monitoring_service
+
+# (user_id, exchange, symbol)
+PositionKey = Tuple[int, str, str]
+
+# Écart de quantité en dessous duquel une position est considérée conforme
+DRIFT_TOLERANCE = 1e-9
+
+class Position:
+    """Position nette d'un compte sur un symbole et un exchange"""
+
+    __slots__ = ("user_id", "exchange", "symbol", "quantity", "net_cost", "entry_price", "buying", "selling")
+
+    def __init__(self, user_id: int, exchange: str, symbol: str, quantity: float = 0.0, net_cost: float = 0.0):
+        self.user_id = user_id
+        self.exchange = exchange
+        self.symbol = symbol
+        # Quantité signée (positive : long) et coût net signé des fills (additifs, donc réconciliables)
+        self.quantity = quantity
+        self.net_cost = net_cost
+        # Prix d'entrée moyen de la quantité ouverte (base du PnL réalisé des fills qui la réduisent)
+        self.entry_price = self.cost_price
+        # Ordres acceptés par le contrôle de risque, pas encore enregistrés (quantités achetées, vendues)
+        self.buying = 0.0
+        self.selling = 0.0
+
+    def worst_quantity(self, delta: float = 0.0) -> float:
+        """Quantité absolue si tous les ordres en cours d'un même sens (et `delta`) étaient exécutés"""
+        return max(abs(self.quantity + self.buying + max(delta, 0.0)),
+                   abs(self.quantity - self.selling + min(delta, 0.0)))
+
+    @property
+    def cost_price(self) -> Optional[float]:
+        """Prix de revient net (PnL réalisé inclus)"""
+        return self.net_cost / self.quantity if self.quantity else None
+
+    def to_dict(self) -> Dict:
+        return {
+            "exchange": self.exchange,
+            "symbol": self.symbol,
+            "quantity": self.quantity,
+            "cost_price": self.cost_price
+        }
+
+def signed(side: str, quantity: float) -> float:
+    return quantity if side.upper() == "BUY" else -quantity
+
+def fill_outcome(quantity: float, entry_price: Optional[float], delta: float,
+                 price: float) -> Tuple[Optional[float], Optional[float]]:
+    """Prix d'entrée moyen après un fill de quantité signée `delta`, et PnL réalisé du fill
+
+    Le PnL est None si le fill ne réduit pas la position (ouverture ou renforcement).
+    """
+    if abs(quantity) <= DRIFT_TOLERANCE or quantity * delta > 0:
+        opened = abs(quantity) * (entry_price or price) if abs(quantity) > DRIFT_TOLERANCE else 0.0
+        return (opened + abs(delta) * price) / (abs(quantity) + abs(delta)), None
+
+    closed = min(abs(delta), abs(quantity))
+    pnl = closed * (price - entry_price) * (1.0 if quantity > 0 else -1.0)
+    remaining = quantity + delta
+    if abs(remaining) <= DRIFT_TOLERANCE:
+        return None, pnl
+    # Position réduite : même prix d'entrée ; position retournée : le reliquat est ouvert au prix du fill
+    return (entry_price if remaining * quantity > 0 else price), pnl
+
+class PositionBook:
+    """Positions nettes et exposition par compte, tenues en mémoire à chaque fill
+
+    Chargé une fois au démarrage, puis réconcilié périodiquement avec la table des trades.
+    """
+
+    def __init__(self, session_factory=SessionLocal, market_data: MarketDataService = market_data_service,
+                 max_position_notional: Optional[float] = None, max_account_exposure: Optional[float] = None):
+        self.logger = logging.getLogger(__name__)
+        self.session_factory = session_factory
+        self.market_data = market_data
+        self.max_position_notional = max_position_notional
+        self.max_account_exposure = max_account_exposure
+        self.positions: Dict[PositionKey, Position] = {}
+        self.by_user: Dict[int, Set[PositionKey]] = {}
+        # Clés modifiées depuis le début de la réconciliation en cours, et trades en cours d'enregistrement
+        self.touched: Optional[Set[PositionKey]] = None
+        self.in_flight: Dict[PositionKey, int] = {}
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"fills": 0, "reconciliations": 0, "drifts": 0, "last_reconcile_ms": None}
+
+    async def load(self) -> int:
+        """Charger les positions nettes depuis la base (une requête agrégée)"""
+        self.positions = {}
+        self.by_user = {}
+        for key, (quantity, net_cost) in (await self._load_from_db()).items():
+            position = self._position(key)
+            position.quantity, position.net_cost = quantity, net_cost
+            position.entry_price = position.cost_price
+        self.logger.info(f"Carnet de positions chargé: {len(self.positions)} positions")
+        return len(self.positions)
+
+    async def start(self, interval: float = 300.0):
+        """Démarrer la réconciliation périodique"""
+        if self.task is None:
+            self.task = asyncio.create_task(self._reconcile_loop(interval))
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def apply_fill(self, user_id: int, exchange: str, symbol: str, side: str, quantity: float, price: float):
+        """Répercuter un fill enregistré (O(1))"""
+        key = (user_id, exchange, symbol)
+        position = self._position(key)
+        delta = signed(side, quantity)
+        position.entry_price, _ = fill_outcome(position.quantity, position.entry_price, delta, price)
+        position.quantity += delta
+        position.net_cost += delta * price
+        self.stats["fills"] += 1
+        if self.touched is not None:
+            self.touched.add(key)
+
+    @contextmanager
+    def recording(self, keys: Iterable[PositionKey]):
+        """Encadrer l'enregistrement d'un trade (commit puis apply_fill)
+
+        La réconciliation ignore ces positions : le trade peut être visible en base
+        avant d'être répercuté dans le carnet.
+        """
+        keys = list(keys)
+        for key in keys:
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            for key in keys:
+                self.in_flight[key] -= 1
+                if not self.in_flight[key]:
+                    del self.in_flight[key]
+
+    def set_realized_pnl(self, rows: Iterable[Dict]):
+        """Renseigner la colonne pnl de trades à enregistrer (dans l'ordre), avant `apply_fill`
+
+        Le PnL réalisé d'un fill qui réduit une position est calculé sur le prix d'entrée moyen ;
+        les autres trades ont un pnl None.
+        """
+        pending: Dict[PositionKey, Tuple[float, Optional[float]]] = {}
+        for row in rows:
+            key = (row["user_id"], row["exchange"], row["symbol"])
+            if key not in pending:
+                position = self.positions.get(key)
+                pending[key] = (position.quantity, position.entry_price) if position else (0.0, None)
+            quantity, entry_price = pending[key]
+            delta = signed(row["side"], row["quantity"])
+            entry_price, row["pnl"] = fill_outcome(quantity, entry_price, delta, row["price"])
+            pending[key] = (quantity + delta, entry_price)
+
+    def apply_trade(self, trade: Trade):
+        self.apply_fill(trade.user_id, trade.exchange, trade.symbol, trade.side, trade.quantity, trade.price)
+
+    def get(self, user_id: int, exchange: str, symbol: str) -> Optional[Position]:
+        return self.positions.get((user_id, exchange, symbol))
+
+    def get_user_positions(self, user_id: int) -> List[Position]:
+        return [self.positions[key] for key in self.by_user.get(user_id, ())]
+
+    def mark_price(self, position: Position) -> Optional[float]:
+        """Dernier prix de marché, à défaut le prix de revient"""
+        return self.market_data.last_price(position.exchange, position.symbol) or position.cost_price
+
+    def account_exposure(self, user_id: int, reserved: bool = False) -> float:
+        """Exposition brute du compte (somme des notionnels absolus au prix de marché)
+
+        Avec `reserved`, chaque position compte ses ordres en cours dans le pire cas.
+        """
+        exposure = 0.0
+        for position in self.get_user_positions(user_id):
+            quantity = position.worst_quantity() if reserved else abs(position.quantity)
+            if quantity:
+                exposure += quantity * (self.mark_price(position) or 0.0)
+        return exposure
+
+    def check_order(self, user_id: int, exchange: str, symbol: str, side: str, quantity: float) -> Optional[str]:
+        """Contrôles pré-trade sans accès base ; retourne le motif de refus, sinon None"""
+        if self.max_position_notional is None and self.max_account_exposure is None:
+            return None
+        price = self.market_data.last_price(exchange, symbol)
+        position = self.get(user_id, exchange, symbol)
+        if price is None and position is not None:
+            price = position.cost_price
+        if price is None:
+            return None  # Pas de prix connu : contrôle impossible, l'ordre n'est pas bloqué
+
+        # Les ordres déjà acceptés mais pas encore enregistrés comptent comme exécutés
+        delta = signed(side, quantity)
+        current = position.worst_quantity() if position else 0.0
+        after = position.worst_quantity(delta) if position else abs(delta)
+        if self.max_position_notional is not None and after * price > self.max_position_notional:
+            return f"Position maximale dépassée sur {symbol} ({after * price:.2f} > {self.max_position_notional:.2f})"
+        if self.max_account_exposure is not None:
+            exposure = self.account_exposure(user_id, reserved=True) + (after - current) * price
+            if exposure > self.max_account_exposure:
+                return f"Exposition maximale du compte dépassée ({exposure:.2f} > {self.max_account_exposure:.2f})"
+        return None
+
+    def reserve(self, user_id: int, exchange: str, symbol: str, side: str, quantity: float) -> Optional[str]:
+        """Contrôler un ordre et, s'il est accepté, réserver sa quantité jusqu'à `release`
+
+        Contrôle et réservation sans attente entre les deux : des ordres concurrents ou d'un
+        même lot ne peuvent pas dépasser ensemble les limites.
+        """
+        reason = self.check_order(user_id, exchange, symbol, side, quantity)
+        if reason is None:
+            position = self._position((user_id, exchange, symbol))
+            if side.upper() == "BUY":
+                position.buying += quantity
+            else:
+                position.selling += quantity
+        return reason
+
+    def release(self, user_id: int, exchange: str, symbol: str, side: str, quantity: float):
+        """Libérer la réservation d'un ordre (fill répercuté dans le carnet, ou échec)"""
+        position = self.positions.get((user_id, exchange, symbol))
+        if position is None:
+            return
+        if side.upper() == "BUY":
+            position.buying = max(0.0, position.buying - quantity)
+        else:
+            position.selling = max(0.0, position.selling - quantity)
+
+    async def reconcile(self) -> List[Dict]:
+        """Comparer le carnet à la base ; les écarts sont signalés puis corrigés
+
+        Les positions modifiées pendant la lecture, ou dont un trade est en cours
+        d'enregistrement, sont ignorées jusqu'à la prochaine passe.
+        """
+        started = time.perf_counter()
+        self.touched = set()
+        try:
+            expected = await self._load_from_db()
+            touched = self.touched
+        finally:
+            self.touched = None
+
+        drifts = []
+        for key in set(expected) | set(self.positions):
+            if key in touched or key in self.in_flight:
+                continue
+            quantity, net_cost = expected.get(key, (0.0, 0.0))
+            position = self.positions.get(key)
+            actual = position.quantity if position else 0.0
+            if abs(actual - quantity) > DRIFT_TOLERANCE:
+                drifts.append({"user_id": key[0], "exchange": key[1], "symbol": key[2],
+                               "book": actual, "database": quantity})
+                position = self._position(key)
+                position.quantity, position.net_cost = quantity, net_cost
+                position.entry_price = position.cost_price
+
+        self.stats["reconciliations"] += 1
+        self.stats["drifts"] += len(drifts)
+        self.stats["last_reconcile_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        if drifts:
+            await monitoring_service.log_error(
+                "position_drift",
+                f"{len(drifts)} positions divergentes corrigées",
+                {"drifts": drifts[:20]}
+            )
+        return drifts
+
+    async def _reconcile_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                self.logger.error(f"Échec de la réconciliation des positions: {e}")
+
+    async def _load_from_db(self) -> Dict[PositionKey, Tuple[float, float]]:
+        signed_quantity = case((Trade.side == "BUY", Trade.quantity), else_=-Trade.quantity)
+        # Trades en base et positions reportées des partitions archivées, en une seule requête (un seul instantané)
+        fills = union_all(
+            select(
+                Trade.user_id.label("user_id"), Trade.exchange.label("exchange"), Trade.symbol.label("symbol"),
+                signed_quantity.label("quantity"), (signed_quantity * Trade.price).label("net_cost")
+            ),
+            select(
+                ArchivedPosition.user_id, ArchivedPosition.exchange, ArchivedPosition.symbol,
+                ArchivedPosition.quantity, ArchivedPosition.net_cost
+            )
+        ).subquery()
+        query = (
+            select(
+                fills.c.user_id, fills.c.exchange, fills.c.symbol,
+                func.sum(fills.c.quantity), func.sum(fills.c.net_cost)
+            )
+            .group_by(fills.c.user_id, fills.c.exchange, fills.c.symbol)
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(query)
+            return {(row[0], row[1], row[2]): (row[3] or 0.0, row[4] or 0.0) for row in result}
+
+    def _position(self, key: PositionKey) -> Position:
+        position = self.positions.get(key)
+        if position is None:
+            position = self.positions[key] = Position(*key)
+            self.by_user.setdefault(key[0], set()).add(key)
+        return position
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "positions": len(self.positions), "accounts": len(self.by_user)}
+
+def _optional_float(name: str) -> Optional[float]:
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+position_book = PositionBook(
+    max_position_notional=_optional_float("RISK_MAX_POSITION_NOTIONAL"),
+    max_account_exposure=_optional_float("RISK_MAX_ACCOUNT_EXPOSURE")
+)
+
+monitoring_service.register_stats_provider("position_book", position_book.get_stats)
\ No newline at end of file
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import time
+from typing import Dict, Optional
+from sqlalchemy import event
+from ..models import User
+from ..utils.cache import TTLCache
+from .monitoring import monitoring_service
+
+# Colonnes conservées pour reconstruire l'utilisateur sans requête
+USER_COLUMNS = ("id", "email", "hashed_password", "firebase_uid", "is_admin", "created_at")
+
+class PrincipalCache:
+    """Cache des jetons vérifiés et des utilisateurs authentifiés"""
+
+    def __init__(self, max_tokens: int = 10000, max_users: int = 10000, user_ttl: float = 30.0):
+        # Jetons vérifiés (clé: empreinte du jeton), valides jusqu'à leur expiration
+        self.tokens = TTLCache(max_size=max_tokens)
+        # Lignes utilisateur, durée de vie courte
+        self.users = TTLCache(max_size=max_users, ttl=user_ttl)
+        self.started_at = time.monotonic()
+
+    @staticmethod
+    def _token_hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_token(self, token: str) -> Optional[int]:
+        """Identifiant utilisateur d'un jeton déjà vérifié"""
+        return self.tokens.get(self._token_hash(token))
+
+    def set_token(self, token: str, user_id: int, expires_at: float):
+        ttl = expires_at - time.time()
+        if ttl > 0:
+            self.tokens.set(self._token_hash(token), user_id, ttl=ttl)
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        row = self.users.get(user_id)
+        return User(**row) if row is not None else None
+
+    def set_user(self, user: User):
+        self.users.set(user.id, {column: getattr(user, column) for column in USER_COLUMNS})
+
+    def invalidate_user(self, user_id: int):
+        """Oublier un utilisateur et tous ses jetons"""
+        self.users.pop(user_id)
+        self.tokens.pop_where(lambda key, cached_user_id: cached_user_id == user_id)
+
+    def clear(self):
+        self.tokens.clear()
+        self.users.clear()
+
+    def get_stats(self) -> Dict:
+        uptime = time.monotonic() - self.started_at
+        return {
+            "tokens": self.tokens.get_stats(),
+            "users": self.users.get_stats(),
+            # Chaque succès du cache utilisateur évite un SELECT sur users
+            "db_queries_saved": self.users.hits,
+            "db_queries_saved_per_second": self.users.hits / uptime if uptime else 0.0
+        }
+
+principal_cache = PrincipalCache(
+    max_tokens=int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000")),
+    max_users=int(os.environ.get("PRINCIPAL_CACHE_SIZE", "10000")),
+    user_ttl=float(os.environ.get("PRINCIPAL_USER_TTL", "30"))
+)
+
+monitoring_service.register_stats_provider("principal_cache", principal_cache.get_stats)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
\ No newline at end of file
@@ -0,0 +1,461 @@
+import hashlib
+import logging
+import math
+import mmap
+import os
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .metrics import BUCKET_COUNT, EndpointMetrics, LatencyHistogram, RotatingHistogram, WindowedCounter
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de mode multi-workers
+    fcntl = None
+
+# Chemin du segment, positionné par le superviseur (app.supervisor) avant le lancement des workers
+SHARED_STATE_ENV = "SHARED_STATE_PATH"
+
+MAGIC = int.from_bytes(b"TRDSHM01", "little")
+HEADER_SIZE = 4096
+# Emplacements par groupe : un verrou par groupe, sondage linéaire à l'intérieur
+GROUP_SIZE = 8
+# Verrou de l'annuaire des endpoints (plage réservée de l'en-tête)
+DIRECTORY_LOCK = (64, 8)
+
+NAME_SIZE = 128
+STAGE_NAME_SIZE = 32
+MAX_STAGES = 8
+RECENT_SLOTS = 5
+RECENT_RESOLUTION = 60.0
+COUNTER_RESOLUTION = 10.0
+COUNTER_SLOTS = math.ceil(3600.0 / COUNTER_RESOLUTION)
+
+# Histogramme : buckets et nombre (Q), puis total, min et max (d)
+HISTOGRAM_SIZE = 8 * (BUCKET_COUNT + 4)
+# Compteur glissant : tranches (Q), identifiants de tranche (q), total (Q)
+COUNTER_SIZE = 8 * (2 * COUNTER_SLOTS + 1)
+
+# Entrée d'un endpoint : nom, noms des étapes, tranches de l'histogramme glissant, puis les blocs
+_STAGE_NAMES = NAME_SIZE
+_RECENT_IDS = _STAGE_NAMES + MAX_STAGES * STAGE_NAME_SIZE
+_HISTOGRAMS = 512
+_COUNTERS = _HISTOGRAMS + (1 + RECENT_SLOTS + MAX_STAGES) * HISTOGRAM_SIZE
+ENDPOINT_SIZE = (_COUNTERS + 2 * COUNTER_SIZE + 63) // 64 * 64
+
+def key_hash(key: str) -> int:
+    """Hash 64 bits stable entre processus (0 est réservé aux emplacements libres)"""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+def _fit(name: str, size: int) -> str:
+    """Nom tel qu'il est stocké : tronqué pour tenir en `size` octets UTF-8 (NUL final compris)"""
+    return name.encode()[:size - 1].decode(errors="ignore")
+
+def _read_name(view: memoryview) -> str:
+    return bytes(view).split(b"\0", 1)[0].decode(errors="ignore")
+
+def _write_name(view: memoryview, name: str):
+    raw = name.encode()
+    view[:] = raw + bytes(len(view) - len(raw))
+
+class RangeLock:
+    """Verrou exclusif fcntl sur une plage d'octets du segment (entre processus)"""
+
+    __slots__ = ("fd", "start", "length")
+
+    def __init__(self, fd: int, start: int, length: int):
+        self.fd = fd
+        self.start = start
+        self.length = length
+
+    def __enter__(self):
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, self.length, self.start)
+
+    def __exit__(self, *exc):
+        fcntl.lockf(self.fd, fcntl.LOCK_UN, self.length, self.start)
+
+class SharedLatencyHistogram(LatencyHistogram):
+    """LatencyHistogram dont les compteurs résident dans le segment partagé"""
+
+    __slots__ = ("_counts", "_ints", "_floats")
+
+    def __init__(self, block: memoryview):
+        self._ints = block[:8 * (BUCKET_COUNT + 1)].cast("Q")
+        self._counts = self._ints[:BUCKET_COUNT]
+        self._floats = block[8 * (BUCKET_COUNT + 1):HISTOGRAM_SIZE].cast("d")
+
+    def reset(self):
+        self._ints[:] = array("Q", bytes(8 * (BUCKET_COUNT + 1)))
+        self._floats[:] = array("d", (0.0, math.inf, 0.0))
+
+    @property
+    def counts(self):
+        return self._counts
+
+    @property
+    def count(self) -> int:
+        return self._ints[BUCKET_COUNT]
+
+    @count.setter
+    def count(self, value: int):
+        self._ints[BUCKET_COUNT] = value
+
+    @property
+    def total(self) -> float:
+        return self._floats[0]
+
+    @total.setter
+    def total(self, value: float):
+        self._floats[0] = value
+
+    @property
+    def min(self) -> float:
+        return self._floats[1]
+
+    @min.setter
+    def min(self, value: float):
+        self._floats[1] = value
+
+    @property
+    def max(self) -> float:
+        return self._floats[2]
+
+    @max.setter
+    def max(self, value: float):
+        self._floats[2] = value
+
+class SharedWindowedCounter(WindowedCounter):
+    """WindowedCounter dont les tranches résident dans le segment partagé"""
+
+    __slots__ = ("_total",)
+
+    def __init__(self, block: memoryview):
+        self.resolution = COUNTER_RESOLUTION
+        self.counts = block[:8 * COUNTER_SLOTS].cast("Q")
+        self.slot_ids = block[8 * COUNTER_SLOTS:16 * COUNTER_SLOTS].cast("q")
+        self._total = block[16 * COUNTER_SLOTS:COUNTER_SIZE].cast("Q")
+
+    def reset(self):
+        self.counts[:] = array("Q", bytes(8 * COUNTER_SLOTS))
+        self.slot_ids[:] = array("q", [-1] * COUNTER_SLOTS)
+        self._total[0] = 0
+
+    @property
+    def total(self) -> int:
+        return self._total[0]
+
+    @total.setter
+    def total(self, value: int):
+        self._total[0] = value
+
+class SharedRotatingHistogram(RotatingHistogram):
+    def __init__(self, histograms: List[SharedLatencyHistogram], slot_ids: memoryview):
+        self.resolution = RECENT_RESOLUTION
+        self.histograms = histograms
+        self.slot_ids = slot_ids
+
+class SharedEndpointMetrics(EndpointMetrics):
+    """Métriques d'un endpoint communes à tous les workers, mises à jour sous le verrou de l'entrée"""
+
+    __slots__ = ("entry", "lock", "stage_count")
+
+    def __init__(self, state: "SharedState", offset: int):
+        self.entry = state.buf[offset:offset + ENDPOINT_SIZE]
+        self.lock = RangeLock(state.fd, offset, ENDPOINT_SIZE)
+        self.histogram = SharedLatencyHistogram(self._histogram_block(0))
+        self.recent = SharedRotatingHistogram(
+            [SharedLatencyHistogram(self._histogram_block(1 + i)) for i in range(RECENT_SLOTS)],
+            self.entry[_RECENT_IDS:_RECENT_IDS + 8 * RECENT_SLOTS].cast("q")
+        )
+        self.requests = SharedWindowedCounter(self.entry[_COUNTERS:_COUNTERS + COUNTER_SIZE])
+        self.errors = SharedWindowedCounter(self.entry[_COUNTERS + COUNTER_SIZE:_COUNTERS + 2 * COUNTER_SIZE])
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.stage_count = 0
+        self.refresh()
+
+    def _histogram_block(self, index: int) -> memoryview:
+        start = _HISTOGRAMS + index * HISTOGRAM_SIZE
+        return self.entry[start:start + HISTOGRAM_SIZE]
+
+    def _stage_name(self, index: int) -> memoryview:
+        start = _STAGE_NAMES + index * STAGE_NAME_SIZE
+        return self.entry[start:start + STAGE_NAME_SIZE]
+
+    def initialize(self, name: str):
+        """Remettre l'entrée à zéro puis publier son nom (sous le verrou de l'annuaire)"""
+        for index in range(1 + RECENT_SLOTS + MAX_STAGES):
+            SharedLatencyHistogram(self._histogram_block(index)).reset()
+        self.recent.slot_ids[:] = array("q", [-1] * RECENT_SLOTS)
+        self.requests.reset()
+        self.errors.reset()
+        self.entry[_STAGE_NAMES:_RECENT_IDS] = bytes(_RECENT_IDS - _STAGE_NAMES)
+        _write_name(self.entry[:NAME_SIZE], name)
+
+    def refresh(self):
+        """Prendre en compte les étapes ajoutées par les autres workers"""
+        while self.stage_count < MAX_STAGES:
+            name = _read_name(self._stage_name(self.stage_count))
+            if not name:
+                break
+            self.stages[name] = SharedLatencyHistogram(self._histogram_block(1 + RECENT_SLOTS + self.stage_count))
+            self.stage_count += 1
+
+    def record(self, seconds: float, error: bool = False):
+        with self.lock:
+            super().record(seconds, error)
+
+    def record_stages(self, stages: Dict[str, float]):
+        with self.lock:
+            for name, seconds in stages.items():
+                histogram = self.stages.get(name) or self._add_stage(name)
+                if histogram is not None:
+                    histogram.record(seconds)
+
+    def _add_stage(self, name: str) -> Optional[LatencyHistogram]:
+        self.refresh()
+        key = _fit(name, STAGE_NAME_SIZE)
+        if key not in self.stages:
+            if self.stage_count >= MAX_STAGES:
+                return None  # Table des étapes pleine : étape ignorée pour cet endpoint
+            SharedLatencyHistogram(self._histogram_block(1 + RECENT_SLOTS + self.stage_count)).reset()
+            _write_name(self._stage_name(self.stage_count), key)
+            self.refresh()
+        self.stages[name] = self.stages[key]
+        return self.stages[name]
+
+    def summary(self) -> Dict:
+        self.refresh()
+        return super().summary()
+
+class SharedEndpointTable:
+    """Annuaire des endpoints du segment : une entrée de taille fixe par gabarit de route"""
+
+    def __init__(self, state: "SharedState", offset: int, capacity: int):
+        self.logger = logging.getLogger(__name__)
+        self.state = state
+        self.offset = offset
+        self.capacity = capacity
+        self.lock = RangeLock(state.fd, *DIRECTORY_LOCK)
+        self.views: Dict[int, SharedEndpointMetrics] = {}
+        self.by_name: Dict[str, SharedEndpointMetrics] = {}
+        self.full = False
+
+    def _name(self, index: int) -> str:
+        start = self.offset + index * ENDPOINT_SIZE
+        return _read_name(self.state.buf[start:start + NAME_SIZE])
+
+    def _view(self, index: int) -> SharedEndpointMetrics:
+        view = self.views.get(index)
+        if view is None:
+            view = self.views[index] = SharedEndpointMetrics(self.state, self.offset + index * ENDPOINT_SIZE)
+        return view
+
+    def get_or_create(self, name: str) -> Optional[SharedEndpointMetrics]:
+        """Entrée de l'endpoint, créée au besoin ; None si l'annuaire est plein"""
+        key = _fit(name, NAME_SIZE)
+        view = self.by_name.get(key)
+        if view is not None:
+            return view
+        with self.lock:
+            free = None
+            for index in range(self.capacity):
+                stored = self._name(index)
+                if stored == key:
+                    view = self._view(index)
+                    break
+                if not stored and free is None:
+                    free = index
+            else:
+                if free is None:
+                    if not self.full:
+                        self.full = True
+                        self.logger.warning(f"Segment partagé : {self.capacity} endpoints atteints, métriques locales au-delà")
+                    return None
+                view = self._view(free)
+                view.initialize(key)
+        self.by_name[key] = view
+        return view
+
+    def all(self) -> Dict[str, SharedEndpointMetrics]:
+        """Toutes les entrées publiées, y compris celles créées par les autres workers"""
+        endpoints = {}
+        for index in range(self.capacity):
+            name = self._name(index)
+            if name:
+                view = self._view(index)
+                view.refresh()
+                endpoints[name] = view
+        return endpoints
+
+class SharedBlockList:
+    """Ensemble d'IP bloquées commun aux workers (hashs 64 bits et expirations, lecture sans verrou)
+
+    Un emplacement expiré est réutilisable : le blocage est levé sans nettoyage.
+    """
+
+    def __init__(self, state: "SharedState", offset: int, capacity: int):
+        self.logger = logging.getLogger(__name__)
+        self.state = state
+        self.offset = offset
+        self.groups = capacity // GROUP_SIZE
+        self.hashes = state.buf[offset:offset + 8 * capacity].cast("Q")
+        self.expires = state.buf[offset + 8 * capacity:offset + 16 * capacity].cast("d")
+        # Groupe plein : l'IP reste bloquée dans ce worker (IP -> expiration)
+        self.overflow: Dict[str, float] = {}
+
+    def __contains__(self, ip: str) -> bool:
+        now = time.monotonic()
+        if self.overflow.get(ip, 0.0) > now:
+            return True
+        value = key_hash(ip)
+        start = value % self.groups * GROUP_SIZE
+        return any(
+            self.hashes[index] == value and self.expires[index] > now
+            for index in range(start, start + GROUP_SIZE)
+        )
+
+    def add(self, ip: str, ttl: float):
+        """Bloquer l'IP pendant `ttl` secondes (time.monotonic est commun aux processus)"""
+        value = key_hash(ip)
+        start = value % self.groups * GROUP_SIZE
+        now = time.monotonic()
+        with RangeLock(self.state.fd, self.offset + 8 * start, 8 * GROUP_SIZE):
+            free = None
+            for index in range(start, start + GROUP_SIZE):
+                if self.hashes[index] == value:
+                    free = index
+                    break
+                if free is None and (self.hashes[index] == 0 or self.expires[index] <= now):
+                    free = index
+            if free is not None:
+                self.hashes[free] = value
+                self.expires[free] = now + ttl
+                return
+        self.overflow = {key: expires for key, expires in self.overflow.items() if expires > now}
+        self.overflow[ip] = now + ttl
+        self.logger.warning(f"Liste partagée des IP bloquées saturée, blocage local de {ip}")
+
+    def __len__(self) -> int:
+        now = time.monotonic()
+        return (sum(1 for index, value in enumerate(self.hashes) if value and self.expires[index] > now)
+                + sum(1 for expires in self.overflow.values() if expires > now))
+
+class SharedRateLimitBackend:
+    """Seaux à jetons dans le segment partagé : mêmes limites pour tous les workers du nœud
+
+    Chaque clé occupe un emplacement d'un groupe de GROUP_SIZE, protégé par son propre verrou.
+    Groupe plein : l'emplacement le plus anciennement utilisé est repris (seau remis à plein).
+    """
+
+    def __init__(self, state: "SharedState", offset: int, capacity: int, idle_ttl: float = 600.0):
+        self.state = state
+        self.idle_ttl = idle_ttl
+        self.offset = offset
+        self.groups = capacity // GROUP_SIZE
+        self.hashes = state.buf[offset:offset + 8 * capacity].cast("Q")
+        self.tokens = state.buf[offset + 8 * capacity:offset + 16 * capacity].cast("d")
+        self.updated = state.buf[offset + 16 * capacity:offset + 24 * capacity].cast("d")
+        self.evictions = 0
+
+    async def hit(self, key: str, rule) -> Tuple[bool, float]:
+        """Consommer un jeton ; retourne (autorisé, délai avant nouvel essai)"""
+        value = key_hash(key)
+        start = value % self.groups * GROUP_SIZE
+        fd = self.state.fd
+        fcntl.lockf(fd, fcntl.LOCK_EX, 8 * GROUP_SIZE, self.offset + 8 * start)
+        try:
+            # time.monotonic est commun aux processus (CLOCK_MONOTONIC)
+            now = time.monotonic()
+            slot = victim = None
+            for index in range(start, start + GROUP_SIZE):
+                if self.hashes[index] == value:
+                    slot = index
+                    break
+                if victim is None or self.updated[index] < self.updated[victim]:
+                    victim = index
+            if slot is None:
+                if self.hashes[victim] and now - self.updated[victim] < self.idle_ttl:
+                    self.evictions += 1
+                slot = victim
+                self.hashes[slot] = value
+                tokens = float(rule.limit)
+            else:
+                tokens = min(rule.limit, self.tokens[slot] + (now - self.updated[slot]) * rule.rate)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.tokens[slot] = tokens
+            self.updated[slot] = now
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN, 8 * GROUP_SIZE, self.offset + 8 * start)
+        return allowed, 0.0 if allowed else (1 - tokens) / rule.rate
+
+def _layout(rate_slots: int, blocked_slots: int, endpoints: int) -> Tuple[Dict[str, int], int]:
+    offsets = {"rate": HEADER_SIZE}
+    offsets["blocked"] = offsets["rate"] + 24 * rate_slots
+    offsets["endpoints"] = (offsets["blocked"] + 16 * blocked_slots + 4095) // 4096 * 4096
+    return offsets, offsets["endpoints"] + endpoints * ENDPOINT_SIZE
+
+class SharedState:
+    """Segment de mémoire partagée (fichier tmpfs projeté en mémoire) commun aux workers d'un nœud
+
+    Créé par le superviseur avant le lancement des workers, qui l'ouvrent d'après SHARED_STATE_PATH.
+    Les tailles des tables sont fixées à la création et relues dans l'en-tête.
+    """
+
+    def __init__(self, path: str, fd: int):
+        if fcntl is None:
+            raise RuntimeError("Le mode multi-workers requiert fcntl (Linux, macOS)")
+        self.path = path
+        self.fd = fd
+        self.mmap = mmap.mmap(fd, os.fstat(fd).st_size)
+        self.buf = memoryview(self.mmap)
+        header = self.buf[:32].cast("Q")
+        if header[0] != MAGIC:
+            raise RuntimeError(f"Segment partagé invalide: {path}")
+        self.rate_slots, self.blocked_slots, self.endpoint_capacity = header[1], header[2], header[3]
+        offsets, _ = _layout(self.rate_slots, self.blocked_slots, self.endpoint_capacity)
+        self.rate_offset = offsets["rate"]
+        self.blocked_ips = SharedBlockList(self, offsets["blocked"], self.blocked_slots)
+        self.endpoints = SharedEndpointTable(self, offsets["endpoints"], self.endpoint_capacity)
+
+    @classmethod
+    def open(cls, path: str) -> "SharedState":
+        return cls(path, os.open(path, os.O_RDWR))
+
+    def rate_limit_backend(self, idle_ttl: float = 600.0) -> SharedRateLimitBackend:
+        return SharedRateLimitBackend(self, self.rate_offset, self.rate_slots, idle_ttl)
+
+    def get_stats(self) -> Dict:
+        return {
+            "size_mb": round(len(self.mmap) / 1024 / 1024, 1),
+            "rate_limit_slots": self.rate_slots,
+            "endpoints": len(self.endpoints.all()),
+            "endpoint_capacity": self.endpoint_capacity,
+            "blocked_ips": len(self.blocked_ips)
+        }
+
+def create_segment(path: str, rate_slots: int = 65536, blocked_slots: int = 4096, endpoints: int = 128) -> int:
+    """Créer un segment vierge (superviseur) ; les tables sont arrondies à des groupes entiers
+
+    Retourne sa taille en octets. Le fichier doit résider sur un tmpfs (/dev/shm) pour rester en mémoire.
+    """
+    rate_slots = max(GROUP_SIZE, rate_slots // GROUP_SIZE * GROUP_SIZE)
+    blocked_slots = max(GROUP_SIZE, blocked_slots // GROUP_SIZE * GROUP_SIZE)
+    _, size = _layout(rate_slots, blocked_slots, endpoints)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        os.ftruncate(fd, size)
+        os.pwrite(fd, array("Q", (MAGIC, rate_slots, blocked_slots, endpoints)).tobytes(), 0)
+    finally:
+        os.close(fd)
+    return size
+
+def shared_state_from_env() -> Optional[SharedState]:
+    """Segment du superviseur si le processus est un worker multi-workers, sinon None"""
+    path = os.environ.get(SHARED_STATE_ENV)
+    return SharedState.open(path) if path else None
+
+shared_state = shared_state_from_env()
\ No newline at end of file
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+class SignalQueue:
+    """File d'attente bornée en mémoire, vidée par un pool de workers asyncio"""
+
+    def __init__(self, handler: Callable[[Dict], Awaitable], max_size: int = 1000, workers: int = 4):
+        self.logger = logging.getLogger(__name__)
+        self.handler = handler
+        self.max_size = max_size
+        self.worker_count = workers
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.started_at: Optional[float] = None
+        self.busy_workers = 0
+        self.busy_time = 0.0
+        self.enqueued = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        # Temps d'attente des 1000 derniers signaux (secondes)
+        self.wait_times = deque(maxlen=1000)
+
+    async def start(self):
+        """Démarrer le pool de workers"""
+        if self.workers:
+            return
+        self.queue = asyncio.Queue(maxsize=self.max_size)
+        self.started_at = time.monotonic()
+        self.workers = [
+            asyncio.create_task(self._worker(i)) for i in range(self.worker_count)
+        ]
+        self.logger.info(f"File de signaux démarrée ({self.worker_count} workers, capacité {self.max_size})")
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Arrêter les workers après avoir vidé la file (dans la limite du délai)"""
+        if not self.workers:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Arrêt de la file avec {self.queue.qsize()} signaux non traités")
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def enqueue(self, signal: Dict) -> bool:
+        """Ajouter un signal sans attendre ; retourne False si la file est saturée"""
+        if self.queue is None:
+            return False
+        try:
+            self.queue.put_nowait((time.monotonic(), signal))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _worker(self, worker_id: int):
+        while True:
+            enqueued_at, signal = await self.queue.get()
+            started = time.monotonic()
+            self.wait_times.append(started - enqueued_at)
+            self.busy_workers += 1
+            try:
+                await self.handler(signal)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                self.logger.error(f"Worker {worker_id}: échec du traitement du signal: {e}")
+            finally:
+                self.busy_workers -= 1
+                self.busy_time += time.monotonic() - started
+                self.queue.task_done()
+
+    def get_stats(self) -> Dict:
+        """Profondeur de la file, temps d'attente et utilisation des workers"""
+        waits = sorted(self.wait_times)
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "depth": self.queue.qsize() if self.queue else 0,
+            "max_size": self.max_size,
+            "workers": self.worker_count,
+            "busy_workers": self.busy_workers,
+            "utilization": self.busy_time / (uptime * self.worker_count) if uptime else 0.0,
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_wait_time": sum(waits) / len(waits) if waits else 0.0,
+            "p95_wait_time": waits[int(len(waits) * 0.95) - 1] if waits else 0.0,
+            "max_wait_time": waits[-1] if waits else 0.0
+        }
\ No newline at end of file
@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import logging
+import os
+import re
+import time
+from datetime import date, datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import text
+from ..database import SessionLocal
+from .monitoring import monitoring_service
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow optionnel : pas d'archivage ni de lecture des archives
+    pa = pq = None
+
+PARTITION_NAME = re.compile(r"^trades_(\d{4})_(\d{2})$")
+ARCHIVE_NAME = re.compile(r"^trades_(\d{4})_(\d{2})\.parquet$")
+# Export vérifié, publié (renommé) seulement après la suppression de la partition
+PENDING_ARCHIVE_NAME = re.compile(r"^(trades_\d{4}_\d{2})\.parquet\.tmp$")
+
+# Colonnes archivées, dans l'ordre de la table
+ARCHIVE_COLUMNS = ("id", "symbol", "side", "quantity", "price", "pnl", "strategy", "timestamp", "user_id", "exchange")
+
+# Verrou consultatif : un seul processus fait la maintenance des partitions à la fois
+MAINTENANCE_LOCK_ID = 72_201_001
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"trades_{month.year:04d}_{month.month:02d}"
+
+def _archive_schema():
+    return pa.schema([
+        ("id", pa.int64()),
+        ("symbol", pa.string()),
+        ("side", pa.string()),
+        ("quantity", pa.float64()),
+        ("price", pa.float64()),
+        ("pnl", pa.float64()),
+        ("strategy", pa.string()),
+        ("timestamp", pa.timestamp("us")),
+        ("user_id", pa.int64()),
+        ("exchange", pa.string())
+    ])
+
+def _to_arrow(values: Sequence, arrow_type):
+    # Les colonnes DECIMAL arrivent en Decimal : converties en float64
+    if arrow_type == pa.float64():
+        values = [float(value) if value is not None else None for value in values]
+    return pa.array(values, type=arrow_type)
+
+class TradeArchive:
+    """Partitions de trades archivées : un fichier Parquet compressé par mois"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path_for(self, month: date) -> str:
+        return os.path.join(self.directory, f"{partition_name(month)}.parquet")
+
+    def months(self) -> List[date]:
+        """Mois archivés, du plus ancien au plus récent"""
+        if not os.path.isdir(self.directory):
+            return []
+        months = []
+        for name in os.listdir(self.directory):
+            match = ARCHIVE_NAME.match(name)
+            if match:
+                months.append(date(int(match.group(1)), int(match.group(2)), 1))
+        return sorted(months)
+
+    def live_since(self) -> Optional[date]:
+        """Premier jour encore en base (None si rien n'est archivé)"""
+        months = self.months()
+        return add_months(months[-1], 1) if months else None
+
+    async def read_batches(self, user_id: int, columns: Sequence[str], exchange: Optional[str] = None,
+                           start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           chunk_size: int = 5000) -> AsyncIterator[List[Tuple]]:
+        """Trades archivés d'un utilisateur, par lots de tuples triés par (timestamp, id)"""
+        months = [
+            month for month in self.months()
+            if (start is None or add_months(month, 1) > month_start(start.date()))
+            and (end is None or month <= end.date())
+        ]
+        if months and pq is None:
+            raise RuntimeError("Le package pyarrow est requis pour lire les trades archivés")
+        for month in months:
+            rows = await asyncio.to_thread(self._read_month, month, user_id, list(columns), exchange, start, end)
+            for offset in range(0, len(rows), chunk_size):
+                yield rows[offset:offset + chunk_size]
+
+    def _read_month(self, month: date, user_id: int, columns: List[str], exchange: Optional[str],
+                    start: Optional[datetime], end: Optional[datetime]) -> List[Tuple]:
+        filters = [("user_id", "=", user_id)]
+        if exchange:
+            filters.append(("exchange", "=", exchange))
+        if start:
+            filters.append(("timestamp", ">=", start))
+        if end:
+            filters.append(("timestamp", "<", end))
+        table = pq.read_table(self.path_for(month), columns=columns, filters=filters)
+        table = table.sort_by([("timestamp", "ascending"), ("id", "ascending")])
+        return list(zip(*(table.column(column).to_pylist() for column in columns)))
+
+class TradePartitionManager:
+    """Partitions mensuelles de trades : création à l'avance, archivage au-delà de la rétention"""
+
+    def __init__(self, archive: TradeArchive, session_factory=SessionLocal, months_ahead: int = 3,
+                 retention_months: int = 24, chunk_size: int = 50000):
+        self.logger = logging.getLogger(__name__)
+        self.archive = archive
+        self.session_factory = session_factory
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self.chunk_size = chunk_size
+        self.task: Optional[asyncio.Task] = None
+        self.stats = {"partitions_created": 0, "partitions_archived": 0, "rows_archived": 0,
+                      "last_run": None, "last_error": None}
+
+    async def start(self, interval: float = 86400.0):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop(interval))
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _loop(self, interval: float):
+        while True:
+            try:
+                await self.run_maintenance()
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+                await monitoring_service.log_error("trade_partitions", f"Maintenance des partitions échouée: {e}")
+            await asyncio.sleep(interval)
+
+    async def run_maintenance(self, archive: bool = True) -> Dict:
+        """Créer les partitions à venir puis archiver les partitions expirées"""
+        # Verrou tenu par la transaction d'une session dédiée, relâché à sa fermeture
+        async with self.session_factory() as lock:
+            locked = (await lock.execute(
+                text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": MAINTENANCE_LOCK_ID}
+            )).scalar()
+            if not locked:
+                return {"skipped": True}
+            async with self.session_factory() as db:
+                created = await self.ensure_partitions(db)
+                archived = []
+                if archive and pq is None:
+                    self.logger.warning("pyarrow absent : archivage des partitions de trades désactivé")
+                elif archive:
+                    archived = await self.archive_expired(db)
+        self.stats["last_run"] = datetime.utcnow().isoformat()
+        return {"created": created, "archived": archived}
+
+    async def ensure_partitions(self, db) -> int:
+        created = (await db.execute(
+            text("SELECT create_trades_partitions(:ahead)"), {"ahead": self.months_ahead}
+        )).scalar() or 0
+        await db.commit()
+        if created:
+            self.stats["partitions_created"] += created
+            self.logger.info(f"{created} partitions de trades créées")
+        return created
+
+    async def partitions(self, db) -> List[Tuple[str, date]]:
+        """Partitions mensuelles existantes (hors partition par défaut), des plus anciennes aux plus récentes"""
+        result = await db.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'trades'::regclass"
+        ))
+        partitions = []
+        for (name,) in result:
+            match = PARTITION_NAME.match(name)
+            if match:
+                partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+        return sorted(partitions, key=lambda partition: partition[1])
+
+    async def archive_expired(self, db) -> List[str]:
+        horizon = add_months(month_start(date.today()), -self.retention_months)
+        partitions = await self.partitions(db)
+        self.publish_pending({name for name, _ in partitions})
+        archived = []
+        for name, month in partitions:
+            if month < horizon:
+                await self.archive_partition(db, name, month)
+                archived.append(name)
+        return archived
+
+    def publish_pending(self, partitions: set) -> List[str]:
+        """Publier les exports dont la partition a été supprimée mais pas encore renommés (arrêt entre les deux)
+
+        Un export dont la partition existe encore est ignoré : il sera réécrit au prochain archivage.
+        """
+        if not os.path.isdir(self.archive.directory):
+            return []
+        published = []
+        for filename in os.listdir(self.archive.directory):
+            match = PENDING_ARCHIVE_NAME.match(filename)
+            if match and match.group(1) not in partitions:
+                os.replace(os.path.join(self.archive.directory, filename),
+                           os.path.join(self.archive.directory, f"{match.group(1)}.parquet"))
+                published.append(match.group(1))
+        if published:
+            self.logger.warning(f"Archives publiées après interruption: {', '.join(published)}")
+        return published
+
+    async def archive_partition(self, db, name: str, month: date) -> int:
+        """Exporter une partition en Parquet, puis la détacher et la supprimer
+
+        Le fichier est écrit et vérifié avant toute suppression ; les positions nettes de la
+        partition sont reportées dans archived_positions dans la même transaction que la suppression.
+        Le fichier n'est publié qu'après le commit : une suppression en échec ne fait pas lire
+        ces trades deux fois (en base et dans l'archive).
+        """
+        if pq is None:
+            raise RuntimeError("Le package pyarrow est requis pour archiver les trades")
+        if not PARTITION_NAME.match(name):
+            raise ValueError(f"Partition invalide: {name}")
+        started = time.perf_counter()
+        expected = (await db.execute(text(f"SELECT count(*) FROM {name}"))).scalar()
+
+        os.makedirs(self.archive.directory, exist_ok=True)
+        path = self.archive.path_for(month)
+        tmp_path = f"{path}.tmp"
+        schema = _archive_schema()
+        written = 0
+        writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+        try:
+            result = await db.stream(
+                text(f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM {name} ORDER BY timestamp, id")
+                .execution_options(yield_per=self.chunk_size)
+            )
+            async for rows in result.partitions(self.chunk_size):
+                table = pa.Table.from_arrays(
+                    [_to_arrow(values, field.type) for values, field in zip(zip(*rows), schema)], schema=schema
+                )
+                await asyncio.to_thread(writer.write_table, table)
+                written += len(rows)
+        finally:
+            writer.close()
+        if written != expected:
+            os.remove(tmp_path)
+            raise RuntimeError(f"Archive {name} incomplète ({written} lignes écrites sur {expected})")
+
+        await db.execute(text(f"""
+            INSERT INTO archived_positions (user_id, exchange, symbol, quantity, net_cost)
+            SELECT user_id, exchange, symbol,
+                   SUM(CASE WHEN side = 'BUY' THEN quantity ELSE -quantity END),
+                   SUM(CASE WHEN side = 'BUY' THEN quantity ELSE -quantity END * price)
+            FROM {name}
+            GROUP BY user_id, exchange, symbol
+            ON CONFLICT (user_id, exchange, symbol) DO UPDATE SET
+                quantity = archived_positions.quantity + EXCLUDED.quantity,
+                net_cost = archived_positions.net_cost + EXCLUDED.net_cost
+        """))
+        await db.execute(text(f"ALTER TABLE trades DETACH PARTITION {name}"))
+        await db.execute(text(f"DROP TABLE {name}"))
+        await db.commit()
+        os.replace(tmp_path, path)
+
+        self.stats["partitions_archived"] += 1
+        self.stats["rows_archived"] += written
+        self.logger.info(f"Partition {name} archivée: {written} trades en {time.perf_counter() - started:.1f} s -> {path}")
+        return written
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "archived_months": len(self.archive.months()), "archive_available": pq is not None}
+
+trade_archive = TradeArchive(os.environ.get("TRADES_ARCHIVE_DIR", "archive/trades"))
+
+trade_partitions = TradePartitionManager(
+    trade_archive,
+    months_ahead=int(os.environ.get("TRADES_PARTITIONS_AHEAD", "3")),
+    retention_months=int(os.environ.get("TRADES_RETENTION_MONTHS", "24"))
+)
+
+monitoring_service.register_stats_provider("trade_partitions", trade_partitions.get_stats)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance des partitions de trades")
+    parser.add_argument("command", choices=["maintain", "ensure"])
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(trade_partitions.run_maintenance(archive=args.command == "maintain")))
\ No newline at end of file
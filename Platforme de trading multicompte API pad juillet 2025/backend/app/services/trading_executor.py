@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, List, Optional, Union
+from sqlalchemy.future import select
+from ..database import SessionLocal
+from ..models import APIKey, Trade
+from ..utils.timing import stage
+from .credential_vault import CredentialVault, Credentials, credential_vault
+from .exchanges import ExchangeError, ExchangeRegistry, OrderResult, exchange_registry
+from .exchanges.base import new_client_order_id
+from .market_data import MarketDataService, market_data_service
+from .pnl_rollup import pnl_rollup_service
+from .position_book import PositionBook, position_book
+from .trigger_engine import Trigger, TriggerEngine, trigger_engine
+
+class TradingExecutor:
+    """Exécution des ordres sur les exchanges et enregistrement des trades"""
+
+    def __init__(self, registry: ExchangeRegistry = exchange_registry, vault: CredentialVault = credential_vault,
+                 session_factory=SessionLocal, market_data: MarketDataService = market_data_service,
+                 positions: PositionBook = position_book, triggers: TriggerEngine = trigger_engine,
+                 concurrency: int = 20):
+        self.logger = logging.getLogger(__name__)
+        self.registry = registry
+        self.vault = vault
+        self.session_factory = session_factory
+        self.market_data = market_data
+        self.positions = positions
+        self.triggers = triggers
+        self.concurrency = concurrency
+
+    async def execute_trade(self, symbol: str, side: str, quantity: float, exchange: str,
+                            strategy: Optional[str] = None, stop_loss: Optional[float] = None,
+                            take_profit: Optional[float] = None, source: Optional[str] = None,
+                            user_id: Optional[int] = None, api_key_id: Optional[int] = None,
+                            client_order_id: Optional[str] = None) -> Dict:
+        """Passer un ordre au marché pour un compte, puis enregistrer le trade et ses SL/TP
+
+        `client_order_id` : identifiant stable d'un ordre rejoué (clôtures SL/TP), voir `place_order`.
+        """
+        creds = await self.resolve_credentials(exchange, user_id, api_key_id)
+        with self.reserve_risk(creds.user_id, exchange, symbol, side, quantity):
+            fill = await self.place_order(creds, symbol, side, quantity, client_order_id)
+            self.logger.info(f"Ordre {fill.order_id} {side} {symbol} sur {exchange} ({source or 'api'}): {fill.status}")
+
+            # Un ordre sans exécution (rejeté, en attente) ne crée pas de trade
+            if not fill.filled_quantity:
+                return {**fill.to_dict(), "trade_id": None}
+
+            row = self.trade_row(fill, creds.user_id, strategy)
+            triggers: List[Trigger] = []
+            with self.positions.recording([(row["user_id"], row["exchange"], row["symbol"])]):
+                self.positions.set_realized_pnl([row])
+                trade = Trade(**row)
+                async with self.session_factory() as db:
+                    db.add(trade)
+                    await db.flush()
+                    await pnl_rollup_service.apply_trades(db, [trade])
+                    # SL/TP enregistrés dans la même transaction : ils survivent à un redémarrage
+                    rows = self.triggers.build_rows(trade, creds.api_key_id, stop_loss, take_profit)
+                    if rows:
+                        db.add_all(rows)
+                        await db.flush()
+                        triggers = [Trigger.from_row(row) for row in rows]
+                    await db.commit()
+                self.positions.apply_trade(trade)
+        for trigger in triggers:
+            self.triggers.add(trigger)
+
+        return {**fill.to_dict(), "trade_id": trade.id, "trigger_ids": [trigger.id for trigger in triggers]}
+
+    @asynccontextmanager
+    async def execute_orders(self, user_id: int, orders: List[Dict]) -> AsyncIterator[List[Union[OrderResult, Exception]]]:
+        """Passer plusieurs ordres d'un utilisateur en parallèle (concurrence bornée)
+
+        Fournit, dans l'ordre des ordres, le fill ou l'exception levée ; rien n'est enregistré.
+        Les expositions restent réservées jusqu'à la sortie du bloc, où l'appelant a enregistré les trades.
+        """
+        # Une résolution de clé par exchange, pas par ordre
+        credentials: Dict[str, Union[Credentials, Exception]] = {}
+        for exchange in {order["exchange"] for order in orders}:
+            try:
+                credentials[exchange] = await self.resolve_credentials(exchange, user_id)
+            except ValueError as e:
+                credentials[exchange] = e
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        reserved: List[Dict] = []
+
+        async def run(order: Dict) -> OrderResult:
+            creds = credentials[order["exchange"]]
+            if isinstance(creds, Exception):
+                raise creds
+            # Chaque ordre accepté réserve son exposition : le lot entier respecte les limites
+            self.check_risk(user_id, order["exchange"], order["symbol"], order["side"], order["quantity"])
+            reserved.append(order)
+            async with semaphore:
+                return await self.place_order(creds, order["symbol"], order["side"], order["quantity"])
+
+        try:
+            yield await asyncio.gather(*(run(order) for order in orders), return_exceptions=True)
+        finally:
+            for order in reserved:
+                self.positions.release(user_id, order["exchange"], order["symbol"], order["side"], order["quantity"])
+
+    def check_risk(self, user_id: int, exchange: str, symbol: str, side: str, quantity: float):
+        """Contrôles pré-trade (position et exposition maximales), lus en mémoire
+
+        L'ordre accepté est réservé dans le carnet : l'appelant le libère avec `positions.release`.
+        """
+        reason = self.positions.reserve(user_id, exchange, symbol, side, quantity)
+        if reason:
+            raise ValueError(reason)
+
+    @contextmanager
+    def reserve_risk(self, user_id: int, exchange: str, symbol: str, side: str, quantity: float):
+        """Contrôles pré-trade ; l'exposition reste réservée jusqu'à la fin du bloc (fill répercuté ou échec)"""
+        self.check_risk(user_id, exchange, symbol, side, quantity)
+        try:
+            yield
+        finally:
+            self.positions.release(user_id, exchange, symbol, side, quantity)
+
+    async def place_order(self, creds: Credentials, symbol: str, side: str, quantity: float,
+                          client_order_id: Optional[str] = None) -> OrderResult:
+        """Passer l'ordre ; en cas d'issue inconnue (délai, réponse perdue), le rechercher par identifiant client
+
+        Lève l'ExchangeError d'origine si la recherche échoue aussi : l'ordre a pu être exécuté.
+        Un ordre introuvable n'a pas été reçu : l'erreur est alors marquée `rejected`.
+        """
+        client = self.registry.get(creds.exchange)
+        client_order_id = client_order_id or new_client_order_id()
+        with stage("exchange"):
+            try:
+                fill = await client.place_order(creds, symbol, side, quantity, client_order_id=client_order_id)
+            except ExchangeError as e:
+                if e.rejected:
+                    raise
+                self.logger.warning(f"Ordre {client_order_id} {side} {symbol} sur {creds.exchange}: issue inconnue ({e}), recherche")
+                try:
+                    fill = await client.find_order(creds, symbol, client_order_id)
+                except ExchangeError:
+                    raise e
+                if fill is None:
+                    raise ExchangeError(e.exchange, f"ordre {client_order_id} non reçu ({e})", e.status, e.code,
+                                        rejected=True)
+        # Suivre le prix de tout symbole tradé
+        await self.market_data.ensure_subscribed(creds.exchange, symbol)
+        return fill
+
+    async def resolve_credentials(self, exchange: str, user_id: Optional[int] = None,
+                                  api_key_id: Optional[int] = None) -> Credentials:
+        """Clé API du compte : par identifiant, sinon la clé de l'utilisateur pour cet exchange"""
+        if api_key_id is None:
+            if user_id is None:
+                raise ValueError("Aucun compte précisé pour l'exécution de l'ordre")
+            async with self.session_factory() as db:
+                result = await db.execute(
+                    select(APIKey.id)
+                    .where(APIKey.user_id == user_id, APIKey.exchange == exchange)
+                    .order_by(APIKey.created_at.desc())
+                    .limit(1)
+                )
+                api_key_id = result.scalar_one_or_none()
+            if api_key_id is None:
+                raise ValueError(f"Aucune clé API {exchange} enregistrée pour ce compte")
+
+        creds = await self.vault.get(api_key_id)
+        if creds is None:
+            raise ValueError(f"Clé API {api_key_id} introuvable")
+        return creds
+
+    def trade_row(self, fill: OrderResult, user_id: int, strategy: Optional[str] = None) -> Dict:
+        """Colonnes du trade correspondant à un fill (quantité et prix réellement exécutés)"""
+        return {
+            "symbol": fill.symbol,
+            "side": fill.side,
+            "quantity": fill.filled_quantity,
+            "price": fill.avg_price or 0.0,
+            "strategy": strategy,
+            "exchange": fill.exchange,
+            "user_id": user_id
+        }
+
+trading_executor = TradingExecutor()
\ No newline at end of file
@@ -1,37 +1,90 @@
 import hmac
 import hashlib
 import json
-from typing import Dict, Optional
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
 from fastapi import Request, HTTPException
+from sqlalchemy.future import select
 from .trading_executor import TradingExecutor
+from .signal_queue import SignalQueue
+from .monitoring import MonitoringService, monitoring_service
+from .alert_dispatcher import AlertDispatcher, alert_dispatcher
+from .idempotency import IdempotencyStore, SignalInProgress, signal_idempotency
+from ..utils.timing import stage
+from ..database import SessionLocal
+from ..models import APIKey, StrategySubscription
 import os
 import logging
-import aiohttp
 
 class TradingViewWebhookService:
-    def __init__(self, trading_executor: TradingExecutor):
+    def __init__(self, trading_executor: TradingExecutor, session_factory=SessionLocal,
+                 monitoring: MonitoringService = monitoring_service,
+                 dispatcher: AlertDispatcher = alert_dispatcher,
+                 idempotency: IdempotencyStore = signal_idempotency):
         self.trading_executor = trading_executor
+        self.session_factory = session_factory
+        self.monitoring = monitoring
+        self.alert_dispatcher = dispatcher
+        # Signaux déjà traités : les renvois de TradingView reçoivent le résultat d'origine
+        self.idempotency = idempotency
+        # Refuser les signaux sans idempotency_key ni horodatage (sinon : exécutés sans dédoublonnage)
+        self.idempotency_required = os.environ.get("TRADINGVIEW_IDEMPOTENCY_REQUIRED", "false").lower() == "true"
         self.webhook_secret = os.environ.get("TRADINGVIEW_WEBHOOK_SECRET", "")
+        # Mode d'exécution : "single" (un trade) ou "fanout" (tous les comptes abonnés)
+        self.execution_mode = os.environ.get("TRADINGVIEW_EXECUTION_MODE", "single")
+        # Compte du mode single ; à défaut, le plus ancien abonné actif de la stratégie
+        single_api_key_id = os.environ.get("TRADINGVIEW_SINGLE_API_KEY_ID")
+        self.single_api_key_id = int(single_api_key_id) if single_api_key_id else None
+        # Nombre maximal d'ordres simultanés par exchange
+        self.fanout_concurrency = int(os.environ.get("TRADINGVIEW_FANOUT_CONCURRENCY", "20"))
+        # Budget de latence par signal (millisecondes) : au-delà, plus aucun ordre n'est envoyé
+        self.fanout_budget_ms = float(os.environ.get("TRADINGVIEW_FANOUT_BUDGET_MS", "2000"))
+        # Ordres envoyés avant l'expiration du budget et encore en cours : ils vont jusqu'à l'enregistrement
+        self.late_orders = set()
+        # Mode d'ingestion : "sync" (exécution avant réponse) ou "queue" (réponse 202 immédiate)
+        self.ingestion_mode = os.environ.get("TRADINGVIEW_INGESTION_MODE", "sync")
+        self.queue_retry_after = int(os.environ.get("TRADINGVIEW_QUEUE_RETRY_AFTER", "1"))
+        self.signal_queue = SignalQueue(
+            self._handle_queued_signal,
+            max_size=int(os.environ.get("TRADINGVIEW_QUEUE_SIZE", "1000")),
+            workers=int(os.environ.get("TRADINGVIEW_QUEUE_WORKERS", "4"))
+        )
+        self.monitoring.register_stats_provider("tradingview_queue", self.signal_queue.get_stats)
         
+    async def start(self):
+        """Démarrer les workers d'ingestion (mode file d'attente)"""
+        if not self.idempotency_required:
+            logging.warning("TRADINGVIEW_IDEMPOTENCY_REQUIRED=false : les signaux sans idempotency_key ni "
+                            "horodatage sont exécutés sans dédoublonnage (un renvoi TradingView serait rejoué)")
+        if self.ingestion_mode == "queue":
+            await self.signal_queue.start()
+    
+    async def stop(self):
+        """Arrêter les workers d'ingestion en vidant la file"""
+        await self.signal_queue.stop()
+        # Laisser les ordres en retard s'enregistrer avant l'arrêt
+        if self.late_orders:
+            await asyncio.gather(*self.late_orders, return_exceptions=True)
+    
     async def process_webhook(self, request: Request) -> Dict:
         """Traiter un webhook TradingView"""
+        data, key = await self._parse_webhook(request)
+        return await self._run_once(key, lambda: self._execute_webhook(data))
+    
+    async def _execute_webhook(self, data: Dict) -> Dict:
+        """Exécuter un signal validé et construire la réponse"""
         try:
-            # Récupérer le body de la requête
-            body = await request.body()
-            signature = request.headers.get("X-Signature", "")
-            
-            # Valider la signature
-            if not self._verify_signature(body, signature):
-                raise HTTPException(status_code=401, detail="Signature invalide")
-            
-            # Parser le JSON
-            data = json.loads(body)
-            
-            # Valider la structure du signal
-            if not self._validate_signal_structure(data):
-                raise HTTPException(status_code=400, detail="Structure de signal invalide")
-            
             # Traiter le signal
+            if self.execution_mode == "fanout":
+                result = await self._process_signal_fanout(data)
+                return {
+                    "status": "success",
+                    "message": "Signal diffusé aux comptes abonnés",
+                    "execution": result,
+                    "signal": data
+                }
+            
             result = await self._process_signal(data)
             
             return {
@@ -41,10 +94,99 @@ class TradingViewWebhookService:
                 "signal": data
             }
             
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Erreur interne: {str(e)}")
+    
+    async def enqueue_webhook(self, request: Request) -> Dict:
+        """Valider un webhook TradingView et le placer dans la file de traitement"""
+        data, key = await self._parse_webhook(request)
+        return await self._run_once(key, lambda: self._enqueue_signal(data))
+    
+    async def _enqueue_signal(self, data: Dict) -> Dict:
+        if not self.signal_queue.enqueue(data):
+            raise HTTPException(
+                status_code=503,
+                detail="File de signaux saturée",
+                headers={"Retry-After": str(self.queue_retry_after)}
+            )
+        
+        return {
+            "status": "accepted",
+            "message": "Signal en file d'attente",
+            "queue_depth": self.signal_queue.queue.qsize()
+        }
+    
+    async def _run_once(self, key: Optional[str], handler) -> Dict:
+        """Traiter un signal une seule fois par clé d'idempotence ; les doublons reçoivent le résultat d'origine"""
+        try:
+            result, replayed = await self.idempotency.run(key, handler)
+        except SignalInProgress:
+            raise HTTPException(
+                status_code=409,
+                detail="Signal déjà en cours de traitement",
+                headers={"Retry-After": "1"}
+            )
+        if replayed:
+            logging.info(f"Signal TradingView dupliqué ignoré (clé {key[:16]})")
+            return {**result, "duplicate": True}
+        return result
+    
+    def _idempotency_key(self, body: bytes, data: Dict) -> Optional[str]:
+        """Clé fournie par l'alerte (idempotency_key), sinon empreinte du body s'il est horodaté
+        
+        Sans horodatage (time/timenow), deux signaux identiques légitimes auraient la même empreinte
+        et le second serait ignoré : pas de clé.
+        """
+        explicit = data.get("idempotency_key")
+        if explicit:
+            return f"key:{explicit}"
+        if data.get("time") or data.get("timenow"):
+            return hashlib.sha256(body).hexdigest()
+        if self.idempotency_required:
+            self.idempotency.missing_key += 1
+            logging.warning(f"Signal TradingView refusé sans idempotency_key ni horodatage ({data.get('strategy')})")
+            raise HTTPException(
+                status_code=422,
+                detail="Champ idempotency_key ou horodatage (time: {{timenow}}) requis dans le message de l'alerte"
+            )
+        logging.warning(f"Signal TradingView sans idempotency_key ni horodatage, exécuté sans dédoublonnage "
+                        f"({data.get('strategy')})")
+        return None
+    
+    async def _parse_webhook(self, request: Request) -> Tuple[Dict, Optional[str]]:
+        """Vérifier la signature, parser et valider le signal ; retourne aussi sa clé d'idempotence"""
+        # Récupérer le body de la requête
+        body = await request.body()
+        signature = request.headers.get("X-Signature", "")
+        
+        # Valider la signature
+        if not self._verify_signature(body, signature):
+            raise HTTPException(status_code=401, detail="Signature invalide")
+        
+        # Parser le JSON
+        try:
+            data = json.loads(body)
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="JSON invalide")
+        
+        # Valider la structure du signal
+        if not isinstance(data, dict) or not self._validate_signal_structure(data):
+            raise HTTPException(status_code=400, detail="Structure de signal invalide")
+        
+        return data, self._idempotency_key(body, data)
+    
+    async def _handle_queued_signal(self, signal_data: Dict):
+        """Exécuter un signal sorti de la file (appelé par les workers)"""
+        try:
+            if self.execution_mode == "fanout":
+                await self._process_signal_fanout(signal_data)
+            else:
+                await self._process_signal(signal_data)
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Erreur interne: {str(e)}")
+            await self.monitoring.log_error("tradingview_signal", str(e), {"signal": signal_data})
+            raise
     
     def _verify_signature(self, body: bytes, signature: str) -> bool:
         """Vérifier la signature du webhook"""
@@ -89,21 +231,23 @@ class TradingViewWebhookService:
         price = signal_data.get("price")
         stop_loss = signal_data.get("stop_loss")
         take_profit = signal_data.get("take_profit")
-        exchange = signal_data.get("exchange", "binance")  # Exchange par défaut
+        account = await self._resolve_single_account(strategy, signal_data.get("exchange"))
         
         # Log du signal reçu
-        logging.info(f"Signal TradingView reçu: {symbol} {side} via {strategy}")
+        logging.info(f"Signal TradingView reçu: {symbol} {side} via {strategy} (clé API {account['api_key_id']})")
         
         # Exécuter le trade
         trade_result = await self.trading_executor.execute_trade(
             symbol=symbol,
             side=side,
             quantity=quantity,
-            exchange=exchange,
+            exchange=account["exchange"],
             strategy=strategy,
             stop_loss=stop_loss,
             take_profit=take_profit,
-            source="tradingview_webhook"
+            source="tradingview_webhook",
+            user_id=account["user_id"],
+            api_key_id=account["api_key_id"]
         )
         
         # Envoyer une notification
@@ -111,6 +255,186 @@ class TradingViewWebhookService:
         
         return trade_result
     
+    async def _process_signal_fanout(self, signal_data: Dict) -> Dict:
+        """Exécuter un signal sur tous les comptes abonnés à la stratégie"""
+        strategy = signal_data["strategy"]
+        subscribers = await self._resolve_subscribers(strategy, signal_data.get("exchange"))
+        
+        logging.info(f"Signal TradingView reçu: {signal_data['symbol']} {signal_data['side']} via {strategy} "
+                     f"({len(subscribers)} comptes abonnés)")
+        
+        # Un sémaphore par exchange pour borner la concurrence sans bloquer les autres plateformes
+        semaphores = {
+            exchange: asyncio.Semaphore(self.fanout_concurrency)
+            for exchange in {sub["exchange"] for sub in subscribers}
+        }
+        
+        started = time.perf_counter()
+        expired = asyncio.Event()
+        sent: set = set()
+        tasks = [
+            asyncio.create_task(self._execute_for_account(
+                signal_data, sub, semaphores[sub["exchange"]], started, expired, sent
+            ))
+            for sub in subscribers
+        ]
+        
+        results: List[Dict] = []
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=self.fanout_budget_ms / 1000)
+            # Budget dépassé : les comptes en attente ne sont plus servis, mais un ordre déjà
+            # envoyé n'est jamais annulé (un fill non enregistré désynchroniserait les positions)
+            expired.set()
+            for task in pending:
+                self.late_orders.add(task)
+                task.add_done_callback(self._late_order_done)
+            for task, sub in zip(tasks, subscribers):
+                if task in done:
+                    results.append(task.result())
+                elif id(sub) in sent:
+                    results.append(self._account_result(sub, "late", error="Ordre en cours au-delà du budget de latence"))
+                else:
+                    results.append(self._account_result(sub, "timeout", error="Budget de latence dépassé : ordre non envoyé"))
+        
+        summary = self._summarize_fanout(strategy, results, started)
+        
+        logging.info(f"Fan-out {strategy}: {summary['succeeded']}/{summary['accounts']} comptes exécutés, "
+                     f"écart premier/dernier fill {summary['fill_spread_ms']} ms")
+        
+        await self._send_fanout_notification(signal_data, summary)
+        
+        return summary
+    
+    async def _resolve_single_account(self, strategy: str, exchange: Optional[str] = None) -> Dict:
+        """Compte d'exécution du mode single : clé configurée, sinon le plus ancien abonné actif de la stratégie"""
+        query = select(APIKey.id.label("api_key_id"), APIKey.user_id, APIKey.exchange)
+        if self.single_api_key_id is not None:
+            query = query.where(APIKey.id == self.single_api_key_id)
+        else:
+            query = (
+                query.join(StrategySubscription, StrategySubscription.api_key_id == APIKey.id)
+                .where(StrategySubscription.strategy == strategy, StrategySubscription.is_active.is_(True))
+                .order_by(StrategySubscription.created_at, StrategySubscription.id)
+            )
+        if exchange:
+            query = query.where(APIKey.exchange == exchange)
+        
+        async with self.session_factory() as db:
+            row = (await db.execute(query.limit(1))).first()
+        if row is None:
+            raise HTTPException(status_code=422, detail=f"Aucun compte d'exécution pour la stratégie {strategy}")
+        return dict(row._mapping)
+    
+    async def _resolve_subscribers(self, strategy: str, exchange: Optional[str] = None) -> List[Dict]:
+        """Récupérer les comptes (clé API) abonnés à une stratégie"""
+        query = (
+            select(
+                StrategySubscription.user_id,
+                StrategySubscription.api_key_id,
+                StrategySubscription.quantity,
+                APIKey.exchange
+            )
+            .join(APIKey, APIKey.id == StrategySubscription.api_key_id)
+            .where(StrategySubscription.strategy == strategy, StrategySubscription.is_active.is_(True))
+        )
+        if exchange:
+            query = query.where(APIKey.exchange == exchange)
+        
+        async with self.session_factory() as db:
+            result = await db.execute(query)
+            return [dict(row._mapping) for row in result]
+    
+    async def _execute_for_account(self, signal_data: Dict, sub: Dict, semaphore: asyncio.Semaphore,
+                                   started: float, expired: asyncio.Event, sent: set) -> Dict:
+        """Exécuter le trade d'un compte abonné"""
+        async with semaphore:
+            if expired.is_set():
+                return self._account_result(sub, "timeout", error="Budget de latence dépassé : ordre non envoyé")
+            sent.add(id(sub))
+            try:
+                trade_result = await self.trading_executor.execute_trade(
+                    symbol=signal_data["symbol"],
+                    side=signal_data["side"],
+                    quantity=sub["quantity"] or signal_data.get("quantity", 0.01),
+                    exchange=sub["exchange"],
+                    strategy=signal_data["strategy"],
+                    stop_loss=signal_data.get("stop_loss"),
+                    take_profit=signal_data.get("take_profit"),
+                    source="tradingview_webhook",
+                    user_id=sub["user_id"],
+                    api_key_id=sub["api_key_id"]
+                )
+            except Exception as e:
+                logging.error(f"Échec du trade pour le compte {sub['user_id']} ({sub['exchange']}): {e}")
+                return self._account_result(sub, "error", error=str(e))
+            
+            filled_ms = (time.perf_counter() - started) * 1000
+            return self._account_result(
+                sub,
+                trade_result.get("status", "success"),
+                trade_id=trade_result.get("trade_id"),
+                filled_ms=round(filled_ms, 3)
+            )
+    
+    def _late_order_done(self, task: asyncio.Task):
+        """Journaliser l'issue d'un ordre terminé après l'expiration du budget"""
+        self.late_orders.discard(task)
+        if task.cancelled():
+            return
+        result = task.result()
+        if result["status"] == "error":
+            logging.error(f"Ordre hors budget en échec pour le compte {result['user_id']} "
+                          f"({result['exchange']}): {result['error']}")
+        elif result["status"] != "timeout":
+            logging.warning(f"Ordre hors budget exécuté pour le compte {result['user_id']} "
+                            f"({result['exchange']}): trade {result['trade_id']} à {result['filled_ms']} ms")
+    
+    def _account_result(self, sub: Dict, status: str, trade_id: Optional[int] = None,
+                        filled_ms: Optional[float] = None, error: Optional[str] = None) -> Dict:
+        """Construire le résultat d'exécution d'un compte"""
+        return {
+            "user_id": sub["user_id"],
+            "api_key_id": sub["api_key_id"],
+            "exchange": sub["exchange"],
+            "status": status,
+            "trade_id": trade_id,
+            "filled_ms": filled_ms,
+            "error": error
+        }
+    
+    def _summarize_fanout(self, strategy: str, results: List[Dict], started: float) -> Dict:
+        """Agréger les résultats par compte et mesurer l'écart entre le premier et le dernier fill"""
+        fills = [r["filled_ms"] for r in results if r["filled_ms"] is not None and r["status"] != "error"]
+        return {
+            "strategy": strategy,
+            "accounts": len(results),
+            "succeeded": len(fills),
+            "failed": sum(1 for r in results if r["status"] == "error"),
+            "timed_out": sum(1 for r in results if r["status"] == "timeout"),
+            "late": sum(1 for r in results if r["status"] == "late"),
+            "first_fill_ms": min(fills) if fills else None,
+            "last_fill_ms": max(fills) if fills else None,
+            "fill_spread_ms": round(max(fills) - min(fills), 3) if fills else None,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+            "results": results
+        }
+    
+    async def _send_fanout_notification(self, signal: Dict, summary: Dict):
+        """Envoyer une notification récapitulative du fan-out"""
+        message = f"""
+🚨 Signal TradingView diffusé
+
+📊 Signal: {signal['symbol']} {signal['side']}
+📈 Stratégie: {signal['strategy']}
+👥 Comptes: {summary['succeeded']}/{summary['accounts']} exécutés
+
+❌ Échecs: {summary['failed']}
+⏱️ Hors budget: {summary['timed_out']} non envoyés, {summary['late']} en cours
+📏 Écart premier/dernier fill: {summary['fill_spread_ms']} ms
+        """
+        
+        await self._send_telegram_notification(message)
+    
     async def _send_trade_notification(self, signal: Dict, result: Dict):
         """Envoyer une notification de trade exécuté"""
         message = f"""
@@ -129,23 +453,9 @@ class TradingViewWebhookService:
         await self._send_telegram_notification(message)
     
     async def _send_telegram_notification(self, message: str):
-        """Envoyer une notification Telegram"""
-        bot_token = os.environ.get("TELEGRAM_BOT_TOKEN")
-        chat_id = os.environ.get("TELEGRAM_CHAT_ID")
-        
-        if not bot_token or not chat_id:
-            return
-        
-        try:
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            async with aiohttp.ClientSession() as session:
-                await session.post(url, json={
-                    "chat_id": chat_id,
-                    "text": message,
-                    "parse_mode": "HTML"
-                })
-        except Exception as e:
-            logging.error(f"Erreur envoi notification Telegram: {e}")
+        """Envoyer une notification Telegram (regroupée en digest par le dispatcher)"""
+        with stage("notification"):
+            self.alert_dispatcher.submit_trade_notification(message)
     
     def get_webhook_url(self) -> str:
         """Générer l'URL du webhook pour TradingView"""
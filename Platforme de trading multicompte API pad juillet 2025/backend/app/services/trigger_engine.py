@@ -0,0 +1,387 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import update
+from sqlalchemy.future import select
+from ..database import SessionLocal
+from ..models import PriceTrigger
+from .alert_dispatcher import AlertDispatcher, alert_dispatcher
+from .exchanges import ExchangeError
+from .market_data import MarketDataService, Ticker, market_data_service
+from .metrics import LatencyHistogram
+from .monitoring import monitoring_service
+
+STOP_LOSS = "stop_loss"
+TAKE_PROFIT = "take_profit"
+
+# Au-delà de ce nombre d'entrées périmées (annulées), le tas d'un symbole est reconstruit
+COMPACT_THRESHOLD = 1024
+
+class CloseNotFilled(Exception):
+    """Ordre de clôture accepté sans exécution (rejeté, expiré) : la position reste ouverte"""
+
+class Trigger:
+    """Stop-loss ou take-profit en attente (ordre de clôture au marché)"""
+
+    __slots__ = ("id", "kind", "exchange", "symbol", "side", "quantity", "price",
+                 "strategy", "trade_id", "user_id", "api_key_id")
+
+    def __init__(self, id: int, kind: str, exchange: str, symbol: str, side: str, quantity: float,
+                 price: float, strategy: Optional[str] = None, trade_id: Optional[int] = None,
+                 user_id: Optional[int] = None, api_key_id: Optional[int] = None):
+        self.id = id
+        self.kind = kind
+        self.exchange = exchange
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.price = price
+        self.strategy = strategy
+        self.trade_id = trade_id
+        self.user_id = user_id
+        self.api_key_id = api_key_id
+
+    @classmethod
+    def from_row(cls, row: PriceTrigger) -> "Trigger":
+        return cls(row.id, row.kind, row.exchange, row.symbol, row.side, row.quantity, row.trigger_price,
+                   row.strategy, row.trade_id, row.user_id, row.api_key_id)
+
+    @property
+    def fires_below(self) -> bool:
+        """Déclenché quand le prix descend au niveau (SL d'un long, TP d'un short)"""
+        return (self.side == "SELL") == (self.kind == STOP_LOSS)
+
+    @property
+    def client_order_id(self) -> str:
+        """Identifiant client de l'ordre de clôture, identique à chaque tentative"""
+        return f"trigger-{self.id}"
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class SymbolTriggers:
+    """Niveaux en attente d'un symbole, triés par prix : seuls les niveaux franchis sont dépilés"""
+
+    __slots__ = ("below", "above", "stale")
+
+    def __init__(self):
+        # below : tas max (prix négatifs) des niveaux atteints à la baisse ; above : tas min
+        self.below: List[Tuple[float, int]] = []
+        self.above: List[Tuple[float, int]] = []
+        self.stale = 0
+
+    def push(self, trigger: Trigger):
+        if trigger.fires_below:
+            heapq.heappush(self.below, (-trigger.price, trigger.id))
+        else:
+            heapq.heappush(self.above, (trigger.price, trigger.id))
+
+    def pop_crossed(self, price: float) -> List[int]:
+        """Identifiants des niveaux franchis par ce prix, en O(k log n)"""
+        crossed = []
+        below, above = self.below, self.above
+        while below and -below[0][0] >= price:
+            crossed.append(heapq.heappop(below)[1])
+        while above and above[0][0] <= price:
+            crossed.append(heapq.heappop(above)[1])
+        return crossed
+
+    def compact(self, live: Dict[int, Trigger]):
+        # Dédoublonné : un déclencheur remis en attente a pu être empilé deux fois
+        self.below = list({entry[1]: entry for entry in self.below if entry[1] in live}.values())
+        self.above = list({entry[1]: entry for entry in self.above if entry[1] in live}.values())
+        heapq.heapify(self.below)
+        heapq.heapify(self.above)
+        self.stale = 0
+
+    def __len__(self) -> int:
+        return len(self.below) + len(self.above) - self.stale
+
+class TriggerEngine:
+    """Surveillance des stop-loss / take-profit sur le flux de prix
+
+    Les niveaux sont indexés par symbole dans deux tas ; un tick ne touche que les niveaux
+    franchis. Les ordres de clôture sont passés hors du chemin des ticks, par des workers.
+    """
+
+    def __init__(self, market_data: MarketDataService = market_data_service, session_factory=SessionLocal,
+                 concurrency: int = 10, retries: int = 3, retry_delay: float = 0.5,
+                 dispatcher: AlertDispatcher = alert_dispatcher):
+        self.logger = logging.getLogger(__name__)
+        self.market_data = market_data
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        # Nouvelles tentatives de l'ordre de clôture refusé par l'exchange (délai doublé à chaque essai)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.alert_dispatcher = dispatcher
+        self.executor = None
+        self.triggers: Dict[int, Trigger] = {}
+        self.books: Dict[Tuple[str, str], SymbolTriggers] = {}
+        # SL et TP d'un même trade d'entrée : le premier déclenché annule l'autre (OCO)
+        self.by_trade: Dict[int, Set[int]] = {}
+        # Ordres opposés retirés pendant la clôture, par déclencheur : remis en attente si elle échoue
+        self.held: Dict[int, List[Trigger]] = {}
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.workers: List[asyncio.Task] = []
+        self.attached = False
+        self.tick_latency = LatencyHistogram()
+        self.stats = {"ticks": 0, "fired": 0, "executed": 0, "retried": 0, "failed": 0, "unknown": 0,
+                      "restored": 0, "canceled": 0}
+
+    async def start(self, executor):
+        """Recharger les déclencheurs en attente, écouter les prix et démarrer les workers"""
+        self.executor = executor
+        count = await self.load()
+        for exchange, symbol in list(self.books):
+            await self.market_data.ensure_subscribed(exchange, symbol)
+        self.attach()
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self.logger.info(f"Moteur de déclenchement démarré ({count} SL/TP en attente)")
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def attach(self):
+        if not self.attached:
+            self.market_data.store.add_listener(self.on_tick)
+            self.attached = True
+
+    async def load(self) -> int:
+        async with self.session_factory() as db:
+            result = await db.execute(select(PriceTrigger).where(PriceTrigger.status == "pending"))
+            rows = result.scalars().all()
+        for row in rows:
+            self.add(Trigger.from_row(row))
+        return len(rows)
+
+    def build_rows(self, trade, api_key_id: Optional[int], stop_loss: Optional[float] = None,
+                   take_profit: Optional[float] = None) -> List[PriceTrigger]:
+        """Lignes SL/TP protégeant un trade d'entrée (à insérer dans la transaction du trade)"""
+        side = "SELL" if trade.side.upper() == "BUY" else "BUY"
+        return [
+            PriceTrigger(
+                kind=kind, exchange=trade.exchange, symbol=trade.symbol, side=side,
+                quantity=trade.quantity, trigger_price=float(price), strategy=trade.strategy,
+                status="pending", trade_id=trade.id, user_id=trade.user_id, api_key_id=api_key_id
+            )
+            for kind, price in ((STOP_LOSS, stop_loss), (TAKE_PROFIT, take_profit))
+            if price
+        ]
+
+    def add(self, trigger: Trigger):
+        self.triggers[trigger.id] = trigger
+        book = self.books.get((trigger.exchange, trigger.symbol))
+        if book is None:
+            book = self.books[(trigger.exchange, trigger.symbol)] = SymbolTriggers()
+        book.push(trigger)
+        if trigger.trade_id is not None:
+            self.by_trade.setdefault(trigger.trade_id, set()).add(trigger.id)
+
+    def discard(self, trigger_id: int, popped: bool = False) -> Optional[Trigger]:
+        """Retirer un déclencheur ; s'il est encore dans le tas, il y est supprimé paresseusement"""
+        trigger = self.triggers.pop(trigger_id, None)
+        if trigger is None:
+            return None
+        if not popped:
+            book = self.books[(trigger.exchange, trigger.symbol)]
+            book.stale += 1
+            if book.stale > COMPACT_THRESHOLD and book.stale * 2 > len(book.below) + len(book.above):
+                book.compact(self.triggers)
+        siblings = self.by_trade.get(trigger.trade_id)
+        if siblings is not None:
+            siblings.discard(trigger_id)
+            if not siblings:
+                del self.by_trade[trigger.trade_id]
+        return trigger
+
+    async def cancel(self, trigger_id: int, user_id: int) -> bool:
+        """Annuler un déclencheur en attente d'un utilisateur"""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(PriceTrigger)
+                .where(PriceTrigger.id == trigger_id, PriceTrigger.user_id == user_id,
+                       PriceTrigger.status == "pending")
+                .values(status="canceled")
+                .returning(PriceTrigger.id)
+            )
+            canceled = result.scalar_one_or_none() is not None
+            await db.commit()
+        if canceled:
+            self.discard(trigger_id)
+            self.stats["canceled"] += 1
+        return canceled
+
+    def on_tick(self, ticker: Ticker):
+        """Abonné du TickerStore : dépiler les niveaux franchis, sans E/S"""
+        book = self.books.get((ticker.exchange, ticker.symbol))
+        if book is None:
+            return
+        price = ticker.last if ticker.last is not None else ticker.mid
+        if price is None:
+            return
+        started = time.perf_counter()
+        self.stats["ticks"] += 1
+        for trigger_id in book.pop_crossed(price):
+            trigger = self.triggers.get(trigger_id)
+            if trigger is None:
+                book.stale -= 1
+                continue
+            # Suspendre l'ordre opposé pendant la clôture pour qu'il ne se déclenche pas aussi
+            siblings = [
+                self.discard(sibling_id) for sibling_id in list(self.by_trade.get(trigger.trade_id, ()))
+                if sibling_id != trigger_id
+            ]
+            if siblings:
+                self.held[trigger_id] = siblings
+            self.discard(trigger_id, popped=True)
+            self.stats["fired"] += 1
+            self.queue.put_nowait((trigger, price))
+        self.tick_latency.record(time.perf_counter() - started)
+
+    async def _worker(self):
+        while True:
+            trigger, price = await self.queue.get()
+            try:
+                await self._execute(trigger, price)
+            except Exception as e:
+                self.logger.error(f"Erreur du déclencheur {trigger.id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _execute(self, trigger: Trigger, price: float):
+        siblings = self.held.pop(trigger.id, [])
+        # Réserver le déclencheur en base : un seul processus passe l'ordre. L'ordre opposé est
+        # annulé dans la même transaction (aucun autre processus ne le déclenche) et remis en
+        # attente si la clôture échoue
+        sibling_ids: List[int] = []
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(PriceTrigger)
+                .where(PriceTrigger.id == trigger.id, PriceTrigger.status == "pending")
+                .values(status="triggered", triggered_price=price, triggered_at=datetime.utcnow())
+                .returning(PriceTrigger.id)
+            )
+            claimed = result.scalar_one_or_none() is not None
+            if claimed and trigger.trade_id is not None:
+                result = await db.execute(
+                    update(PriceTrigger)
+                    .where(PriceTrigger.trade_id == trigger.trade_id, PriceTrigger.id != trigger.id,
+                           PriceTrigger.status == "pending")
+                    .values(status="canceled")
+                    .returning(PriceTrigger.id)
+                )
+                sibling_ids = list(result.scalars().all())
+            await db.commit()
+        if not claimed:
+            # Déjà exécuté par un autre processus, ou annulé : l'ordre opposé n'est repris que s'il est
+            # encore en attente en base
+            await self._reload_siblings(siblings)
+            return
+
+        try:
+            result = await self._close(trigger)
+            if result.get("trade_id") is None:
+                raise CloseNotFilled(f"ordre {result.get('order_id')} {result.get('status')} sans exécution")
+        except Exception as e:
+            # Clôture certainement non passée : la position reste ouverte et garde son ordre opposé.
+            # Issue inconnue (ordre peut-être exécuté) : l'ordre opposé reste annulé, vérification manuelle
+            not_closed = isinstance(e, (CloseNotFilled, ValueError)) or (isinstance(e, ExchangeError) and e.rejected)
+            restored = [sibling for sibling in siblings if sibling.id in sibling_ids] if not_closed else []
+            await self._restore_siblings(trigger, e, restored)
+            self.stats["failed" if not_closed else "unknown"] += 1
+            outcome = "non exécuté" if not_closed else "d'issue inconnue, position à vérifier"
+            message = (f"{trigger.kind} {trigger.side} {trigger.symbol} sur {trigger.exchange} {outcome} "
+                       f"(compte {trigger.user_id}, trade {trigger.trade_id}): {e}")
+            await monitoring_service.log_error(
+                "trigger_failed", message, {"trigger_id": trigger.id, "user_id": trigger.user_id, "price": price}
+            )
+            self.alert_dispatcher.submit_alert("TRIGGER", message, key=f"TRIGGER:{trigger.id}")
+            return
+
+        self.stats["executed"] += 1
+        async with self.session_factory() as db:
+            await db.execute(
+                update(PriceTrigger).where(PriceTrigger.id == trigger.id)
+                .values(closing_trade_id=result["trade_id"])
+            )
+            await db.commit()
+
+    async def _close(self, trigger: Trigger) -> Dict:
+        """Passer l'ordre de clôture ; nouvelle tentative sur les seuls refus explicites de l'exchange
+
+        Le même identifiant client est réutilisé à chaque tentative : sur une issue inconnue, l'exécuteur
+        recherche l'ordre au lieu de le repasser. Une erreur après le fill (enregistrement) n'est pas rejouée.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return await self.executor.execute_trade(
+                    symbol=trigger.symbol, side=trigger.side, quantity=trigger.quantity,
+                    exchange=trigger.exchange, strategy=trigger.strategy, source=trigger.kind,
+                    user_id=trigger.user_id, api_key_id=trigger.api_key_id,
+                    client_order_id=trigger.client_order_id
+                )
+            except ExchangeError as e:
+                if not e.rejected or attempt == self.retries:
+                    raise
+                self.stats["retried"] += 1
+                self.logger.warning(f"Déclencheur {trigger.id}: tentative {attempt + 1} refusée ({e}), nouvel essai")
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    async def _restore_siblings(self, trigger: Trigger, error: Exception, siblings: List[Trigger]):
+        """Clôture en échec : le déclencheur passe en `failed`, les ordres opposés fournis sont remis en attente"""
+        async with self.session_factory() as db:
+            await db.execute(
+                update(PriceTrigger).where(PriceTrigger.id == trigger.id).values(status="failed", error=str(error))
+            )
+            if siblings:
+                await db.execute(
+                    update(PriceTrigger)
+                    .where(PriceTrigger.id.in_([sibling.id for sibling in siblings]),
+                           PriceTrigger.status == "canceled")
+                    .values(status="pending")
+                )
+            await db.commit()
+        for sibling in siblings:
+            self.add(sibling)
+        self.stats["restored"] += len(siblings)
+
+    async def _reload_siblings(self, siblings: List[Trigger]):
+        """Remettre en mémoire les ordres suspendus encore en attente en base"""
+        if not siblings:
+            return
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(PriceTrigger.id)
+                .where(PriceTrigger.id.in_([sibling.id for sibling in siblings]), PriceTrigger.status == "pending")
+            )
+            pending = set(result.scalars().all())
+        for sibling in siblings:
+            if sibling.id in pending and sibling.id not in self.triggers:
+                self.add(sibling)
+
+    def get_stats(self) -> Dict:
+        p50, p99 = self.tick_latency.quantiles((0.5, 0.99))
+        return {
+            **self.stats,
+            "pending": len(self.triggers),
+            "symbols": len(self.books),
+            "queued": self.queue.qsize(),
+            "tick_p50_us": round(p50 * 1e6, 2) if p50 is not None else None,
+            "tick_p99_us": round(p99 * 1e6, 2) if p99 is not None else None
+        }
+
+trigger_engine = TriggerEngine(
+    concurrency=int(os.environ.get("TRIGGER_WORKERS", "10")),
+    retries=int(os.environ.get("TRIGGER_RETRIES", "3")),
+    retry_delay=float(os.environ.get("TRIGGER_RETRY_DELAY", "0.5"))
+)
+
+monitoring_service.register_stats_provider("trigger_engine", trigger_engine.get_stats)
\ No newline at end of file
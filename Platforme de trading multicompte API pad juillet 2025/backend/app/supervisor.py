@@ -0,0 +1,43 @@
+"""Lancement multi-workers avec état partagé (rate limiting, IP bloquées, métriques)
+
+Usage (depuis backend/) :
+    python -m app.supervisor --workers 4 --host 0.0.0.0 --port 8000
+
+Le segment partagé est créé avant le démarrage des workers uvicorn, qui l'ouvrent d'après
+SHARED_STATE_PATH ; il est supprimé à l'arrêt. Sans ce lanceur (uvicorn app.main:app),
+chaque processus garde son propre état.
+"""
+import argparse
+import logging
+import os
+
+import uvicorn
+
+from app.services.shared_state import SHARED_STATE_ENV, create_segment
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--state-path", default=os.environ.get("SHARED_STATE_FILE", f"/dev/shm/trading-api-{os.getpid()}"),
+                        help="fichier du segment, sur un tmpfs")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    size = create_segment(
+        args.state_path,
+        rate_slots=int(os.environ.get("SHARED_RATE_LIMIT_SLOTS", "65536")),
+        blocked_slots=int(os.environ.get("SHARED_BLOCKED_IPS", "4096")),
+        endpoints=int(os.environ.get("SHARED_ENDPOINTS", "128"))
+    )
+    logging.getLogger(__name__).info(f"Segment partagé {args.state_path} ({size / 1024 / 1024:.1f} Mo), {args.workers} workers")
+    # Hérité par les workers
+    os.environ[SHARED_STATE_ENV] = args.state_path
+    try:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        os.remove(args.state_path)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
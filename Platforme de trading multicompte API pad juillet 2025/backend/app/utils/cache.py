@@ -0,0 +1,89 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+class TTLCache:
+    """Cache LRU borné avec expiration par entrée"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._evict(key)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if key in self._data:
+            self._evict(key)
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        while len(self._data) > self.max_size:
+            self._evict(next(iter(self._data)))
+
+    def pop(self, key: Hashable) -> bool:
+        """Retirer une entrée ; retourne False si elle était absente"""
+        if key not in self._data:
+            return False
+        self._evict(key)
+        return True
+
+    def pop_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Retirer toutes les entrées qui satisfont le prédicat"""
+        keys = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+        for key in keys:
+            self._evict(key)
+        return len(keys)
+
+    def expiring(self, within: float) -> List[Hashable]:
+        """Clés encore valides qui expirent dans moins de `within` secondes"""
+        now = time.monotonic()
+        return [key for key, (expires_at, _) in self._data.items() if now < expires_at <= now + within]
+
+    def purge_expired(self) -> int:
+        """Retirer les entrées expirées"""
+        now = time.monotonic()
+        return self.pop_where(lambda key, value: self._data[key][0] <= now)
+
+    def clear(self):
+        for key in list(self._data):
+            self._evict(key)
+
+    def _evict(self, key: Hashable):
+        _, value = self._data.pop(key)
+        self.evictions += 1
+        if self.on_evict:
+            self.on_evict(key, value)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get_stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
\ No newline at end of file
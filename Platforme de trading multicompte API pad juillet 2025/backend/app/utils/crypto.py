@@ -1,27 +1,36 @@
 import os
 import base64
+from functools import lru_cache
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.backends import default_backend
 
 SECRET_KEY = os.environ.get("API_AES_SECRET", "32octetsupersecretkey!!").encode()  # 32 bytes
 
+@lru_cache(maxsize=1)
+def _aes() -> algorithms.AES:
+    # L'algorithme est réutilisé entre les appels ; seul le mode CBC dépend de l'IV
+    return algorithms.AES(SECRET_KEY)
+
 def encrypt_api_key(plain_text: str) -> str:
     iv = os.urandom(16)
     padder = padding.PKCS7(128).padder()
     padded_data = padder.update(plain_text.encode()) + padder.finalize()
-    cipher = Cipher(algorithms.AES(SECRET_KEY), modes.CBC(iv), backend=default_backend())
+    cipher = Cipher(_aes(), modes.CBC(iv), backend=default_backend())
     encryptor = cipher.encryptor()
     ct = encryptor.update(padded_data) + encryptor.finalize()
     return base64.b64encode(iv + ct).decode()
 
 def decrypt_api_key(enc_text: str) -> str:
+    return bytes(decrypt_api_key_bytes(enc_text)).decode()
+
+def decrypt_api_key_bytes(enc_text: str) -> bytearray:
+    """Déchiffrer vers un bytearray (sans copie str intermédiaire)"""
     data = base64.b64decode(enc_text)
     iv = data[:16]
     ct = data[16:]
-    cipher = Cipher(algorithms.AES(SECRET_KEY), modes.CBC(iv), backend=default_backend())
+    cipher = Cipher(_aes(), modes.CBC(iv), backend=default_backend())
     decryptor = cipher.decryptor()
     padded_data = decryptor.update(ct) + decryptor.finalize()
     unpadder = padding.PKCS7(128).unpadder()
-    plain = unpadder.update(padded_data) + unpadder.finalize()
-    return plain.decode() 
\ No newline at end of file
+    return bytearray(unpadder.update(padded_data) + unpadder.finalize()) 
\ No newline at end of file
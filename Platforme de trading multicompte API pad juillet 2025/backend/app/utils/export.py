@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Optional, Sequence
+
+CHUNK_SIZE = 5000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+def csv_header(columns: Sequence[str]) -> bytes:
+    return (",".join(columns) + "\r\n").encode()
+
+def encode_rows(rows: Iterable[Sequence], columns: Sequence[str], fmt: str) -> bytes:
+    """Encoder un lot de lignes (tuples) en NDJSON ou CSV"""
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps(dict(zip(columns, row)), default=_default, ensure_ascii=False) + "\n"
+            for row in rows
+        ).encode()
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue().encode()
+
+async def stream_export(session_factory, query, columns: Sequence[str], fmt: str,
+                        chunk_size: int = CHUNK_SIZE,
+                        before: Optional[AsyncIterator[Sequence[Sequence]]] = None) -> AsyncIterator[bytes]:
+    """Exporter le résultat d'une requête par lots via un curseur côté serveur
+
+    La session est ouverte dans le générateur : elle reste valide pendant toute la durée de la réponse.
+    `before` fournit des lots de lignes émis avant ceux de la requête (trades archivés).
+    """
+    if fmt == "csv":
+        yield csv_header(columns)
+
+    if before is not None:
+        async for rows in before:
+            yield encode_rows(rows, columns, fmt)
+
+    async with session_factory() as db:
+        result = await db.stream(query.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions(chunk_size):
+            yield encode_rows(rows, columns, fmt)
\ No newline at end of file
@@ -0,0 +1,51 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Encoder la position (timestamp, id) de la dernière ligne d'une page"""
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+def page_limit(cursor: Optional[str], limit: Optional[int]) -> Optional[int]:
+    """Taille de page effective : sans curseur ni limit, None (liste complète, comme avant la pagination)"""
+    if limit is None and cursor:
+        return DEFAULT_PAGE_SIZE
+    return limit
+
+def keyset_paginate(query, timestamp_column, id_column, cursor: Optional[str], limit: Optional[int]):
+    """Appliquer la pagination par curseur (du plus récent au plus ancien)
+
+    Une ligne de plus que la taille de page est demandée pour savoir s'il reste une page suivante.
+    Sans limite (voir `page_limit`), toutes les lignes sont renvoyées dans le même ordre.
+    """
+    if cursor:
+        cursor_timestamp, cursor_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(timestamp_column, id_column) < tuple_(cursor_timestamp, cursor_id),
+            # Redondant, mais seule une comparaison simple permet l'élagage des partitions
+            timestamp_column <= cursor_timestamp
+        )
+    query = query.order_by(timestamp_column.desc(), id_column.desc())
+    return query if limit is None else query.limit(limit + 1)
+
+def split_page(rows: list, limit: Optional[int], timestamp_attr: str) -> Tuple[list, Optional[str]]:
+    """Séparer la page demandée et calculer le curseur de la page suivante"""
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(getattr(last, timestamp_attr), last.id)
\ No newline at end of file
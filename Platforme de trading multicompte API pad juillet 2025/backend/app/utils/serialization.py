@@ -0,0 +1,54 @@
+import json
+from datetime import date, datetime
+from typing import Dict, Optional, Sequence, Type
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy.future import select
+
+try:
+    import orjson
+    from orjson import Fragment
+except ImportError:  # orjson (>= 3.9) optionnel : encodeur json standard
+    orjson = Fragment = None
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+def dumps(content) -> bytes:
+    """Encodage identique à celui de la JSONResponse de FastAPI"""
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+class SchemaRows:
+    """Lignes d'un schéma orm_mode lues et encodées sans objets ORM ni validation par ligne
+
+    Seules les colonnes du schéma sont sélectionnées, dans l'ordre de ses champs ; les types
+    des colonnes du modèle (Float, DateTime...) donnent déjà les valeurs que produirait le schéma.
+    """
+
+    def __init__(self, model, schema: Type[BaseModel]):
+        self.schema = schema
+        self.fields = list(schema.__fields__)
+        self.float_fields = [name for name, field in schema.__fields__.items() if field.type_ is float]
+        self.columns = [getattr(model, field) for field in self.fields]
+
+    def select(self):
+        return select(*self.columns)
+
+    def encode(self, rows: Sequence) -> bytes:
+        items = [dict(zip(self.fields, row)) for row in rows]
+        if orjson is None:
+            return dumps(items)
+        for item in items:
+            for field in self.float_fields:
+                value = item[field]
+                # orjson écrit 0.00001 et 1e16 là où Python écrit 1e-05 et 1e+16 (NaN : refusé comme par FastAPI)
+                if value and not 1e-4 <= abs(value) < 1e16:
+                    item[field] = Fragment(json.dumps(value, allow_nan=False).encode())
+        return orjson.dumps(items)
+
+    def response(self, rows: Sequence, headers: Optional[Dict[str, str]] = None) -> Response:
+        return Response(content=self.encode(rows), media_type="application/json", headers=headers)
\ No newline at end of file
@@ -0,0 +1,53 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Durées cumulées par étape pour la requête en cours (None si la requête n'est pas échantillonnée)
+_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+def begin_request() -> Token:
+    """Ouvrir le relevé des étapes de la requête courante"""
+    return _stages.set({})
+
+def end_request(token: Token) -> Dict[str, float]:
+    """Clore le relevé et retourner les durées par étape (secondes)"""
+    stages = _stages.get() or {}
+    _stages.reset(token)
+    return stages
+
+def add_stage(name: str, seconds: float):
+    stages = _stages.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+@contextmanager
+def stage(name: str):
+    """Mesurer un bloc (auth, db, exchange, notification...)
+
+    Les durées d'une même étape s'additionnent : des appels concurrents (fan-out)
+    donnent un temps cumulé qui peut dépasser la durée de la requête.
+    """
+    stages = _stages.get()
+    if stages is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - started
+
+# Étape "db" : toutes les requêtes SQL, quel que soit le moteur (y compris les moteurs async)
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _stages.get() is not None:
+        context._stage_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_stage_started", None)
+    if started is not None:
+        add_stage("db", time.perf_counter() - started)
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""Benchmark du backtest vectorisé contre une boucle par bougie, puis d'une grille de paramètres
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_backtest --bars 100000 --signals 5000 --strategies 5
+    python -m benchmarks.bench_backtest --grid-size 64 --workers 8
+
+Bougies (marche aléatoire, un symbole) et signaux synthétiques. La boucle de référence applique le même
+modèle d'exécution (netting des signaux, SL/TP) bougie par bougie ; les PnL des deux chemins sont comparés.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.backtest import BacktestParams, Bars, Signals, run_backtest, run_grid
+
+def synthetic_market(bars: int, seed: int) -> Bars:
+    rng = np.random.default_rng(seed)
+    close = 40000 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    open_ = np.r_[40000, close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.002, bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.002, bars))
+    times = 1_704_067_200_000 + np.arange(bars, dtype=np.int64) * 60_000
+    return Bars(times, open_, high, low, close)
+
+def synthetic_signals(market: Bars, count: int, strategies: int, seed: int) -> Signals:
+    rng = np.random.default_rng(seed + 1)
+    return Signals({
+        "timestamp": np.sort(rng.integers(market.times[0], market.times[-1], count)),
+        "symbol": np.full(count, "BTCUSDT", dtype=object),
+        "side": rng.choice(["BUY", "SELL"], count).astype(object),
+        "strategy": np.array([f"strategy_{i}" for i in rng.integers(0, strategies, count)], dtype=object),
+        "quantity": rng.uniform(0.01, 0.5, count)
+    })
+
+def reference_pnl(bars: Bars, signals: Signals, params: BacktestParams) -> np.ndarray:
+    """Même modèle d'exécution, boucle Python par bougie : signaux à l'ouverture (netting FIFO par
+    stratégie), puis stop-loss / take-profit de chaque lot encore ouvert"""
+    n = len(bars)
+    slippage = params.slippage_bps / 10000
+    entries = {}
+    for i in range(len(signals)):
+        bar = int(np.searchsorted(bars.times, signals.times[i]))
+        if bar < n:
+            entries.setdefault(bar, []).append(i)
+    # Lots ouverts par stratégie : [sens, quantité restante, quantité initiale, prix d'entrée, stop, take]
+    open_lots = {}
+    pnls = []
+
+    def close(lot, quantity, exit_price):
+        side, entry = lot[0], lot[3]
+        pnls.append(side * quantity * (exit_price - entry) - params.fee_rate * quantity * (entry + exit_price))
+
+    for k in range(n):
+        for i in entries.get(k, ()):
+            side = signals.sides[i]
+            entry = bars.open[k] * (1 + side * slippage)
+            quantity = params.notional / entry if params.notional else signals.quantities[i] * params.size
+            held = open_lots.setdefault(signals.strategies[i], [])
+            remaining = quantity
+            while held and remaining > 0 and held[0][0] != side:
+                lot = held[0]
+                closed = min(lot[1], remaining)
+                close(lot, closed, bars.open[k] * (1 - lot[0] * slippage))
+                remaining -= closed
+                lot[1] -= closed
+                if lot[1] <= 1e-12 * lot[2]:
+                    held.pop(0)
+            if remaining > 1e-12 * quantity:
+                stop = entry * (1 - side * params.stop_loss_pct) if params.stop_loss_pct is not None else np.nan
+                take = entry * (1 + side * params.take_profit_pct) if params.take_profit_pct is not None else np.nan
+                held.append([side, remaining, quantity, entry, stop, take])
+        low, high, open_ = bars.low[k], bars.high[k], bars.open[k]
+        for held in open_lots.values():
+            for lot in list(held):
+                side, stop, take = lot[0], lot[4], lot[5]
+                if (low <= stop) if side > 0 else (high >= stop):
+                    exit_price = (min(open_, stop) if side > 0 else max(open_, stop)) * (1 - side * slippage)
+                elif (high >= take) if side > 0 else (low <= take):
+                    exit_price = max(open_, take) if side > 0 else min(open_, take)
+                else:
+                    continue
+                close(lot, lot[1], exit_price)
+                held.remove(lot)
+    for held in open_lots.values():
+        for lot in held:
+            close(lot, lot[1], bars.close[n - 1] * (1 - lot[0] * slippage))
+    return np.array(pnls)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=100000)
+    parser.add_argument("--signals", type=int, default=5000)
+    parser.add_argument("--strategies", type=int, default=5)
+    parser.add_argument("--grid-size", type=int, default=32, help="jeux de paramètres de la grille")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    market = synthetic_market(args.bars, args.seed)
+    signals = synthetic_signals(market, args.signals, args.strategies, args.seed)
+    print(f"bougies         : {args.bars:,} ; signaux : {args.signals:,} ({args.strategies} stratégies)")
+    print(f"{'scénario':<28}{'boucle (ms)':>12}{'vectorisé (ms)':>16}{'gain':>8}{'PnL':>16}")
+    scenarios = {
+        "sorties sur signal": BacktestParams(fee_rate=0.001, slippage_bps=2),
+        "SL 1 % / TP 2 %": BacktestParams(stop_loss_pct=0.01, take_profit_pct=0.02, fee_rate=0.001, slippage_bps=2),
+        "SL 5 % / TP 10 %": BacktestParams(stop_loss_pct=0.05, take_profit_pct=0.1, fee_rate=0.001, slippage_bps=2)
+    }
+    for name, params in scenarios.items():
+        started = time.perf_counter()
+        summary = run_backtest({"BTCUSDT": market}, signals, params, with_curve=True)
+        vectorized = time.perf_counter() - started
+        started = time.perf_counter()
+        reference = reference_pnl(market, signals, params)
+        loop = time.perf_counter() - started
+
+        if summary["trades"] != len(reference) or not np.isclose(summary["pnl"], reference.sum(), rtol=1e-9):
+            raise SystemExit(f"ERREUR ({name}) : PnL vectorisé {summary['pnl']:.6f} contre référence {reference.sum():.6f}")
+        if not np.isclose(summary["curve"]["equity"][-1] - 10000.0, reference.sum(), rtol=1e-9):
+            raise SystemExit(f"ERREUR ({name}) : la courbe d'équité ne finit pas sur le PnL réalisé")
+        print(f"{name:<28}{loop * 1000:>12,.1f}{vectorized * 1000:>16,.1f}{loop / vectorized:>7.0f}x{summary['pnl']:>16,.2f}")
+    print("PnL identiques à la boucle de référence")
+
+    rng = np.random.default_rng(args.seed)
+    grid = [
+        BacktestParams(size=float(size), stop_loss_pct=float(stop), take_profit_pct=float(take),
+                       fee_rate=0.001, slippage_bps=2)
+        for size, stop, take in zip(rng.uniform(0.5, 2, args.grid_size), rng.uniform(0.002, 0.03, args.grid_size),
+                                    rng.uniform(0.004, 0.06, args.grid_size))
+    ]
+    print(f"\ngrille de {args.grid_size} jeux de paramètres")
+    print(f"{'workers':<24}{'durée (s)':>12}{'jeux/s':>10}")
+    for workers in sorted({1, args.workers}):
+        started = time.perf_counter()
+        run_grid({"BTCUSDT": market}, signals, grid, workers=workers)
+        elapsed = time.perf_counter() - started
+        print(f"{workers:<24}{elapsed:>12,.2f}{args.grid_size / elapsed:>10,.1f}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""Benchmark de latence des connecteurs d'exchange contre le mock local
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_exchange --orders 2000 --concurrency 50 --latency-ms 2
+
+Démarre le mock exchange dans le même processus et compare la session keep-alive
+partagée à l'ancien schéma (une session, donc une connexion TCP, par requête).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+from app.services.credential_vault import Credentials
+from app.services.exchanges import BinanceClient, BybitClient
+from benchmarks.mock_exchange import start_mock_exchange
+
+SECRET = "bench-secret"
+
+class SessionPerRequestMixin:
+    """Reproduction de l'ancien schéma : nouvelle ClientSession à chaque appel"""
+
+    async def _send(self, method: str, path: str, **kwargs):
+        async with aiohttp.ClientSession() as session:
+            async with session.request(method, self.base_url + path, **kwargs) as response:
+                return response.status, await response.json(content_type=None)
+
+class BinancePerRequest(SessionPerRequestMixin, BinanceClient):
+    pass
+
+class BybitPerRequest(SessionPerRequestMixin, BybitClient):
+    pass
+
+async def bench(client, orders: int, concurrency: int):
+    creds = Credentials(1, 1, client.name, bytearray(b"bench-key"), bytearray(SECRET.encode()))
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def place():
+        async with semaphore:
+            started = time.perf_counter()
+            await client.place_order(creds, "BTCUSDT", "BUY", 0.01)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(place() for _ in range(orders)))
+    elapsed = time.perf_counter() - started
+    await client.close()
+
+    latencies.sort()
+    return orders / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+async def run(args):
+    runner = await start_mock_exchange(port=args.port, latency_ms=args.latency_ms, secret=SECRET)
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        print(f"{'connecteur':<32}{'ordres/s':>12}{'p50 (ms)':>12}{'p99 (ms)':>12}")
+        for name, client in (
+            ("binance, session partagée", BinanceClient(url, limit=args.concurrency)),
+            ("binance, session par requête", BinancePerRequest(url)),
+            ("bybit, session partagée", BybitClient(url, limit=args.concurrency)),
+            ("bybit, session par requête", BybitPerRequest(url))
+        ):
+            throughput, p50, p99 = await bench(client, args.orders, args.concurrency)
+            print(f"{name:<32}{throughput:>12,.0f}{p50:>12.2f}{p99:>12.2f}")
+    finally:
+        await runner.cleanup()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8900)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
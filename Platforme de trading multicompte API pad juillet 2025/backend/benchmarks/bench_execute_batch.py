@@ -0,0 +1,65 @@
+"""Benchmark de l'exécution d'ordres : un ordre par requête contre un lot
+
+Usage (depuis backend/, sur une base de test : les trades créés sont conservés) :
+    python -m benchmarks.mock_exchange --port 8900 &
+    BINANCE_API_URL=http://127.0.0.1:8900 DATABASE_URL=postgresql+asyncpg://... \
+        python -m benchmarks.bench_execute_batch --database-url postgresql+asyncpg://... --user-id 1 --orders 500
+
+Appelle directement les handlers de /trading/execute et /trading/execute-batch, sans
+passer par HTTP. L'utilisateur doit avoir une clé API binance enregistrée ; les ordres
+sont exécutés par le mock exchange local.
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.future import select
+
+from app.api.trading import execute_trade, execute_trade_batch
+from app.models import User
+
+def orders(count: int):
+    return [
+        {"symbol": "BTCUSDT", "side": "BUY" if i % 2 else "SELL", "quantity": 0.01,
+         "exchange": "binance", "strategy": "bench_rebalance"}
+        for i in range(count)
+    ]
+
+async def run(args):
+    engine = create_async_engine(args.database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as db:
+        user = (await db.execute(select(User).where(User.id == args.user_id))).scalar_one()
+
+    batch = orders(args.orders)
+
+    started = time.perf_counter()
+    for order in batch:
+        await execute_trade(
+            symbol=order["symbol"], side=order["side"], quantity=order["quantity"],
+            exchange=order["exchange"], current_user=user
+        )
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    async with session_factory() as db:
+        result = await execute_trade_batch(orders=batch, current_user=user, db=db)
+    batched = time.perf_counter() - started
+
+    await engine.dispose()
+
+    print(f"ordres              : {args.orders} ({result['succeeded']} insérés par lot)")
+    print(f"un ordre / requête  : {single:.3f} s ({args.orders / single:,.0f} ordres/s)")
+    print(f"lot                 : {batched:.3f} s ({args.orders / batched:,.0f} ordres/s)")
+    print(f"accélération        : x{single / batched:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--orders", type=int, default=500)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
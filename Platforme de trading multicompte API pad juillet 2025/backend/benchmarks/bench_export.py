@@ -0,0 +1,106 @@
+"""Benchmark de l'export en flux (mémoire et débit)
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_export --rows 1000000 --format csv
+    python -m benchmarks.bench_export --database-url postgresql+asyncpg://... --user-id 1
+
+Sans --database-url, les lignes sont générées à la volée par une session factice :
+seul le pipeline d'encodage et de streaming est mesuré.
+"""
+import argparse
+import asyncio
+import resource
+import time
+from datetime import datetime, timedelta
+
+from app.utils.export import CHUNK_SIZE, stream_export
+
+COLUMNS = ["id", "symbol", "side", "quantity", "price", "pnl", "strategy", "timestamp", "exchange"]
+
+def rss_mb() -> float:
+    """RSS courant (Linux), à défaut le pic RSS"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class _SyntheticResult:
+    def __init__(self, rows: int):
+        self.rows = rows
+
+    async def partitions(self, size: int):
+        start = datetime(2024, 1, 1)
+        for offset in range(0, self.rows, size):
+            yield [
+                (i, "BTCUSDT", "BUY" if i % 2 else "SELL", 0.01, 42000.0 + i % 100, 1.5, "ema_cross",
+                 start + timedelta(seconds=i), "binance")
+                for i in range(offset, min(offset + size, self.rows))
+            ]
+
+class _SyntheticQuery:
+    def execution_options(self, **options):
+        return self
+
+class _SyntheticSession:
+    def __init__(self, rows: int):
+        self.rows = rows
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def stream(self, query):
+        return _SyntheticResult(self.rows)
+
+async def run(args):
+    if args.database_url:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        from sqlalchemy.future import select
+        from app.models import Trade
+
+        engine = create_async_engine(args.database_url)
+        session_factory = async_sessionmaker(engine)
+        query = (
+            select(*[getattr(Trade, column) for column in COLUMNS])
+            .where(Trade.user_id == args.user_id)
+            .order_by(Trade.timestamp, Trade.id)
+        )
+    else:
+        session_factory = lambda: _SyntheticSession(args.rows)
+        query = _SyntheticQuery()
+
+    rss_start = rss_mb()
+    rss_peak = rss_start
+    total_bytes = 0
+    started = time.perf_counter()
+
+    async for chunk in stream_export(session_factory, query, COLUMNS, args.format, args.chunk_size):
+        total_bytes += len(chunk)
+        rss_peak = max(rss_peak, rss_mb())
+
+    elapsed = time.perf_counter() - started
+    rows = args.rows if not args.database_url else None
+
+    print(f"format          : {args.format}")
+    print(f"taille des lots : {args.chunk_size}")
+    if rows:
+        print(f"lignes          : {rows}")
+        print(f"débit           : {rows / elapsed:,.0f} lignes/s")
+    print(f"octets émis     : {total_bytes / 1024 / 1024:,.1f} Mo en {elapsed:.2f} s")
+    print(f"RSS début / pic : {rss_start:.1f} Mo / {rss_peak:.1f} Mo (+{rss_peak - rss_start:.1f} Mo)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--database-url")
+    parser.add_argument("--user-id", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""Microbenchmark de la détection d'injections (coût par requête)
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_injection --iterations 20000
+
+Compare l'ancienne détection (URL et paramètres seulement, un lower() par motif)
+au scanner à regex unique, qui analyse aussi le body.
+"""
+import argparse
+import json
+import time
+from urllib.parse import parse_qsl
+
+from app.middleware.injection import DEFAULT_PATTERNS, InjectionScanner
+
+def legacy_detect(url: str, query: str) -> bool:
+    """Reproduction de l'ancienne implémentation de _detect_injection_attempt"""
+    for pattern in DEFAULT_PATTERNS:
+        if pattern.lower() in url.lower():
+            return True
+    for _, value in parse_qsl(query):
+        for pattern in DEFAULT_PATTERNS:
+            if pattern.lower() in str(value).lower():
+                return True
+    return False
+
+def payloads():
+    order = json.dumps({
+        "symbol": "BTCUSDT", "side": "BUY", "strategy": "ema_cross",
+        "quantity": 0.01, "stop_loss": 41000, "take_profit": 45000, "exchange": "binance"
+    }).encode()
+    batch = json.dumps([json.loads(order)] * 600).encode()[:65536]
+    # Pire cas : body au plafond, sans motif, rempli de débuts de motifs
+    worst = json.dumps({"note": "union selec onload onerro javascrip <scrip " * 1500}).encode()[:65536]
+    return {
+        "typique": ("/webhook/tradingview", "", order),
+        "historique": ("/trading/history", "symbol=BTCUSDT&limit=100&exchange=binance", b""),
+        "lot d'ordres (64 Ko)": ("/trading/execute-batch", "", batch),
+        "pire cas (64 Ko)": ("/trading/execute-batch", "", worst)
+    }
+
+def bench(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    scanner = InjectionScanner()
+    print(f"{'scénario':<24}{'ancien (µs)':>14}{'scanner (µs)':>14}{'body (octets)':>16}")
+    for name, (path, query, body) in payloads().items():
+        url = f"http://localhost:8000{path}" + (f"?{query}" if query else "")
+        iterations = args.iterations if len(body) < 4096 else max(1, args.iterations // 20)
+        legacy = bench(lambda: legacy_detect(url, query), iterations)
+        scanned = bench(lambda: scanner.scan(path, query, body), iterations)
+        print(f"{name:<24}{legacy:>14.2f}{scanned:>14.2f}{len(body):>16}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
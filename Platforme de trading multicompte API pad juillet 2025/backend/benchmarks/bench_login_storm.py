@@ -0,0 +1,100 @@
+"""Test de charge : latence des webhooks pendant une rafale de connexions
+
+Usage (depuis backend/, API démarrée, exchanges pointés sur le mock local) :
+    python -m benchmarks.mock_exchange --port 8900 &
+    python -m benchmarks.bench_login_storm --url http://127.0.0.1:8000 \
+        --email bench@example.com --password bench-password --logins 200 --duration 10
+
+Envoie des signaux TradingView à débit constant (avec TRADINGVIEW_EXECUTION_MODE=fanout,
+la stratégie par défaut n'a pas d'abonné : aucun ordre n'est passé), d'abord seuls puis
+pendant une rafale de connexions concurrentes. Le p99 des webhooks doit rester stable
+pendant la rafale ; les connexions refusées (503, pool de hachage saturé) sont comptées à part.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+import aiohttp
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+async def webhook_probe(session, args, stop: asyncio.Event):
+    """Signaux à débit constant ; retourne les latences (ms)"""
+    run_id = uuid.uuid4().hex[:12]
+    latencies, tasks = [], []
+
+    async def send(i):
+        # Clé d'idempotence unique : chaque signal est exécuté, aucun n'est rejoué
+        body = json.dumps({"symbol": "BTCUSDT", "side": "BUY", "strategy": args.strategy, "quantity": 0.001,
+                           "idempotency_key": f"storm-{run_id}-{i}"}).encode()
+        headers = {"Content-Type": "application/json"}
+        if args.webhook_secret:
+            headers["X-Signature"] = hmac.new(args.webhook_secret.encode(), body, hashlib.sha256).hexdigest()
+        started = time.perf_counter()
+        async with session.post(f"{args.url}/webhook/tradingview", data=body, headers=headers) as response:
+            await response.read()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    interval = 1 / args.webhook_rate
+    while not stop.is_set():
+        tasks.append(asyncio.create_task(send(len(tasks))))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return latencies
+
+async def login_storm(session, args, stop: asyncio.Event):
+    """Connexions concurrentes en boucle ; retourne les statuts obtenus"""
+    statuses = {}
+
+    async def worker():
+        while not stop.is_set():
+            params = {"email": args.email, "password": args.password}
+            async with session.post(f"{args.url}/users/login", params=params) as response:
+                await response.read()
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(args.logins)), return_exceptions=True)
+    return statuses
+
+async def phase(session, args, storm: bool):
+    stop = asyncio.Event()
+    probe = asyncio.create_task(webhook_probe(session, args, stop))
+    logins = asyncio.create_task(login_storm(session, args, stop)) if storm else None
+    await asyncio.sleep(args.duration)
+    stop.set()
+    latencies = await probe
+    statuses = await logins if logins else {}
+    return latencies, statuses
+
+async def run(args):
+    connector = aiohttp.TCPConnector(limit=args.logins + 100)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        print(f"{'phase':<24}{'webhooks':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}{'max (ms)':>12}  connexions")
+        for name, storm in (("webhooks seuls", False), ("pendant la rafale", True)):
+            latencies, statuses = await phase(session, args, storm)
+            logins = ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())) or "-"
+            print(f"{name:<24}{len(latencies):>10}{percentile(latencies, 0.5):>12.1f}"
+                  f"{percentile(latencies, 0.99):>12.1f}{max(latencies, default=float('nan')):>12.1f}  {logins}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=200, help="connexions concurrentes pendant la rafale")
+    parser.add_argument("--webhook-rate", type=float, default=50.0, help="signaux par seconde")
+    parser.add_argument("--webhook-secret", help="TRADINGVIEW_WEBHOOK_SECRET de l'API")
+    parser.add_argument("--strategy", default="bench_login_storm")
+    parser.add_argument("--duration", type=float, default=10.0, help="durée de chaque phase (s)")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
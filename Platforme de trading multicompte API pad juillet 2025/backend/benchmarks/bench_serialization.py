@@ -0,0 +1,129 @@
+"""Benchmark de la sérialisation des listes : objets ORM + response_model contre tuples + SchemaRows
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_serialization --kind trades --limit 1000 --pages 200
+    python -m benchmarks.bench_serialization --database-url postgresql+asyncpg://... --user-id 1
+
+Sans --database-url, les lignes sont synthétiques et seule la sérialisation est mesurée
+(objets ORM transitoires contre tuples). Avec --database-url, chaque page est relue en base
+par les deux chemins. Les deux corps de réponse sont comparés octet par octet.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models import APIKey, Deposit, PriceTrigger, Trade
+from app.schemas import APIKeyOut, DepositOut, TradeOut, TriggerOut
+from app.utils.serialization import SchemaRows, orjson
+
+KINDS = {
+    "trades": (Trade, TradeOut),
+    "deposits": (Deposit, DepositOut),
+    "triggers": (PriceTrigger, TriggerOut),
+    "api_keys": (APIKey, APIKeyOut)
+}
+
+def synthetic_values(field: str, i: int, rng: random.Random):
+    start = datetime(2024, 1, 1)
+    values = {
+        "id": i, "trade_id": i, "closing_trade_id": None,
+        "symbol": "BTCUSDT", "side": "BUY" if i % 2 else "SELL", "exchange": "binance",
+        "kind": "stop_loss", "status": "pending", "currency": "USDT", "strategy": "ema_cross",
+        "tx_id": f"0x{i:064x}", "error": None,
+        # Petites quantités (notation exponentielle en Python) sur une partie des lignes
+        "quantity": round(rng.uniform(0.00001, 0.0001), 8) if i % 50 == 0 else round(rng.uniform(0.001, 5), 8),
+        "amount": round(rng.uniform(1, 10000), 8),
+        "price": round(rng.uniform(20000, 70000), 2),
+        "trigger_price": round(rng.uniform(20000, 70000), 2),
+        "triggered_price": None,
+        "pnl": round(rng.uniform(-500, 500), 8) if i % 3 else None,
+        "timestamp": start + timedelta(seconds=i, microseconds=i % 7 * 1000),
+        "created_at": start + timedelta(seconds=i),
+        "triggered_at": None
+    }
+    return values[field]
+
+async def orm_path(field, objects) -> bytes:
+    content = await serialize_response(field=field, response_content=objects)
+    return JSONResponse(content).body
+
+async def run(args):
+    model, schema = KINDS[args.kind]
+    rows = SchemaRows(model, schema)
+    field = create_response_field(name=f"Response_{args.kind}", type_=List[schema])
+
+    if args.database_url:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from sqlalchemy.future import select
+
+        engine = create_async_engine(args.database_url)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        order = (model.id.desc(),)
+
+        async def fetch_orm():
+            async with session_factory() as db:
+                query = select(model).where(model.user_id == args.user_id).order_by(*order).limit(args.limit)
+                return (await db.execute(query)).scalars().all()
+
+        async def fetch_rows():
+            async with session_factory() as db:
+                query = rows.select().where(model.user_id == args.user_id).order_by(*order).limit(args.limit)
+                return (await db.execute(query)).all()
+    else:
+        rng = random.Random(args.seed)
+        tuples = [tuple(synthetic_values(name, i, rng) for name in rows.fields) for i in range(args.limit)]
+        objects = [model(**dict(zip(rows.fields, values))) for values in tuples]
+
+        async def fetch_orm():
+            return objects
+
+        async def fetch_rows():
+            return tuples
+
+    async def orm_request():
+        return await orm_path(field, await fetch_orm())
+
+    async def fast_request():
+        return rows.encode(await fetch_rows())
+
+    reference, fast = await orm_request(), await fast_request()
+    if reference != fast:
+        raise SystemExit("ERREUR : les corps JSON diffèrent entre les deux chemins")
+    size = len(reference)
+
+    print(f"type            : {args.kind} ({len(rows.fields)} champs)")
+    print(f"lignes par page : {args.limit} ({size / 1024:,.0f} Ko, corps identiques)")
+    print(f"encodeur        : {'orjson' if orjson is not None else 'json (orjson absent)'}")
+    print(f"{'chemin':<20}{'requêtes/s':>12}{'CPU / 10k lignes (ms)':>24}")
+    results = {}
+    for name, request in (("ORM + response_model", orm_request), ("tuples + SchemaRows", fast_request)):
+        await request()
+        cpu_started, started = time.process_time(), time.perf_counter()
+        for _ in range(args.pages):
+            await request()
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+        results[name] = cpu
+        print(f"{name:<20}{args.pages / elapsed:>12,.0f}{cpu / (args.pages * args.limit) * 10000 * 1000:>24,.1f}")
+    baseline, fast_cpu = results.values()
+    print(f"gain CPU        : x{baseline / fast_cpu:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kind", choices=sorted(KINDS), default="trades")
+    parser.add_argument("--limit", type=int, default=1000, help="lignes par page")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url")
+    parser.add_argument("--user-id", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""Microbenchmark du middleware de mesure (surcoût par requête)
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_timing --iterations 50000
+
+Appelle directement une application ASGI minimale (sans serveur) avec et sans
+TimingMiddleware, à plusieurs taux d'échantillonnage des étapes.
+"""
+import argparse
+import asyncio
+import time
+
+from app.middleware.timing import TimingMiddleware
+from app.services.monitoring import MonitoringService
+from app.utils.timing import stage
+
+class FakeRoute:
+    path_format = "/trading/history"
+
+ROUTE = FakeRoute()
+START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+BODY = {"type": "http.response.body", "body": b"[]"}
+
+async def endpoint(scope, receive, send):
+    """Application minimale : résolution de route, deux étapes, réponse vide"""
+    scope["route"] = ROUTE
+    with stage("auth"):
+        pass
+    with stage("db"):
+        pass
+    await send(START)
+    await send(BODY)
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def send(message):
+    pass
+
+async def bench(app, iterations: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/trading/history"}
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+async def run(iterations: int):
+    baseline = await bench(endpoint, iterations)
+    print(f"{'configuration':<28}{'µs/requête':>12}{'surcoût (µs)':>14}")
+    print(f"{'sans middleware':<28}{baseline:>12.2f}{'-':>14}")
+    for sample_rate in (0.0, 0.1, 1.0):
+        # Service neuf : aucune alerte, aucun historique partagé entre les configurations
+        app = TimingMiddleware(endpoint, monitoring=MonitoringService(), sample_rate=sample_rate)
+        elapsed = await bench(app, iterations)
+        print(f"{f'échantillonnage {sample_rate:.0%}':<28}{elapsed:>12.2f}{elapsed - baseline:>14.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
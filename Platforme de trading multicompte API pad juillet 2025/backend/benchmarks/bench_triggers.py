@@ -0,0 +1,146 @@
+"""Benchmark du moteur de déclenchement SL/TP : rejeu de ticks contre les niveaux en attente
+
+Usage (depuis backend/) :
+    python -m benchmarks.bench_triggers --triggers 100000 --symbols 20 --ticks 200000
+    python -m benchmarks.bench_triggers --triggers 100000 --record ticks.binance.ndjson
+
+Sans --record, les ticks sont une marche aléatoire par symbole ; avec --record, un flux
+enregistré par le service de prix (MARKET_DATA_RECORD) est rejoué. Les niveaux sont placés
+autour du premier prix de chaque symbole. Compare le moteur (tas par symbole) au parcours
+de tous les niveaux du symbole à chaque tick, sur les --scan-ticks premiers ticks (le
+parcours est trop lent pour le flux complet) ; aucun ordre n'est passé.
+"""
+import argparse
+import json
+import random
+import time
+
+from app.services.market_data import BinanceMarketStream, BybitMarketStream, MarketDataService, Ticker, TickerStore
+from app.services.trigger_engine import STOP_LOSS, TAKE_PROFIT, Trigger, TriggerEngine
+
+class LinearScan:
+    """Référence : tous les niveaux du symbole testés à chaque tick"""
+
+    def __init__(self):
+        self.triggers = {}
+        self.fired = 0
+
+    def add(self, trigger: Trigger):
+        self.triggers.setdefault((trigger.exchange, trigger.symbol), []).append(trigger)
+
+    def on_tick(self, ticker: Ticker):
+        pending = self.triggers.get((ticker.exchange, ticker.symbol))
+        if not pending:
+            return
+        price = ticker.last if ticker.last is not None else ticker.mid
+        remaining = []
+        for trigger in pending:
+            if (price <= trigger.price) if trigger.fires_below else (price >= trigger.price):
+                self.fired += 1
+            else:
+                remaining.append(trigger)
+        self.triggers[(ticker.exchange, ticker.symbol)] = remaining
+
+def synthetic_ticks(symbols: int, count: int, volatility: float, seed: int):
+    rng = random.Random(seed)
+    prices = {f"SYM{i}USDT": 100.0 for i in range(symbols)}
+    names = list(prices)
+    for _ in range(count):
+        symbol = rng.choice(names)
+        prices[symbol] *= 1 + rng.gauss(0, volatility)
+        yield "binance", symbol, prices[symbol]
+
+def recorded_ticks(path: str):
+    """Ticks (exchange, symbole, prix) extraits d'un flux enregistré"""
+    store = TickerStore()
+    streams = {"binance": BinanceMarketStream("", store), "bybit": BybitMarketStream("", store)}
+    ticks = []
+    store.add_listener(lambda ticker: ticks.append(
+        (ticker.exchange, ticker.symbol, ticker.last if ticker.last is not None else ticker.mid)
+    ))
+    with open(path) as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry["exchange"] in streams:
+                streams[entry["exchange"]].handle(entry["message"])
+    return [tick for tick in ticks if tick[2] is not None]
+
+def make_triggers(count: int, first_prices, spread: float, seed: int):
+    rng = random.Random(seed)
+    keys = list(first_prices)
+    triggers = []
+    for trigger_id in range(1, count + 1):
+        exchange, symbol = rng.choice(keys)
+        side = rng.choice(("BUY", "SELL"))
+        kind = rng.choice((STOP_LOSS, TAKE_PROFIT))
+        trigger = Trigger(trigger_id, kind, exchange, symbol, side, 1.0, 0.0, trade_id=trigger_id)
+        # Niveau du bon côté du prix courant, sinon il se déclencherait au premier tick
+        distance = rng.uniform(0.001, spread)
+        trigger.price = first_prices[(exchange, symbol)] * (1 - distance if trigger.fires_below else 1 + distance)
+        triggers.append(trigger)
+    return triggers
+
+def replay(listener, ticks):
+    store = TickerStore()
+    store.add_listener(listener)
+    latencies = []
+    for exchange, symbol, price in ticks:
+        started = time.perf_counter()
+        store.update(exchange, symbol, last=price)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    return sum(latencies), latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+def run(args):
+    if args.record:
+        ticks = recorded_ticks(args.record)
+    else:
+        ticks = list(synthetic_ticks(args.symbols, args.ticks, args.volatility, args.seed))
+    first_prices = {}
+    for exchange, symbol, price in ticks:
+        first_prices.setdefault((exchange, symbol), price)
+    triggers = make_triggers(args.triggers, first_prices, args.spread, args.seed)
+
+    def new_engine():
+        engine = TriggerEngine(MarketDataService({}, TickerStore()), session_factory=None)
+        for trigger in triggers:
+            engine.add(trigger)
+        return engine
+
+    def report(name, listener, ticks, fired):
+        total, p50, p99 = replay(listener, ticks)
+        print(f"{name:<30}{total:>12.3f}{p50 * 1e6:>12.2f}{p99 * 1e6:>12.2f}{fired():>12,}")
+
+    started = time.perf_counter()
+    engine = new_engine()
+    load = time.perf_counter() - started
+    print(f"{len(triggers):,} niveaux sur {len(first_prices)} symboles, {len(ticks):,} ticks "
+          f"(chargement du moteur : {load * 1000:.0f} ms)")
+    print(f"{'':<30}{'total (s)':>12}{'p50 (µs)':>12}{'p99 (µs)':>12}{'déclenchés':>12}")
+    report("tas par symbole", engine.on_tick, ticks, lambda: engine.stats["fired"])
+
+    prefix = ticks[:args.scan_ticks]
+    engine, scan = new_engine(), LinearScan()
+    for trigger in triggers:
+        scan.add(trigger)
+    report(f"tas, {len(prefix):,} ticks", engine.on_tick, prefix, lambda: engine.stats["fired"])
+    report(f"parcours linéaire, {len(prefix):,} ticks", scan.on_tick, prefix, lambda: scan.fired)
+
+    # Sans SL/TP appairés ici, les deux approches doivent déclencher les mêmes niveaux
+    if engine.stats["fired"] != scan.fired:
+        raise SystemExit(f"Écart : {engine.stats['fired']} déclenchés contre {scan.fired}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--triggers", type=int, default=100000)
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=200000)
+    parser.add_argument("--scan-ticks", type=int, default=5000)
+    parser.add_argument("--volatility", type=float, default=0.0005, help="écart-type relatif d'un tick")
+    parser.add_argument("--spread", type=float, default=0.05, help="distance relative maximale des niveaux")
+    parser.add_argument("--record", help="flux enregistré (ndjson) à rejouer")
+    parser.add_argument("--seed", type=int, default=42)
+    run(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
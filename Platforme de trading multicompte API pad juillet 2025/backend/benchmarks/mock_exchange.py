@@ -0,0 +1,220 @@
+"""Exchange local simulant les endpoints d'ordres Binance (v3) et Bybit (v5)
+
+Usage (depuis backend/) :
+    python -m benchmarks.mock_exchange --port 8900 --latency-ms 5 --secret mon-secret
+
+Pointer BINANCE_API_URL et BYBIT_API_URL sur http://127.0.0.1:8900 pour exécuter les
+ordres localement. Les ordres au marché sont remplis au prix --price : immédiatement sur Binance,
+après --fill-delay-ms sur Bybit (exécution asynchrone comme sur l'exchange réel). Avec
+--classic-spot, /v5/order/realtime ne liste plus que les ordres ouverts (compte spot classique).
+Avec --secret, les signatures sont vérifiées comme sur l'exchange réel.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import time
+from typing import Dict, Optional
+
+from aiohttp import web
+
+class MockExchange:
+    def __init__(self, latency_ms: float = 0.0, price: float = 42000.0, secret: Optional[str] = None,
+                 fill_delay_ms: float = 0.0, classic_spot: bool = False):
+        self.latency = latency_ms / 1000
+        self.price = price
+        self.secret = secret.encode() if secret else None
+        self.fill_delay = fill_delay_ms / 1000
+        self.classic_spot = classic_spot
+        self.order_ids = itertools.count(1)
+        self.orders: Dict[str, Dict] = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/api/v3/order", self.binance_place)
+        app.router.add_get("/api/v3/order", self.binance_get)
+        app.router.add_delete("/api/v3/order", self.binance_cancel)
+        app.router.add_post("/v5/order/create", self.bybit_place)
+        app.router.add_get("/v5/order/realtime", self.bybit_get)
+        app.router.add_get("/v5/order/history", self.bybit_history)
+        app.router.add_get("/v5/execution/list", self.bybit_executions)
+        app.router.add_post("/v5/order/cancel", self.bybit_cancel)
+        return app
+
+    def _valid(self, payload: str, signature: str) -> bool:
+        if self.secret is None:
+            return True
+        expected = hmac.new(self.secret, payload.encode(), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature or "")
+
+    def _fill(self, symbol: str, side: str, quantity: str, client_order_id: str, delay: float = 0.0) -> Dict:
+        order = {
+            "id": str(next(self.order_ids)), "symbol": symbol, "side": side.upper(),
+            "quantity": quantity, "client_order_id": client_order_id,
+            "status": "FILLED" if not delay else "NEW", "fills_at": time.monotonic() + delay
+        }
+        self.orders[order["id"]] = order
+        return order
+
+    def _order(self, order_id: Optional[str] = None, client_order_id: Optional[str] = None) -> Optional[Dict]:
+        """Ordre par identifiant exchange ou client ; un ordre au marché en attente est rempli à échéance"""
+        if order_id is not None:
+            order = self.orders.get(order_id)
+        else:
+            order = next((order for order in self.orders.values()
+                          if client_order_id and order["client_order_id"] == client_order_id), None)
+        if order is not None and order["status"] == "NEW" and time.monotonic() >= order["fills_at"]:
+            order["status"] = "FILLED"
+        return order
+
+    # Binance : signature HMAC de la query string, transmise en dernier paramètre
+    async def _binance_order(self, request: web.Request):
+        await asyncio.sleep(self.latency)
+        query, _, signature = request.query_string.rpartition("&signature=")
+        if not self._valid(query, signature):
+            return None, web.json_response({"code": -1022, "msg": "Signature for this request is not valid."}, status=401)
+        return request.query, None
+
+    def _binance_payload(self, order: Dict) -> Dict:
+        filled = order["quantity"] if order["status"] == "FILLED" else "0"
+        return {
+            "symbol": order["symbol"], "orderId": int(order["id"]), "clientOrderId": order["client_order_id"],
+            "side": order["side"], "status": order["status"], "origQty": order["quantity"],
+            "executedQty": filled, "cummulativeQuoteQty": str(float(filled) * self.price),
+            "fills": [{"price": str(self.price), "qty": filled, "commission": "0", "commissionAsset": "BNB"}]
+            if float(filled) else []
+        }
+
+    async def binance_place(self, request: web.Request) -> web.Response:
+        params, error = await self._binance_order(request)
+        if error:
+            return error
+        order = self._fill(params["symbol"], params["side"], params["quantity"], params.get("newClientOrderId"))
+        return web.json_response(self._binance_payload(order))
+
+    async def binance_get(self, request: web.Request) -> web.Response:
+        params, error = await self._binance_order(request)
+        if error:
+            return error
+        order = self._order(params.get("orderId"), params.get("origClientOrderId"))
+        if order is None:
+            return web.json_response({"code": -2013, "msg": "Order does not exist."}, status=400)
+        return web.json_response(self._binance_payload(order))
+
+    async def binance_cancel(self, request: web.Request) -> web.Response:
+        params, error = await self._binance_order(request)
+        if error:
+            return error
+        order = self.orders.get(params["orderId"])
+        if order is None or order["status"] == "FILLED":
+            return web.json_response({"code": -2011, "msg": "Unknown order sent."}, status=400)
+        order["status"] = "CANCELED"
+        return web.json_response(self._binance_payload(order))
+
+    # Bybit : signature HMAC de timestamp + clé + recv_window + payload, dans les en-têtes
+    async def _bybit_request(self, request: web.Request, payload: str) -> Optional[web.Response]:
+        await asyncio.sleep(self.latency)
+        headers = request.headers
+        message = f"{headers.get('X-BAPI-TIMESTAMP')}{headers.get('X-BAPI-API-KEY')}{headers.get('X-BAPI-RECV-WINDOW')}{payload}"
+        if not self._valid(message, headers.get("X-BAPI-SIGN")):
+            return web.json_response({"retCode": 10004, "retMsg": "error sign!", "result": {}})
+        return None
+
+    def _bybit_payload(self, order: Dict) -> Dict:
+        filled = order["quantity"] if order["status"] == "FILLED" else "0"
+        statuses = {"FILLED": "Filled", "CANCELED": "Cancelled", "NEW": "New"}
+        return {
+            "orderId": order["id"], "orderLinkId": order["client_order_id"], "symbol": order["symbol"],
+            "side": order["side"].capitalize(), "orderStatus": statuses[order["status"]], "qty": order["quantity"],
+            "cumExecQty": filled, "avgPrice": str(self.price) if float(filled) else "", "cumExecFee": "0"
+        }
+
+    async def bybit_place(self, request: web.Request) -> web.Response:
+        body = await request.text()
+        error = await self._bybit_request(request, body)
+        if error:
+            return error
+        params = json.loads(body)
+        if any(order["client_order_id"] == params.get("orderLinkId") for order in self.orders.values()):
+            return web.json_response({"retCode": 10001, "retMsg": "Duplicate clientOrderId", "result": {}})
+        quantity = params["qty"]
+        if params.get("category") == "spot" and params["orderType"] == "Market" and params["side"] == "Buy" \
+                and params.get("marketUnit") != "baseCoin":
+            # Achat spot au marché : qty exprimée en devise de cotation par défaut
+            quantity = str(float(quantity) / self.price)
+        order = self._fill(params["symbol"], params["side"], quantity, params.get("orderLinkId"), self.fill_delay)
+        return web.json_response({"retCode": 0, "retMsg": "OK", "result": {
+            "orderId": order["id"], "orderLinkId": order["client_order_id"]
+        }})
+
+    def _bybit_list(self, request: web.Request, open_only: bool) -> web.Response:
+        order = self._order(request.query.get("orderId"), request.query.get("orderLinkId"))
+        if order is not None and open_only and order["status"] != "NEW":
+            order = None
+        return web.json_response({"retCode": 0, "retMsg": "OK", "result": {
+            "list": [self._bybit_payload(order)] if order else []
+        }})
+
+    async def bybit_get(self, request: web.Request) -> web.Response:
+        error = await self._bybit_request(request, request.query_string)
+        if error:
+            return error
+        return self._bybit_list(request, open_only=self.classic_spot)
+
+    async def bybit_history(self, request: web.Request) -> web.Response:
+        error = await self._bybit_request(request, request.query_string)
+        if error:
+            return error
+        return self._bybit_list(request, open_only=False)
+
+    async def bybit_executions(self, request: web.Request) -> web.Response:
+        error = await self._bybit_request(request, request.query_string)
+        if error:
+            return error
+        order = self._order(request.query.get("orderId"), request.query.get("orderLinkId"))
+        executions = []
+        if order is not None and order["status"] == "FILLED":
+            executions.append({
+                "orderId": order["id"], "orderLinkId": order["client_order_id"], "symbol": order["symbol"],
+                "side": order["side"].capitalize(), "execQty": order["quantity"], "execPrice": str(self.price),
+                "execFee": "0"
+            })
+        return web.json_response({"retCode": 0, "retMsg": "OK", "result": {"list": executions}})
+
+    async def bybit_cancel(self, request: web.Request) -> web.Response:
+        body = await request.text()
+        error = await self._bybit_request(request, body)
+        if error:
+            return error
+        order = self.orders.get(json.loads(body).get("orderId"))
+        if order is None or order["status"] == "FILLED":
+            return web.json_response({"retCode": 110001, "retMsg": "Order does not exist.", "result": {}})
+        order["status"] = "CANCELED"
+        return web.json_response({"retCode": 0, "retMsg": "OK", "result": {"orderId": order["id"]}})
+
+async def start_mock_exchange(host: str = "127.0.0.1", port: int = 8900, **options) -> web.AppRunner:
+    """Démarrer le mock dans la boucle courante (benchmarks, tests)"""
+    runner = web.AppRunner(MockExchange(**options).app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--price", type=float, default=42000.0)
+    parser.add_argument("--secret")
+    parser.add_argument("--fill-delay-ms", type=float, default=0.0, help="délai d'exécution des ordres Bybit")
+    parser.add_argument("--classic-spot", action="store_true", help="ordres Bybit exécutés absents de /v5/order/realtime")
+    args = parser.parse_args()
+    web.run_app(
+        MockExchange(args.latency_ms, args.price, args.secret, args.fill_delay_ms, args.classic_spot).app(),
+        host=args.host, port=args.port, access_log=None
+    )
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
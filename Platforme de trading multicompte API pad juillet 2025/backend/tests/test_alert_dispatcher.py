@@ -0,0 +1,175 @@
+"""Dispatcher d'alertes contre un serveur HTTP local (webhook et API Telegram simulés)
+
+Usage (depuis backend/) :
+    python -m pytest tests/test_alert_dispatcher.py
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Callable, List
+
+from aiohttp import web
+
+from app.services.alert_dispatcher import AlertDispatcher
+
+@asynccontextmanager
+async def stub_server(responses: Callable[[int], web.Response], delay: float = 0.0):
+    """Serveur local enregistrant les requêtes reçues ; `responses(n)` répond à la n-ième"""
+    received: List[dict] = []
+
+    async def handle(request: web.Request) -> web.Response:
+        received.append({"path": request.path, "body": await request.json()})
+        if delay:
+            await asyncio.sleep(delay)
+        return responses(len(received))
+
+    app = web.Application()
+    app.router.add_post("/{tail:.*}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}", received
+    finally:
+        await runner.cleanup()
+
+def ok(_: int) -> web.Response:
+    return web.json_response({"ok": True})
+
+def dispatcher(monkeypatch, base_url: str, telegram: bool = True, webhook: bool = False, **kwargs) -> AlertDispatcher:
+    monkeypatch.delenv("ALERT_WEBHOOK_URL", raising=False)
+    monkeypatch.delenv("TELEGRAM_BOT_TOKEN", raising=False)
+    monkeypatch.delenv("TELEGRAM_CHAT_ID", raising=False)
+    if webhook:
+        monkeypatch.setenv("ALERT_WEBHOOK_URL", f"{base_url}/alerts")
+    if telegram:
+        monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "token")
+        monkeypatch.setenv("TELEGRAM_CHAT_ID", "42")
+        monkeypatch.setenv("TELEGRAM_API_URL", base_url)
+    # Flusher périodique neutralisé : les envois sont déclenchés par le test
+    kwargs.setdefault("digest_interval", 60.0)
+    kwargs.setdefault("telegram_interval", 0.0)
+    return AlertDispatcher(**kwargs)
+
+def test_trade_notifications_are_batched(monkeypatch):
+    async def run():
+        async with stub_server(ok) as (base_url, received):
+            alerts = dispatcher(monkeypatch, base_url, digest_max_items=3)
+            await alerts.start()
+            for index in range(5):
+                alerts.submit_trade_notification(f"trade {index}")
+            # Digest plein à 3 notifications : envoyé sans attendre le flusher
+            await asyncio.wait_for(alerts.outbox.join(), timeout=5)
+            assert len(received) == 1
+            await alerts.stop()
+            return received, alerts.get_stats()
+
+    received, stats = asyncio.run(run())
+    assert [request["path"] for request in received] == ["/bottoken/sendMessage"] * 2
+    first, second = (request["body"]["text"] for request in received)
+    assert first.startswith("📬 3 trades exécutés") and "trade 0" in first and "trade 2" in first
+    assert second.startswith("📬 2 trades exécutés") and "trade 4" in second
+    assert received[0]["body"]["chat_id"] == "42"
+    assert stats["digested"] == 5
+    assert stats["sent"] == 2
+    assert stats["pending_digest"] == 0
+
+def test_identical_alerts_are_coalesced(monkeypatch):
+    async def run():
+        async with stub_server(ok) as (base_url, received):
+            alerts = dispatcher(monkeypatch, base_url, telegram=False, webhook=True)
+            await alerts.start()
+            assert alerts.submit_alert("RISK", "limite atteinte") is True
+            assert alerts.submit_alert("RISK", "limite atteinte") is False
+            assert alerts.submit_alert("RISK", "limite atteinte") is False
+            await alerts.stop()
+            return received, alerts.get_stats()
+
+    received, stats = asyncio.run(run())
+    assert [request["path"] for request in received] == ["/alerts", "/alerts"]
+    assert received[0]["body"]["message"] == "limite atteinte"
+    assert received[1]["body"]["message"] == "limite atteinte\n(+2 alertes similaires)"
+    assert stats["coalesced"] == 2
+    assert stats["sent"] == 2
+
+def test_telegram_rate_limit_is_retried(monkeypatch):
+    def rate_limited_once(count: int) -> web.Response:
+        if count == 1:
+            return web.json_response({"ok": False, "parameters": {"retry_after": 0.2}}, status=429)
+        return ok(count)
+
+    async def run():
+        async with stub_server(rate_limited_once) as (base_url, received):
+            alerts = dispatcher(monkeypatch, base_url)
+            await alerts.start()
+            started = asyncio.get_running_loop().time()
+            alerts.submit_alert("ERROR", "connexion perdue")
+            await asyncio.wait_for(alerts.outbox.join(), timeout=5)
+            elapsed = asyncio.get_running_loop().time() - started
+            await alerts.stop()
+            return received, alerts.get_stats(), elapsed
+
+    received, stats, elapsed = asyncio.run(run())
+    assert len(received) == 2
+    assert received[0]["body"] == received[1]["body"]
+    # Nouvel essai après le délai retry_after indiqué par Telegram
+    assert elapsed >= 0.2
+    assert stats["sent"] == 1
+    assert stats["failed"] == 0
+
+def test_persistent_rate_limit_fails_after_attempts(monkeypatch):
+    def rate_limited(_: int) -> web.Response:
+        return web.json_response({"ok": False, "parameters": {"retry_after": 0}}, status=429)
+
+    async def run():
+        async with stub_server(rate_limited) as (base_url, received):
+            alerts = dispatcher(monkeypatch, base_url)
+            await alerts.start()
+            alerts.submit_alert("ERROR", "connexion perdue")
+            await alerts.stop()
+            return received, alerts.get_stats()
+
+    received, stats = asyncio.run(run())
+    assert len(received) == 3
+    assert stats["sent"] == 0
+    assert stats["failed"] == 1
+
+def test_stop_drains_queue(monkeypatch):
+    async def run():
+        async with stub_server(ok, delay=0.05) as (base_url, received):
+            alerts = dispatcher(monkeypatch, base_url, telegram=False, webhook=True)
+            await alerts.start()
+            for index in range(5):
+                alerts.submit_alert("ERROR", f"erreur {index}")
+            alerts.submit_alert("ERROR", "erreur 0")
+            await alerts.stop(drain_timeout=5)
+            return received, alerts
+
+    received, alerts = asyncio.run(run())
+    # Toutes les alertes en file, puis le rappel de l'alerte regroupée, envoyés avant la fermeture
+    assert [request["body"]["message"] for request in received] == [
+        "erreur 0", "erreur 1", "erreur 2", "erreur 3", "erreur 4", "erreur 0\n(+1 alertes similaires)"
+    ]
+    assert alerts.get_stats()["sent"] == 6
+    assert alerts.outbox.qsize() == 0
+    assert alerts.tasks == []
+    assert alerts.session is None
+
+def test_stop_gives_up_after_drain_timeout(monkeypatch):
+    async def run():
+        async with stub_server(ok, delay=1.0) as (base_url, received):
+            alerts = dispatcher(monkeypatch, base_url, telegram=False, webhook=True)
+            await alerts.start()
+            for index in range(5):
+                alerts.submit_alert("ERROR", f"erreur {index}")
+            started = asyncio.get_running_loop().time()
+            await alerts.stop(drain_timeout=0.2)
+            return received, alerts, asyncio.get_running_loop().time() - started
+
+    received, alerts, elapsed = asyncio.run(run())
+    assert elapsed < 1.0
+    assert len(received) == 1
+    assert alerts.outbox.qsize() == 4
+    assert alerts.tasks == []
+    assert alerts.session is None
\ No newline at end of file
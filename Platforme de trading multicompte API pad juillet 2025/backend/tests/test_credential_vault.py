@@ -0,0 +1,113 @@
+"""Coffre des clés API : préchargement, lecture à la demande et rafraîchissement avant expiration
+
+Usage (depuis backend/) :
+    python -m pytest tests/test_credential_vault.py
+
+Base SQLite (aiosqlite) dans un répertoire temporaire.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models import APIKey, StrategySubscription, User
+from app.services.credential_vault import CredentialVault
+from app.utils import crypto
+from app.utils.crypto import encrypt_api_key
+
+@pytest.fixture(autouse=True)
+def aes_key(monkeypatch):
+    # Clé AES-256 de test : la valeur par défaut de API_AES_SECRET ne fait que 23 octets
+    monkeypatch.setattr(crypto, "SECRET_KEY", b"0" * 32)
+    crypto._aes.cache_clear()
+    yield
+    crypto._aes.cache_clear()
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'vault.db'}")
+
+    async def create():
+        async with engine.begin() as connection:
+            tables = [User.__table__, APIKey.__table__, StrategySubscription.__table__]
+            await connection.run_sync(APIKey.metadata.create_all, tables=tables)
+
+    asyncio.run(create())
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+async def insert_keys(session_factory):
+    """Clé 1 abonnée à une stratégie active, clé 2 à une stratégie désactivée"""
+    async with session_factory() as db:
+        for api_key_id, user_id, active in ((1, 10, True), (2, 20, False)):
+            db.add(APIKey(id=api_key_id, exchange="binance", user_id=user_id,
+                          encrypted_key=encrypt_api_key(f"key-{api_key_id}"),
+                          encrypted_secret=encrypt_api_key(f"secret-{api_key_id}")))
+            db.add(StrategySubscription(strategy="trend", is_active=active, user_id=user_id, api_key_id=api_key_id))
+        await db.commit()
+
+async def rotate_secret(session_factory, api_key_id: int, secret: str):
+    async with session_factory() as db:
+        await db.execute(update(APIKey).where(APIKey.id == api_key_id).values(encrypted_secret=encrypt_api_key(secret)))
+        await db.commit()
+
+def test_warm_up_loads_active_keys(session_factory):
+    vault = CredentialVault(session_factory=session_factory)
+
+    async def run():
+        await insert_keys(session_factory)
+        return await vault.warm_up()
+
+    assert asyncio.run(run()) == 1
+    creds = vault.get_cached(1)
+    assert (creds.key, creds.secret, creds.secret_bytes) == ("key-1", "secret-1", b"secret-1")
+    assert vault.get_cached(2) is None
+
+def test_get_loads_missing_key(session_factory):
+    vault = CredentialVault(session_factory=session_factory)
+
+    async def run():
+        await insert_keys(session_factory)
+        return await vault.get(2), await vault.get(3)
+
+    creds, missing = asyncio.run(run())
+    assert creds.user_id == 20 and creds.secret == "secret-2"
+    assert missing is None
+    assert vault.invalidate_user(20) == 1
+    assert vault.get_cached(2) is None
+
+def test_refresh_reloads_keys_close_to_expiry(session_factory):
+    vault = CredentialVault(session_factory=session_factory, ttl=1.0)
+
+    async def run():
+        await insert_keys(session_factory)
+        await vault.warm_up([1, 2])
+        # Moins de la moitié du TTL écoulée : rien à recharger
+        early = await vault.refresh()
+        await asyncio.sleep(0.6)
+        await rotate_secret(session_factory, 1, "rotated")
+        return early, await vault.refresh()
+
+    early, refreshed = asyncio.run(run())
+    assert early == 0
+    assert refreshed == 2
+    assert vault.get_cached(1).secret == "rotated"
+    assert vault.get_stats()["refreshed"] == 2
+
+def test_background_refresh_keeps_keys_past_ttl(session_factory):
+    vault = CredentialVault(session_factory=session_factory, ttl=0.4)
+
+    async def run():
+        await insert_keys(session_factory)
+        await vault.start(interval=0.05)
+        try:
+            await asyncio.sleep(1.0)
+            return vault.get_cached(1)
+        finally:
+            await vault.stop()
+
+    creds = asyncio.run(run())
+    assert creds is not None and creds.key == "key-1"
+    assert vault.task is None
+    assert vault.get_stats()["misses"] == 0
\ No newline at end of file
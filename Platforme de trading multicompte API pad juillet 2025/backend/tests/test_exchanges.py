@@ -0,0 +1,171 @@
+"""Connecteurs Binance et Bybit contre le mock exchange (benchmarks/mock_exchange.py)
+
+Usage (depuis backend/) :
+    python -m pytest tests/test_exchanges.py
+
+Le mock vérifie les signatures ; les ordres Bybit y sont exécutés avec un délai, comme sur l'exchange réel.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+
+from app.services.credential_vault import Credentials
+from app.services.exchanges import BinanceClient, BybitClient, ExchangeError
+from benchmarks.mock_exchange import MockExchange
+
+SECRET = "test-secret"
+PRICE = 42000.0
+
+def credentials(exchange: str) -> Credentials:
+    return Credentials(1, 1, exchange, bytearray(b"test-key"), bytearray(SECRET.encode()))
+
+@asynccontextmanager
+async def mock_exchange(mock: MockExchange):
+    runner = web.AppRunner(mock.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        await runner.cleanup()
+
+def run_with(mock: MockExchange, client_class, scenario, **options):
+    async def run():
+        async with mock_exchange(mock) as url:
+            client = client_class(url, **options)
+            try:
+                return await scenario(client, credentials(client.name))
+            finally:
+                await client.close()
+
+    return asyncio.run(run())
+
+def test_binance_market_order_is_filled():
+    async def scenario(client, creds):
+        return await client.place_order(creds, "BTCUSDT", "BUY", 0.01, client_order_id="order-1")
+
+    fill = run_with(MockExchange(price=PRICE, secret=SECRET), BinanceClient, scenario)
+    assert fill.status == "filled"
+    assert fill.filled_quantity == 0.01
+    assert fill.avg_price == pytest.approx(PRICE)
+    assert fill.client_order_id == "order-1"
+
+def test_binance_find_order_by_client_id():
+    async def scenario(client, creds):
+        placed = await client.place_order(creds, "BTCUSDT", "SELL", 0.02, client_order_id="order-2")
+        return placed, await client.find_order(creds, "BTCUSDT", "order-2"), await client.find_order(creds, "BTCUSDT", "other")
+
+    placed, found, missing = run_with(MockExchange(price=PRICE, secret=SECRET), BinanceClient, scenario)
+    assert found.order_id == placed.order_id
+    assert found.filled_quantity == 0.02
+    assert missing is None
+
+def test_binance_errors_are_marked_rejected():
+    async def scenario(client, creds):
+        with pytest.raises(ExchangeError) as error:
+            await client.get_order(creds, "BTCUSDT", "999")
+        return error.value
+
+    error = run_with(MockExchange(secret=SECRET), BinanceClient, scenario)
+    assert error.status == 400
+    assert error.code == "-2013"
+    assert error.rejected
+
+def test_invalid_signature_is_rejected():
+    async def scenario(client, creds):
+        with pytest.raises(ExchangeError) as error:
+            await client.place_order(creds, "BTCUSDT", "BUY", 0.01)
+        return error.value
+
+    error = run_with(MockExchange(secret="autre-secret"), BinanceClient, scenario)
+    assert error.status == 401
+    assert error.rejected
+
+def test_unreachable_exchange_is_ambiguous():
+    async def run():
+        client = BinanceClient("http://127.0.0.1:9", timeout=1)
+        try:
+            with pytest.raises(ExchangeError) as error:
+                await client.place_order(credentials("binance"), "BTCUSDT", "BUY", 0.01)
+        finally:
+            await client.close()
+        return error.value
+
+    assert not asyncio.run(run()).rejected
+
+def test_bybit_waits_for_asynchronous_fill():
+    async def scenario(client, creds):
+        return await client.place_order(creds, "BTCUSDT", "SELL", 0.01)
+
+    fill = run_with(MockExchange(price=PRICE, secret=SECRET, fill_delay_ms=200), BybitClient, scenario,
+                    poll_interval=0.02)
+    assert fill.status == "filled"
+    assert fill.filled_quantity == 0.01
+    assert fill.avg_price == pytest.approx(PRICE)
+
+def test_bybit_spot_market_buy_quantity_is_in_base_coin():
+    async def scenario(client, creds):
+        return await client.place_order(creds, "BTCUSDT", "BUY", 0.5)
+
+    fill = run_with(MockExchange(price=PRICE, secret=SECRET), BybitClient, scenario)
+    assert fill.filled_quantity == 0.5
+
+def test_bybit_classic_spot_falls_back_to_order_history():
+    async def scenario(client, creds):
+        fill = await client.place_order(creds, "BTCUSDT", "BUY", 0.01, client_order_id="order-3")
+        return fill, await client.get_order(creds, "BTCUSDT", fill.order_id)
+
+    fill, read = run_with(MockExchange(price=PRICE, secret=SECRET, fill_delay_ms=100, classic_spot=True),
+                          BybitClient, scenario, poll_interval=0.02)
+    assert fill.status == read.status == "filled"
+    assert read.filled_quantity == 0.01
+
+class NoHistoryMockExchange(MockExchange):
+    """Ordres clos absents de l'historique : seules les exécutions les retrouvent"""
+
+    async def bybit_history(self, request: web.Request) -> web.Response:
+        return web.json_response({"retCode": 0, "retMsg": "OK", "result": {"list": []}})
+
+def test_bybit_falls_back_to_executions():
+    async def scenario(client, creds):
+        return await client.place_order(creds, "BTCUSDT", "SELL", 0.03)
+
+    fill = run_with(NoHistoryMockExchange(price=PRICE, fill_delay_ms=50, classic_spot=True), BybitClient, scenario,
+                    poll_interval=0.02)
+    assert fill.status == "filled"
+    assert fill.filled_quantity == pytest.approx(0.03)
+    assert fill.avg_price == pytest.approx(PRICE)
+
+def test_bybit_returns_last_state_after_fill_timeout():
+    async def scenario(client, creds):
+        return await client.place_order(creds, "BTCUSDT", "SELL", 0.01)
+
+    fill = run_with(MockExchange(price=PRICE, fill_delay_ms=5000), BybitClient, scenario,
+                    fill_timeout=0.2, poll_interval=0.05)
+    assert fill.status == "new"
+    assert fill.filled_quantity == 0
+
+def test_bybit_find_order_by_client_id():
+    async def scenario(client, creds):
+        placed = await client.place_order(creds, "BTCUSDT", "SELL", 0.01, client_order_id="order-4")
+        return placed, await client.find_order(creds, "BTCUSDT", "order-4"), await client.find_order(creds, "BTCUSDT", "other")
+
+    placed, found, missing = run_with(MockExchange(price=PRICE, secret=SECRET, classic_spot=True), BybitClient, scenario)
+    assert found.order_id == placed.order_id
+    assert found.status == "filled"
+    assert missing is None
+
+def test_bybit_duplicate_client_order_id_is_rejected():
+    async def scenario(client, creds):
+        await client.place_order(creds, "BTCUSDT", "SELL", 0.01, client_order_id="order-5")
+        with pytest.raises(ExchangeError) as error:
+            await client.place_order(creds, "BTCUSDT", "SELL", 0.01, client_order_id="order-5")
+        return error.value
+
+    error = run_with(MockExchange(secret=SECRET), BybitClient, scenario)
+    assert error.code == "10001"
+    assert error.rejected
\ No newline at end of file
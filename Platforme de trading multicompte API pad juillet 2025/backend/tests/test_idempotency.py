@@ -0,0 +1,229 @@
+"""Idempotence des signaux TradingView : store local, niveau Redis partagé et application par le service webhook
+
+Usage (depuis backend/) :
+    python -m pytest tests/test_idempotency.py
+
+Redis est simulé en mémoire (SET NX / GET / DELETE) ; l'exécution des signaux est simulée.
+"""
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.services.idempotency import PENDING, IdempotencyStore, SignalInProgress
+from app.services.monitoring import MonitoringService
+from app.services.tradingview_webhook import TradingViewWebhookService
+
+class Handler:
+    """Compte les exécutions ; `delay` simule un ordre en cours, `error` un échec"""
+
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self) -> Dict:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {"trade_id": self.calls}
+
+class FakeRedis:
+    """Sous-ensemble de redis.asyncio utilisé par le store, partageable entre plusieurs stores"""
+
+    def __init__(self):
+        self.values: Dict[str, tuple] = {}
+
+    async def set(self, key: str, value, nx: bool = False, px: int = None):
+        if nx and await self.get(key) is not None:
+            return None
+        if isinstance(value, str):
+            value = value.encode()
+        self.values[key] = (value, time.monotonic() + px / 1000 if px else None)
+        return True
+
+    async def get(self, key: str):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+    async def delete(self, key: str):
+        self.values.pop(key, None)
+
+def test_duplicate_key_replays_result():
+    store = IdempotencyStore()
+    handler = Handler()
+
+    async def run():
+        return [await store.run("signal-1", handler) for _ in range(3)]
+
+    results = asyncio.run(run())
+    assert results == [({"trade_id": 1}, False), ({"trade_id": 1}, True), ({"trade_id": 1}, True)]
+    assert handler.calls == 1
+    assert store.get_stats()["duplicates"] == 2
+
+def test_concurrent_duplicates_share_execution():
+    store = IdempotencyStore()
+    handler = Handler(delay=0.05)
+
+    async def run():
+        return await asyncio.gather(*(store.run("signal-1", handler) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert handler.calls == 1
+    assert [replayed for _, replayed in results].count(False) == 1
+    assert store.duplicates_in_flight == 4
+    assert store.in_flight == {}
+
+def test_failed_handler_releases_key():
+    store = IdempotencyStore()
+    failing = Handler(error=RuntimeError("exchange indisponible"))
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await store.run("signal-1", failing)
+        # Renvoi après l'échec : exécuté à nouveau
+        return await store.run("signal-1", Handler())
+
+    assert asyncio.run(run()) == ({"trade_id": 1}, False)
+    assert store.processed == 1
+
+def test_missing_key_is_never_deduplicated():
+    store = IdempotencyStore()
+    handler = Handler()
+
+    async def run():
+        return [await store.run(None, handler) for _ in range(2)]
+
+    assert [replayed for _, replayed in asyncio.run(run())] == [False, False]
+    assert handler.calls == 2
+    assert store.missing_key == 2
+
+def test_key_expires_after_ttl():
+    store = IdempotencyStore(ttl=0.1)
+    handler = Handler()
+
+    async def run():
+        await store.run("signal-1", handler)
+        await asyncio.sleep(0.15)
+        return await store.run("signal-1", handler)
+
+    assert asyncio.run(run()) == ({"trade_id": 2}, False)
+
+def shared_stores(count: int = 2) -> List[IdempotencyStore]:
+    """Stores de plusieurs workers reliés au même Redis"""
+    redis = FakeRedis()
+    stores = [IdempotencyStore() for _ in range(count)]
+    for store in stores:
+        store.client = redis
+    return stores
+
+def test_remote_result_is_replayed_by_other_worker():
+    first, second = shared_stores()
+    handler = Handler()
+
+    async def run():
+        await first.run("signal-1", handler)
+        return await second.run("signal-1", handler)
+
+    assert asyncio.run(run()) == ({"trade_id": 1}, True)
+    assert handler.calls == 1
+    assert second.duplicates_remote == 1
+
+def test_remote_signal_in_progress_is_a_conflict():
+    first, second = shared_stores()
+
+    async def run():
+        running = asyncio.create_task(first.run("signal-1", Handler(delay=0.1)))
+        await asyncio.sleep(0.02)
+        with pytest.raises(SignalInProgress):
+            await second.run("signal-1", Handler())
+        return await running
+
+    assert asyncio.run(run()) == ({"trade_id": 1}, False)
+    assert second.conflicts == 1
+
+def test_remote_key_released_on_failure():
+    first, second = shared_stores()
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await first.run("signal-1", Handler(error=RuntimeError("timeout")))
+        assert await first.client.get(first.prefix + "signal-1") is None
+        return await second.run("signal-1", Handler())
+
+    assert asyncio.run(run()) == ({"trade_id": 1}, False)
+    assert PENDING not in (value for value, _ in second.client.values.values())
+
+class StubWebhookService(TradingViewWebhookService):
+    """Service webhook dont l'exécution des signaux est simulée"""
+
+    def __init__(self):
+        super().__init__(trading_executor=None, monitoring=MonitoringService(), idempotency=IdempotencyStore())
+        self.executed: List[Dict] = []
+
+    async def _process_signal(self, signal_data: Dict) -> Dict:
+        self.executed.append(signal_data)
+        return {"trade_id": len(self.executed)}
+
+def webhook_request(signal: Dict) -> Request:
+    body = json.dumps(signal).encode()
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request({"type": "http", "method": "POST", "path": "/webhook/tradingview", "headers": []}, receive)
+
+def webhook_service(monkeypatch, required: str = None) -> StubWebhookService:
+    monkeypatch.delenv("TRADINGVIEW_WEBHOOK_SECRET", raising=False)
+    monkeypatch.setenv("TRADINGVIEW_EXECUTION_MODE", "single")
+    if required is None:
+        monkeypatch.delenv("TRADINGVIEW_IDEMPOTENCY_REQUIRED", raising=False)
+    else:
+        monkeypatch.setenv("TRADINGVIEW_IDEMPOTENCY_REQUIRED", required)
+    return StubWebhookService()
+
+SIGNAL = {"symbol": "BTCUSDT", "side": "BUY", "strategy": "trend"}
+
+def test_timestamped_signal_resend_is_ignored(monkeypatch):
+    service = webhook_service(monkeypatch)
+    signal = {**SIGNAL, "time": "2025-07-01T09:00:00Z"}
+
+    async def run():
+        return [await service.process_webhook(webhook_request(signal)) for _ in range(2)]
+
+    first, resent = asyncio.run(run())
+    assert len(service.executed) == 1
+    assert "duplicate" not in first
+    assert resent["duplicate"] is True and resent["trade_id"] == 1
+
+def test_signal_without_key_is_executed_by_default(monkeypatch):
+    service = webhook_service(monkeypatch)
+
+    async def run():
+        return [await service.process_webhook(webhook_request(SIGNAL)) for _ in range(2)]
+
+    asyncio.run(run())
+    # Alertes existantes sans horodatage : toujours exécutées, sans dédoublonnage
+    assert len(service.executed) == 2
+
+def test_signal_without_key_is_rejected_when_required(monkeypatch):
+    service = webhook_service(monkeypatch, required="true")
+
+    async def run():
+        with pytest.raises(HTTPException) as error:
+            await service.process_webhook(webhook_request(SIGNAL))
+        await service.process_webhook(webhook_request({**SIGNAL, "idempotency_key": "alerte-1"}))
+        return error.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 422
+    assert len(service.executed) == 1
\ No newline at end of file
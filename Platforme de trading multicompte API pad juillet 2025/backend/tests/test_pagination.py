@@ -0,0 +1,96 @@
+"""Pagination par curseur (timestamp, id) des historiques
+
+Usage (depuis backend/) :
+    python -m pytest tests/test_pagination.py
+
+Base SQLite (aiosqlite) dans un répertoire temporaire.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models import Trade, User
+from app.utils.pagination import (DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor, keyset_paginate, page_limit,
+                                  split_page)
+
+START = datetime(2025, 7, 1, 9)
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'history.db'}")
+
+    async def create():
+        async with engine.begin() as connection:
+            await connection.run_sync(Trade.metadata.create_all, tables=[User.__table__, Trade.__table__])
+
+    asyncio.run(create())
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def insert():
+        # Trois trades par horodatage : le curseur doit départager les ex aequo par id
+        async with factory() as db:
+            db.add_all([
+                Trade(symbol="BTCUSDT", side="BUY", quantity=1, price=100, exchange="binance",
+                      user_id=1 if index % 5 else 2, timestamp=START + timedelta(minutes=index // 3))
+                for index in range(50)
+            ])
+            await db.commit()
+
+    asyncio.run(insert())
+    yield factory
+    asyncio.run(engine.dispose())
+
+async def fetch(session_factory, cursor=None, limit=None):
+    query = select(Trade.id, Trade.timestamp).where(Trade.user_id == 1)
+    async with session_factory() as db:
+        result = await db.execute(keyset_paginate(query, Trade.timestamp, Trade.id, cursor, page_limit(cursor, limit)))
+        return split_page(result.all(), page_limit(cursor, limit), "timestamp")
+
+def test_pages_cover_history_once_in_order(session_factory):
+    async def run():
+        pages, cursor = [], None
+        while True:
+            page, cursor = await fetch(session_factory, cursor, limit=7)
+            pages.append(page)
+            if cursor is None:
+                return pages, await fetch(session_factory)
+
+    pages, (complete, last_cursor) = asyncio.run(run())
+    ids = [row.id for page in pages for row in page]
+    assert [len(page) for page in pages] == [7, 7, 7, 7, 7, 5]
+    assert ids == [row.id for row in complete]
+    assert len(set(ids)) == 40
+    assert [(row.timestamp, row.id) for row in complete] == sorted(
+        ((row.timestamp, row.id) for row in complete), reverse=True
+    )
+    assert last_cursor is None
+
+def test_without_cursor_or_limit_returns_full_list(session_factory):
+    rows, cursor = asyncio.run(fetch(session_factory))
+    assert len(rows) == 40
+    assert cursor is None
+
+def test_exact_last_page_has_no_cursor(session_factory):
+    rows, cursor = asyncio.run(fetch(session_factory, limit=40))
+    assert len(rows) == 40
+    assert cursor is None
+
+def test_cursor_without_limit_uses_default_page_size():
+    cursor = encode_cursor(START, 10)
+    assert page_limit(cursor, None) == DEFAULT_PAGE_SIZE
+    assert page_limit(None, None) is None
+    assert page_limit(None, 5) == 5
+
+def test_cursor_round_trip():
+    timestamp = datetime(2025, 7, 1, 9, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+@pytest.mark.parametrize("cursor", ["pas-un-curseur", encode_cursor(START, 1)[:-4] + "!!!!"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
\ No newline at end of file
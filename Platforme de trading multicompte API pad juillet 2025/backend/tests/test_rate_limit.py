@@ -0,0 +1,121 @@
+"""Limiteur de débit (IP, utilisateur, route) et son application par SecurityMiddleware
+
+Usage (depuis backend/) :
+    python -m pytest tests/test_rate_limit.py
+"""
+import asyncio
+import secrets
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.middleware.rate_limit import InMemoryRateLimitBackend, RateLimiter, RateLimitRule
+from app.middleware.security import SecurityMiddleware
+from app.services.principal_cache import principal_cache
+
+def limiter(ip: str = "100/60", user: str = "300/60", routes=None) -> RateLimiter:
+    return RateLimiter(
+        InMemoryRateLimitBackend(),
+        RateLimitRule.parse(ip),
+        RateLimitRule.parse(user),
+        {prefix: RateLimitRule.parse(rule) for prefix, rule in (routes or {}).items()}
+    )
+
+async def allowed(rate_limiter: RateLimiter, count: int, ip: str = "1.2.3.4", path: str = "/", user_key=None) -> int:
+    results = [await rate_limiter.check(ip, path, user_key) for _ in range(count)]
+    return sum(result is None for result in results)
+
+def test_token_bucket_refills():
+    backend = InMemoryRateLimitBackend()
+    rule = RateLimitRule(limit=2, window=0.2)
+
+    async def run():
+        first = [await backend.hit("ip:a", rule) for _ in range(3)]
+        await asyncio.sleep(0.12)
+        return first, await backend.hit("ip:a", rule)
+
+    first, refilled = asyncio.run(run())
+    assert [ok for ok, _ in first] == [True, True, False]
+    # Un jeton revient toutes les 0,1 s : Retry-After proche de ce délai
+    assert 0 < first[2][1] <= 0.1
+    assert refilled[0] is True
+
+def test_ip_limit_is_per_client():
+    rate_limiter = limiter(ip="5/60")
+
+    async def run():
+        return await allowed(rate_limiter, 10, ip="1.1.1.1"), await allowed(rate_limiter, 10, ip="2.2.2.2")
+
+    assert asyncio.run(run()) == (5, 5)
+
+def test_route_rule_adds_to_ip_limit():
+    rate_limiter = limiter(ip="20/60", routes={"/users/login": "3/60"})
+
+    async def run():
+        login = await allowed(rate_limiter, 10, path="/users/login")
+        # Les tentatives de connexion ont aussi consommé la limite par IP
+        other = await allowed(rate_limiter, 30, path="/trading/history")
+        return login, other
+
+    assert asyncio.run(run()) == (3, 17)
+
+def test_route_rule_cannot_exceed_ip_limit():
+    rate_limiter = limiter(ip="5/60", routes={"/webhook/": "600/60"})
+    assert asyncio.run(allowed(rate_limiter, 20, path="/webhook/tradingview")) == 5
+
+def test_user_limit_shared_across_ips():
+    rate_limiter = limiter(ip="100/60", user="4/60")
+
+    async def run():
+        first = await allowed(rate_limiter, 3, ip="1.1.1.1", user_key="user:7")
+        second = await allowed(rate_limiter, 3, ip="2.2.2.2", user_key="user:7")
+        return first, second
+
+    assert asyncio.run(run()) == (3, 1)
+
+def security_app(rate_limiter: RateLimiter) -> FastAPI:
+    app = FastAPI()
+    app.middleware("http")(SecurityMiddleware(rate_limiter=rate_limiter))
+
+    @app.post("/users/login")
+    async def login():
+        return {"ok": True}
+
+    @app.get("/trading/history")
+    async def history():
+        return []
+
+    return app
+
+async def statuses(app: FastAPI, requests: int, path: str, method: str = "POST", token=None) -> list:
+    codes = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for _ in range(requests):
+            headers = {"authorization": f"Bearer {token() if callable(token) else token}"} if token else {}
+            response = await client.request(method, path, headers=headers)
+            codes.append(response.status_code)
+    return codes
+
+def test_random_bearer_tokens_do_not_bypass_login_limit():
+    app = security_app(limiter(ip="100/60", routes={"/users/login": "10/60"}))
+    codes = asyncio.run(statuses(app, 50, "/users/login", token=lambda: secrets.token_hex(16)))
+    assert codes.count(200) == 10
+    assert codes.count(429) == 40
+
+def test_random_bearer_tokens_do_not_bypass_ip_limit():
+    app = security_app(limiter(ip="20/60"))
+    codes = asyncio.run(statuses(app, 50, "/trading/history", method="GET", token=lambda: secrets.token_hex(16)))
+    assert codes.count(200) == 20
+
+def test_verified_token_gets_user_bucket():
+    token = secrets.token_hex(16)
+    principal_cache.set_token(token, 42, time.time() + 60)
+    rate_limiter = limiter(ip="100/60", user="5/60")
+    app = security_app(rate_limiter)
+    try:
+        codes = asyncio.run(statuses(app, 10, "/trading/history", method="GET", token=token))
+    finally:
+        principal_cache.clear()
+    assert codes.count(200) == 5
+    assert "user:42" in rate_limiter.backend.buckets
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""Segment de mémoire partagée du mode multi-workers : limiteur de débit et IP bloquées
+
+Usage (depuis backend/) :
+    python -m pytest tests/test_shared_state.py
+
+Chaque worker est simulé par une ouverture distincte du segment ; le test multi-processus
+lance de vrais processus (fork). Linux et macOS uniquement (verrous fcntl).
+"""
+import asyncio
+import multiprocessing
+import sys
+
+import pytest
+
+from app.middleware.rate_limit import RateLimitRule
+from app.services.shared_state import GROUP_SIZE, SharedState, create_segment
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="fcntl requis")
+
+@pytest.fixture
+def segment(tmp_path):
+    """Créer un segment ; retourne une fonction qui l'ouvre comme le ferait un worker"""
+    path = str(tmp_path / "shared_state")
+
+    def create(**sizes):
+        create_segment(path, **sizes)
+        return lambda: SharedState.open(path)
+
+    return create
+
+async def allowed(backend, key: str, rule: RateLimitRule, count: int) -> int:
+    return sum([(await backend.hit(key, rule))[0] for _ in range(count)])
+
+def test_rate_limit_is_shared_between_workers(segment):
+    open_worker = segment(rate_slots=64)
+    first, second = open_worker().rate_limit_backend(), open_worker().rate_limit_backend()
+    rule = RateLimitRule(limit=10, window=60)
+
+    async def run():
+        return (await allowed(first, "ip:1.2.3.4", rule, 6), await allowed(second, "ip:1.2.3.4", rule, 6),
+                await allowed(second, "ip:5.6.7.8", rule, 3))
+
+    assert asyncio.run(run()) == (6, 4, 3)
+
+def test_shared_bucket_refills(segment):
+    backend = segment(rate_slots=64)().rate_limit_backend()
+    rule = RateLimitRule(limit=2, window=0.2)
+
+    async def run():
+        first = [await backend.hit("ip:a", rule) for _ in range(3)]
+        await asyncio.sleep(0.12)
+        return first, await backend.hit("ip:a", rule)
+
+    first, refilled = asyncio.run(run())
+    assert [ok for ok, _ in first] == [True, True, False]
+    assert 0 < first[2][1] <= 0.1
+    assert refilled[0] is True
+
+def test_full_group_reuses_least_recently_used_slot(segment):
+    # Un seul groupe : la clé suivante reprend l'emplacement le plus ancien
+    backend = segment(rate_slots=GROUP_SIZE)().rate_limit_backend()
+    rule = RateLimitRule(limit=1, window=60)
+
+    async def run():
+        first = await allowed(backend, "ip:0", rule, 2)
+        for index in range(1, GROUP_SIZE + 1):
+            await backend.hit(f"ip:{index}", rule)
+        # ip:0 a été évincée : seau remis à plein
+        return first, await allowed(backend, "ip:0", rule, 2)
+
+    assert asyncio.run(run()) == (1, 1)
+    assert backend.evictions == 2
+
+def hammer(path: str, requests: int, results):
+    backend = SharedState.open(path).rate_limit_backend()
+    rule = RateLimitRule(limit=50, window=3600)
+    results.put(asyncio.run(allowed(backend, "route:/users/login:1.2.3.4", rule, requests)))
+
+@pytest.mark.skipif(sys.platform != "linux", reason="fork requis")
+def test_rate_limit_holds_across_processes(tmp_path):
+    path = str(tmp_path / "shared_state")
+    create_segment(path, rate_slots=64)
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [context.Process(target=hammer, args=(path, 40, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+    assert [worker.exitcode for worker in workers] == [0] * 4
+    # 160 requêtes concurrentes pour 50 jetons : aucun jeton consommé deux fois
+    assert sum(results.get(timeout=5) for _ in workers) == 50
+
+def test_blocked_ip_is_visible_to_other_workers(segment):
+    open_worker = segment(blocked_slots=64)
+    first, second = open_worker(), open_worker()
+    first.blocked_ips.add("1.2.3.4", ttl=60)
+    assert "1.2.3.4" in second.blocked_ips
+    assert "5.6.7.8" not in second.blocked_ips
+    assert len(second.blocked_ips) == 1
+    assert second.get_stats()["blocked_ips"] == 1
+
+def test_blocked_ip_expires(segment):
+    state = segment(blocked_slots=64)()
+
+    async def run():
+        state.blocked_ips.add("1.2.3.4", ttl=0.05)
+        state.blocked_ips.add("5.6.7.8", ttl=60)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert "1.2.3.4" not in state.blocked_ips
+    assert "5.6.7.8" in state.blocked_ips
+    assert len(state.blocked_ips) == 1
+
+def test_blocking_again_extends_the_same_slot(segment):
+    state = segment(blocked_slots=GROUP_SIZE)()
+    for _ in range(GROUP_SIZE + 1):
+        state.blocked_ips.add("1.2.3.4", ttl=60)
+    assert len(state.blocked_ips) == 1
+    assert state.blocked_ips.overflow == {}
+
+def test_full_block_list_falls_back_to_local_block(segment):
+    open_worker = segment(blocked_slots=GROUP_SIZE)
+    first, second = open_worker(), open_worker()
+    ips = [f"10.0.0.{index}" for index in range(GROUP_SIZE + 1)]
+    for ip in ips:
+        first.blocked_ips.add(ip, ttl=60)
+    # La dernière IP ne tient plus dans le segment : bloquée dans ce seul worker
+    assert all(ip in first.blocked_ips for ip in ips)
+    assert list(first.blocked_ips.overflow) == [ips[-1]]
+    assert ips[-1] not in second.blocked_ips
+    assert len(second.blocked_ips) == GROUP_SIZE
\ No newline at end of file
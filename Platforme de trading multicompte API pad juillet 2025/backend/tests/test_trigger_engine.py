@@ -0,0 +1,269 @@
+"""Moteur SL/TP : rechargement au redémarrage, courses à la réservation, clôtures en échec
+
+Usage (depuis backend/) :
+    python -m pytest tests/test_trigger_engine.py
+
+Base SQLite (aiosqlite) dans un répertoire temporaire ; l'exécuteur d'ordres est simulé.
+"""
+import asyncio
+from typing import Dict, List
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.models import PriceTrigger
+from app.services.alert_dispatcher import AlertDispatcher
+from app.services.exchanges import ExchangeError, OrderResult
+from app.services.market_data import Ticker, TickerStore
+from app.services.trading_executor import TradingExecutor
+from app.services.trigger_engine import STOP_LOSS, TAKE_PROFIT, TriggerEngine
+
+class FakeMarketData:
+    def __init__(self):
+        self.store = TickerStore()
+
+    async def ensure_subscribed(self, exchange: str, symbol: str):
+        pass
+
+class FakeExecutor:
+    """Répond à chaque appel de `execute_trade` avec le résultat suivant (dict) ou lève l'exception"""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls: List[Dict] = []
+
+    async def execute_trade(self, **order) -> Dict:
+        self.calls.append(order)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+FILLED = {"order_id": "1", "status": "filled", "trade_id": 900}
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'triggers.db'}")
+
+    async def create():
+        async with engine.begin() as connection:
+            await connection.run_sync(PriceTrigger.metadata.create_all, tables=[PriceTrigger.__table__])
+
+    asyncio.run(create())
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+def engine_for(session_factory, market_data=None) -> TriggerEngine:
+    return TriggerEngine(market_data=market_data or FakeMarketData(), session_factory=session_factory,
+                         concurrency=1, retries=2, retry_delay=0.01, dispatcher=AlertDispatcher())
+
+async def insert_pair(session_factory, trade_id: int = 1) -> Dict[str, int]:
+    """SL à 95 et TP à 110 d'un long de 0,5 BTC"""
+    rows = [
+        PriceTrigger(kind=kind, exchange="binance", symbol="BTCUSDT", side="SELL", quantity=0.5,
+                     trigger_price=price, status="pending", trade_id=trade_id, user_id=1, api_key_id=1)
+        for kind, price in ((STOP_LOSS, 95.0), (TAKE_PROFIT, 110.0))
+    ]
+    async with session_factory() as db:
+        db.add_all(rows)
+        await db.commit()
+    return {row.kind: row.id for row in rows}
+
+async def statuses(session_factory) -> Dict[int, str]:
+    async with session_factory() as db:
+        result = await db.execute(select(PriceTrigger.id, PriceTrigger.status))
+        return dict(result.all())
+
+def tick(engine: TriggerEngine, price: float):
+    ticker = Ticker("binance", "BTCUSDT")
+    ticker.last = price
+    engine.on_tick(ticker)
+
+async def fire(engine: TriggerEngine, executor, price: float):
+    await engine.start(executor)
+    tick(engine, price)
+    await asyncio.wait_for(engine.queue.join(), timeout=5)
+    await engine.stop()
+
+def test_pending_triggers_survive_restart(session_factory):
+    async def run():
+        ids = await insert_pair(session_factory)
+        async with session_factory() as db:
+            db.add(PriceTrigger(kind=STOP_LOSS, exchange="binance", symbol="BTCUSDT", side="SELL", quantity=1,
+                                trigger_price=90.0, status="canceled", trade_id=2, user_id=1, api_key_id=1))
+            await db.commit()
+
+        # Redémarrage : seuls les niveaux en attente sont rechargés, puis déclenchés par le flux de prix
+        engine = engine_for(session_factory)
+        executor = FakeExecutor(FILLED)
+        await fire(engine, executor, 94.0)
+        async with session_factory() as db:
+            closing = await db.scalar(select(PriceTrigger.closing_trade_id).where(PriceTrigger.id == ids[STOP_LOSS]))
+
+        restarted = engine_for(session_factory)
+        reloaded = await restarted.load()
+        return ids, engine, executor, await statuses(session_factory), closing, reloaded
+
+    ids, engine, executor, status, closing, reloaded = asyncio.run(run())
+    assert len(executor.calls) == 1
+    assert executor.calls[0]["side"] == "SELL" and executor.calls[0]["quantity"] == 0.5
+    assert status[ids[STOP_LOSS]] == "triggered"
+    assert status[ids[TAKE_PROFIT]] == "canceled"
+    assert closing == 900
+    assert engine.triggers == {}
+    assert reloaded == 0
+
+def test_claim_race_keeps_pending_sibling(session_factory):
+    async def run():
+        ids = await insert_pair(session_factory)
+        engine = engine_for(session_factory)
+        await engine.start(FakeExecutor())
+        # Un autre processus a réservé le SL entre le tick et le worker, sans toucher au TP
+        async with session_factory() as db:
+            await db.execute(update(PriceTrigger).where(PriceTrigger.id == ids[STOP_LOSS]).values(status="triggered"))
+            await db.commit()
+        tick(engine, 94.0)
+        await asyncio.wait_for(engine.queue.join(), timeout=5)
+        await engine.stop()
+        return ids, engine
+
+    ids, engine = asyncio.run(run())
+    assert set(engine.triggers) == {ids[TAKE_PROFIT]}
+    assert engine.by_trade == {1: {ids[TAKE_PROFIT]}}
+
+def test_claim_race_drops_canceled_sibling(session_factory):
+    async def run():
+        ids = await insert_pair(session_factory)
+        engine = engine_for(session_factory)
+        executor = FakeExecutor()
+        await engine.start(executor)
+        # Le processus gagnant a déjà annulé le TP
+        async with session_factory() as db:
+            await db.execute(update(PriceTrigger).where(PriceTrigger.id == ids[STOP_LOSS]).values(status="triggered"))
+            await db.execute(update(PriceTrigger).where(PriceTrigger.id == ids[TAKE_PROFIT]).values(status="canceled"))
+            await db.commit()
+        tick(engine, 94.0)
+        await asyncio.wait_for(engine.queue.join(), timeout=5)
+        await engine.stop()
+        return engine, executor
+
+    engine, executor = asyncio.run(run())
+    assert engine.triggers == {}
+    assert executor.calls == []
+
+def test_rejected_close_is_retried_with_same_client_order_id(session_factory):
+    rejected = ExchangeError("binance", "Too many requests", 429, "-1003", rejected=True)
+
+    async def run():
+        ids = await insert_pair(session_factory)
+        engine = engine_for(session_factory)
+        executor = FakeExecutor(rejected, rejected, FILLED)
+        await fire(engine, executor, 94.0)
+        return ids, engine, executor
+
+    ids, engine, executor = asyncio.run(run())
+    assert [call["client_order_id"] for call in executor.calls] == [f"trigger-{ids[STOP_LOSS]}"] * 3
+    assert engine.stats["retried"] == 2
+    assert engine.stats["executed"] == 1
+
+def test_failed_close_restores_sibling_across_restart(session_factory):
+    rejected = ExchangeError("binance", "Account has insufficient balance", 400, "-2010", rejected=True)
+
+    async def run():
+        ids = await insert_pair(session_factory)
+        engine = engine_for(session_factory)
+        await fire(engine, FakeExecutor(rejected, rejected, rejected), 94.0)
+        restarted = engine_for(session_factory)
+        await restarted.load()
+        return ids, engine, restarted, await statuses(session_factory)
+
+    ids, engine, restarted, status = asyncio.run(run())
+    assert status == {ids[STOP_LOSS]: "failed", ids[TAKE_PROFIT]: "pending"}
+    assert set(engine.triggers) == {ids[TAKE_PROFIT]}
+    assert set(restarted.triggers) == {ids[TAKE_PROFIT]}
+    assert engine.stats["failed"] == 1
+    assert engine.stats["restored"] == 1
+
+def test_unfilled_close_counts_as_failure(session_factory):
+    async def run():
+        ids = await insert_pair(session_factory)
+        engine = engine_for(session_factory)
+        await fire(engine, FakeExecutor({"order_id": "7", "status": "expired", "trade_id": None}), 94.0)
+        async with session_factory() as db:
+            error = await db.scalar(select(PriceTrigger.error).where(PriceTrigger.id == ids[STOP_LOSS]))
+        return ids, engine, await statuses(session_factory), error
+
+    ids, engine, status, error = asyncio.run(run())
+    assert status == {ids[STOP_LOSS]: "failed", ids[TAKE_PROFIT]: "pending"}
+    assert "expired" in error
+    assert set(engine.triggers) == {ids[TAKE_PROFIT]}
+    assert engine.stats["executed"] == 0
+
+def test_ambiguous_close_is_not_retried(session_factory):
+    timeout = ExchangeError("binance", "requête POST /api/v3/order échouée: timeout")
+
+    async def run():
+        ids = await insert_pair(session_factory)
+        engine = engine_for(session_factory)
+        executor = FakeExecutor(timeout)
+        await fire(engine, executor, 94.0)
+        return ids, engine, executor, await statuses(session_factory)
+
+    ids, engine, executor, status = asyncio.run(run())
+    assert len(executor.calls) == 1
+    # L'ordre a pu être exécuté : l'ordre opposé n'est pas réarmé
+    assert status == {ids[STOP_LOSS]: "failed", ids[TAKE_PROFIT]: "canceled"}
+    assert engine.triggers == {}
+    assert engine.stats["unknown"] == 1
+
+class FakeClient:
+    def __init__(self, error: ExchangeError, found):
+        self.error = error
+        self.found = found
+        self.placed: List[str] = []
+        self.searched: List[str] = []
+
+    async def place_order(self, creds, symbol, side, quantity, client_order_id=None):
+        self.placed.append(client_order_id)
+        raise self.error
+
+    async def find_order(self, creds, symbol, client_order_id):
+        self.searched.append(client_order_id)
+        return self.found
+
+class FakeRegistry:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, exchange):
+        return self.client
+
+class FakeCredentials:
+    exchange = "binance"
+
+def test_executor_looks_up_order_after_ambiguous_error():
+    fill = OrderResult("binance", "BTCUSDT", "SELL", "42", "trigger-1", "filled", 0.5, 0.5, 94.0)
+    client = FakeClient(ExchangeError("binance", "timeout"), fill)
+    executor = TradingExecutor(registry=FakeRegistry(client), market_data=FakeMarketData())
+
+    result = asyncio.run(executor.place_order(FakeCredentials(), "BTCUSDT", "SELL", 0.5, "trigger-1"))
+    assert result is fill
+    assert client.placed == client.searched == ["trigger-1"]
+
+def test_executor_marks_unknown_order_as_rejected():
+    client = FakeClient(ExchangeError("binance", "timeout"), None)
+    executor = TradingExecutor(registry=FakeRegistry(client), market_data=FakeMarketData())
+
+    with pytest.raises(ExchangeError) as error:
+        asyncio.run(executor.place_order(FakeCredentials(), "BTCUSDT", "SELL", 0.5, "trigger-1"))
+    assert error.value.rejected
+    assert client.searched == ["trigger-1"]
+
+def test_executor_does_not_look_up_rejected_order():
+    client = FakeClient(ExchangeError("binance", "Filter failure: LOT_SIZE", 400, "-1013", rejected=True), None)
+    executor = TradingExecutor(registry=FakeRegistry(client), market_data=FakeMarketData())
+
+    with pytest.raises(ExchangeError):
+        asyncio.run(executor.place_order(FakeCredentials(), "BTCUSDT", "SELL", 0.5))
+    assert client.searched == []
\ No newline at end of file
@@ -21,18 +21,85 @@ CREATE TABLE IF NOT EXISTS api_keys (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Table des trades
+-- Table des trades, partitionnée par mois sur timestamp
+-- (la clé primaire inclut la clé de partition ; aucune clé étrangère ne peut donc viser trades(id))
+-- Base existante (trades non partitionnée) : exécuter d'abord db/migrations/001_partition_trades.sql
 CREATE TABLE IF NOT EXISTS trades (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     symbol VARCHAR(50) NOT NULL,
     side VARCHAR(10) NOT NULL,
     quantity DECIMAL(20, 8) NOT NULL,
     price DECIMAL(20, 8) NOT NULL,
     pnl DECIMAL(20, 8),
     strategy VARCHAR(100),
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    exchange VARCHAR(100) NOT NULL,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- Filet de sécurité si la maintenance n'a pas créé la partition du mois
+-- (ses lignes sont déplacées dans la partition mensuelle lors de sa création)
+CREATE TABLE IF NOT EXISTS trades_default PARTITION OF trades DEFAULT;
+
+-- Création des partitions mensuelles (trades_AAAA_MM), du mois courant à months_ahead mois plus tard.
+-- Appelée au démarrage puis chaque jour par l'application. Les lignes du mois arrivées dans trades_default
+-- sont déplacées dans la nouvelle partition ; un mois en échec n'empêche pas la création des suivants.
+CREATE OR REPLACE FUNCTION create_trades_partitions(months_ahead INTEGER DEFAULT 3, months_back INTEGER DEFAULT 0)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    FOR i IN -months_back..months_ahead LOOP
+        month_start := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::DATE;
+        partition_name := 'trades_' || to_char(month_start, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM trades_default
+                    WHERE timestamp >= month_start AND timestamp < month_start + INTERVAL '1 month'
+                ) THEN
+                    -- Table créée à part, remplie depuis la partition par défaut, puis rattachée
+                    EXECUTE format('CREATE TABLE %I (LIKE trades INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+                    EXECUTE format(
+                        'WITH moved AS (DELETE FROM trades_default WHERE timestamp >= %L AND timestamp < %L RETURNING *) '
+                        'INSERT INTO %I SELECT * FROM moved',
+                        month_start, (month_start + INTERVAL '1 month')::DATE, partition_name
+                    );
+                    EXECUTE format(
+                        'ALTER TABLE trades ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                        partition_name, month_start, (month_start + INTERVAL '1 month')::DATE
+                    );
+                ELSE
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF trades FOR VALUES FROM (%L) TO (%L)',
+                        partition_name, month_start, (month_start + INTERVAL '1 month')::DATE
+                    );
+                END IF;
+                created := created + 1;
+            EXCEPTION WHEN OTHERS THEN
+                -- Sous-transaction annulée pour ce seul mois
+                RAISE WARNING 'Partition % non créée: %', partition_name, SQLERRM;
+            END;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_trades_partitions(3);
+
+-- Positions nettes des trades archivés (partitions exportées en Parquet puis supprimées)
+CREATE TABLE IF NOT EXISTS archived_positions (
+    id SERIAL PRIMARY KEY,
     user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
-    exchange VARCHAR(100) NOT NULL
+    exchange VARCHAR(100) NOT NULL,
+    symbol VARCHAR(50) NOT NULL,
+    quantity DOUBLE PRECISION NOT NULL DEFAULT 0,
+    net_cost DOUBLE PRECISION NOT NULL DEFAULT 0,
+    CONSTRAINT uq_archived_positions_key UNIQUE (user_id, exchange, symbol)
 );
 
 -- Table des dépôts
@@ -69,19 +136,83 @@ CREATE TABLE IF NOT EXISTS alerts (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Table des abonnements aux stratégies (exécution multicompte)
+CREATE TABLE IF NOT EXISTS strategy_subscriptions (
+    id SERIAL PRIMARY KEY,
+    strategy VARCHAR(100) NOT NULL,
+    quantity DECIMAL(20, 8),
+    is_active BOOLEAN DEFAULT TRUE,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    api_key_id INTEGER REFERENCES api_keys(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Table des agrégats PnL journaliers (tenue à jour à chaque trade)
+CREATE TABLE IF NOT EXISTS pnl_daily_rollups (
+    id SERIAL PRIMARY KEY,
+    day DATE NOT NULL,
+    strategy VARCHAR(100) NOT NULL DEFAULT '',
+    symbol VARCHAR(50) NOT NULL,
+    exchange VARCHAR(100) NOT NULL,
+    trade_count INTEGER NOT NULL DEFAULT 0,
+    volume DOUBLE PRECISION NOT NULL DEFAULT 0,
+    realized_pnl DOUBLE PRECISION NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    peak_pnl DOUBLE PRECISION NOT NULL DEFAULT 0,
+    trough_pnl DOUBLE PRECISION NOT NULL DEFAULT 0,
+    max_drawdown DOUBLE PRECISION NOT NULL DEFAULT 0,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_pnl_daily_rollups_bucket UNIQUE (user_id, day, strategy, symbol, exchange)
+);
+
+-- Table des stop-loss / take-profit en attente (moteur de déclenchement)
+CREATE TABLE IF NOT EXISTS price_triggers (
+    id SERIAL PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL CHECK (kind IN ('stop_loss', 'take_profit')),
+    exchange VARCHAR(100) NOT NULL,
+    symbol VARCHAR(50) NOT NULL,
+    side VARCHAR(10) NOT NULL CHECK (side IN ('BUY', 'SELL')),
+    quantity DOUBLE PRECISION NOT NULL,
+    trigger_price DOUBLE PRECISION NOT NULL,
+    strategy VARCHAR(100),
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    trade_id INTEGER,  -- trades(id), sans clé étrangère (table partitionnée)
+    closing_trade_id INTEGER,
+    triggered_price DOUBLE PRECISION,
+    error TEXT,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    api_key_id INTEGER REFERENCES api_keys(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    triggered_at TIMESTAMP
+);
+
 -- Index pour optimiser les performances
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_api_keys_user_id ON api_keys(user_id);
 CREATE INDEX IF NOT EXISTS idx_trades_user_id ON trades(user_id);
 CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades(timestamp);
+-- Pagination par curseur (user_id, timestamp, id)
+CREATE INDEX IF NOT EXISTS idx_trades_user_timestamp_id ON trades(user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_deposits_user_created_at_id ON deposits(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_withdrawals_user_created_at_id ON withdrawals(user_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_deposits_user_id ON deposits(user_id);
 CREATE INDEX IF NOT EXISTS idx_withdrawals_user_id ON withdrawals(user_id);
 CREATE INDEX IF NOT EXISTS idx_alerts_user_id ON alerts(user_id);
+CREATE INDEX IF NOT EXISTS idx_strategy_subscriptions_strategy ON strategy_subscriptions(strategy) WHERE is_active;
+-- Rechargement des déclencheurs en attente au démarrage
+CREATE INDEX IF NOT EXISTS idx_price_triggers_pending ON price_triggers(trade_id) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_price_triggers_user_id ON price_triggers(user_id, created_at DESC);
 
 -- Commentaires sur les tables
 COMMENT ON TABLE users IS 'Table des utilisateurs de l''application';
 COMMENT ON TABLE api_keys IS 'Clés API chiffrées des exchanges';
-COMMENT ON TABLE trades IS 'Historique des trades exécutés';
+COMMENT ON TABLE trades IS 'Historique des trades exécutés (partitions mensuelles, archivées en Parquet au-delà de la rétention)';
+COMMENT ON TABLE archived_positions IS 'Positions nettes cumulées des partitions de trades archivées';
 COMMENT ON TABLE deposits IS 'Historique des dépôts';
 COMMENT ON TABLE withdrawals IS 'Historique des retraits';
-COMMENT ON TABLE alerts IS 'Alertes et notifications'; 
\ No newline at end of file
+COMMENT ON TABLE alerts IS 'Alertes et notifications';
+COMMENT ON TABLE pnl_daily_rollups IS 'Agrégats PnL journaliers par stratégie, symbole et exchange';
+COMMENT ON TABLE price_triggers IS 'Stop-loss et take-profit surveillés par le moteur de déclenchement';
+COMMENT ON TABLE strategy_subscriptions IS 'Comptes abonnés aux signaux d''une stratégie'; 
\ No newline at end of file
@@ -0,0 +1,113 @@
+-- Migration d'une base existante vers la table trades partitionnée par mois
+-- (les nouvelles bases sont créées directement par init.sql)
+--
+-- À exécuter application arrêtée :
+--     psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f db/migrations/001_partition_trades.sql
+-- Autonome : la fonction create_trades_partitions et la table archived_positions d'init.sql,
+-- absentes des bases créées avant le partitionnement, y sont (re)créées.
+
+BEGIN;
+
+ALTER TABLE trades RENAME TO trades_legacy;
+ALTER SEQUENCE trades_id_seq RENAME TO trades_legacy_id_seq;
+ALTER INDEX trades_pkey RENAME TO trades_legacy_pkey;
+
+-- Les clés étrangères vers trades(id) ne sont plus possibles
+ALTER TABLE IF EXISTS price_triggers DROP CONSTRAINT IF EXISTS price_triggers_trade_id_fkey;
+ALTER TABLE IF EXISTS price_triggers DROP CONSTRAINT IF EXISTS price_triggers_closing_trade_id_fkey;
+
+CREATE TABLE trades (
+    id SERIAL,
+    symbol VARCHAR(50) NOT NULL,
+    side VARCHAR(10) NOT NULL,
+    quantity DECIMAL(20, 8) NOT NULL,
+    price DECIMAL(20, 8) NOT NULL,
+    pnl DECIMAL(20, 8),
+    strategy VARCHAR(100),
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    exchange VARCHAR(100) NOT NULL,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE trades_default PARTITION OF trades DEFAULT;
+
+-- Identique à init.sql
+CREATE OR REPLACE FUNCTION create_trades_partitions(months_ahead INTEGER DEFAULT 3, months_back INTEGER DEFAULT 0)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    FOR i IN -months_back..months_ahead LOOP
+        month_start := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::DATE;
+        partition_name := 'trades_' || to_char(month_start, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            BEGIN
+                IF EXISTS (
+                    SELECT 1 FROM trades_default
+                    WHERE timestamp >= month_start AND timestamp < month_start + INTERVAL '1 month'
+                ) THEN
+                    -- Table créée à part, remplie depuis la partition par défaut, puis rattachée
+                    EXECUTE format('CREATE TABLE %I (LIKE trades INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+                    EXECUTE format(
+                        'WITH moved AS (DELETE FROM trades_default WHERE timestamp >= %L AND timestamp < %L RETURNING *) '
+                        'INSERT INTO %I SELECT * FROM moved',
+                        month_start, (month_start + INTERVAL '1 month')::DATE, partition_name
+                    );
+                    EXECUTE format(
+                        'ALTER TABLE trades ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                        partition_name, month_start, (month_start + INTERVAL '1 month')::DATE
+                    );
+                ELSE
+                    EXECUTE format(
+                        'CREATE TABLE %I PARTITION OF trades FOR VALUES FROM (%L) TO (%L)',
+                        partition_name, month_start, (month_start + INTERVAL '1 month')::DATE
+                    );
+                END IF;
+                created := created + 1;
+            EXCEPTION WHEN OTHERS THEN
+                -- Sous-transaction annulée pour ce seul mois
+                RAISE WARNING 'Partition % non créée: %', partition_name, SQLERRM;
+            END;
+        END IF;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Une partition par mois depuis le plus ancien trade
+SELECT create_trades_partitions(
+    3,
+    COALESCE((
+        SELECT (EXTRACT(YEAR FROM age(date_trunc('month', CURRENT_DATE), date_trunc('month', MIN(timestamp)))) * 12
+              + EXTRACT(MONTH FROM age(date_trunc('month', CURRENT_DATE), date_trunc('month', MIN(timestamp)))))::INTEGER
+        FROM trades_legacy
+    ), 0)
+);
+
+INSERT INTO trades (id, symbol, side, quantity, price, pnl, strategy, timestamp, user_id, exchange)
+SELECT id, symbol, side, quantity, price, pnl, strategy, COALESCE(timestamp, CURRENT_TIMESTAMP), user_id, exchange
+FROM trades_legacy;
+
+SELECT setval('trades_id_seq', COALESCE((SELECT MAX(id) FROM trades), 0) + 1, false);
+
+DROP TABLE trades_legacy;
+
+CREATE INDEX IF NOT EXISTS idx_trades_user_id ON trades(user_id);
+CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades(timestamp);
+CREATE INDEX IF NOT EXISTS idx_trades_user_timestamp_id ON trades(user_id, timestamp DESC, id DESC);
+
+-- Positions nettes des trades archivés (identique à init.sql)
+CREATE TABLE IF NOT EXISTS archived_positions (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    exchange VARCHAR(100) NOT NULL,
+    symbol VARCHAR(50) NOT NULL,
+    quantity DOUBLE PRECISION NOT NULL DEFAULT 0,
+    net_cost DOUBLE PRECISION NOT NULL DEFAULT 0,
+    CONSTRAINT uq_archived_positions_key UNIQUE (user_id, exchange, symbol)
+);
+
+COMMIT;
\ No newline at end of file